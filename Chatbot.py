@@ -1,9 +1,21 @@
 import streamlit as st
 import os
+import time
 import uuid
 from src.config import Config
-from src.rag.rag_agent import Agent
-from src.rag.reranker import get_reranker_model
+from src.rag.artifacts import rehydrate
+from src.rag.checkpoints import create_checkpointer, start_maintenance_thread
+from src.rag.event_loop import BackgroundEventLoop
+from src.rag.rag_agent import Agent, AsyncAgent
+from src.rag.reranker import get_rerank_cache, get_reranker_model
+from src.rag.retriever import get_query_vector_caches
+from src.rag.router import get_intent_router
+from src.rag.telemetry import METRICS, StageTimingHandler, start_metrics_server, track_turn
+from src.rag.tokens import message_text
+from src.rag.warmup import start_warmup
+
+# Start loading the models and connections in the background while the page renders
+warmup = start_warmup() if Config.WARMUP_ENABLED else None
 
 st.title("💬 RAG Chatbot")
 st.caption("🚀 A Streamlit chatbot powered by RAG with knowledge base")
@@ -34,9 +46,50 @@ with st.sidebar:
         ]
         st.rerun()
 
-# Initialize Reranker model
-with st.spinner("Loading Reranker Model..."):
-    get_reranker_model()
+    if Config.ROUTER_ENABLED:
+        st.divider()
+        with st.expander("🧭 Intent Router"):
+            st.json(get_intent_router().metrics.stats())
+
+    if warmup is not None:
+        st.divider()
+        with st.expander("⏱️ Startup"):
+            st.json(warmup.report())
+
+    if Config.SHOW_STAGE_TIMINGS:
+        with st.expander("📊 Stage Latency"):
+            st.json(METRICS.summary())
+
+    if Config.RERANK_CACHE_ENABLED or Config.QUERY_CACHE_ENABLED:
+        with st.expander("🗄️ Cache Hit Rates"):
+            cache_stats = {}
+            if Config.RERANK_CACHE_ENABLED:
+                cache_stats["rerank_scores"] = get_rerank_cache().stats()
+            if Config.QUERY_CACHE_ENABLED:
+                dense_cache, sparse_cache = get_query_vector_caches()
+                cache_stats["dense_query_vectors"] = dense_cache.stats()
+                cache_stats["sparse_query_vectors"] = sparse_cache.stats()
+            st.json(cache_stats)
+
+if warmup is None:
+    # Initialize Reranker model
+    with st.spinner("Loading Reranker Model..."):
+        get_reranker_model()
+
+@st.cache_resource
+def get_event_loop():
+    # One loop per process, shared by every session when the async agent is enabled
+    return BackgroundEventLoop()
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus scrape endpoint, one per process
+    return start_metrics_server(Config.METRICS_PORT)
+
+@st.cache_resource
+def get_checkpoint_maintenance():
+    # One maintenance thread per process; prefer a cron job when running several replicas
+    return start_maintenance_thread()
 
 @st.cache_resource(show_spinner="Loading Agent Model...")
 def get_agent(api_key=None):
@@ -44,10 +97,32 @@ def get_agent(api_key=None):
         os.environ["GOOGLE_API_KEY"] = api_key
     elif Config.GOOGLE_API_KEY:
         os.environ["GOOGLE_API_KEY"] = Config.GOOGLE_API_KEY
-    return Agent()
+    if Config.AGENT_ASYNC:
+        return get_event_loop().run(AsyncAgent.create())
+    if warmup is None:
+        return Agent()
+
+    # Reuse the warmed-up checkpointer; the models are picked up from the resource cache
+    with warmup.timed("agent"):
+        try:
+            checkpointer, pool = warmup.result("checkpointer")
+        except Exception:
+            # The warm-up keeps its failure (e.g. the database was down at startup), retry now
+            checkpointer, pool = create_checkpointer()
+        agent = Agent(checkpointer=checkpointer)
+        agent.pool = pool
+    return agent
+
+def stream_agent(agent, inputs, config, stream_mode):
+    """Stream the supervisor graph, through the shared event loop when the agent is async."""
+    if isinstance(agent, AsyncAgent):
+        return get_event_loop().iterate(agent.agent.astream(inputs, config=config, stream_mode=stream_mode))
+    return agent.agent.stream(inputs, config=config, stream_mode=stream_mode)
 
-# Initialize RAG Agent
-rag_agent = get_agent(google_api_key)
+if Config.CHECKPOINT_MAINTENANCE_ENABLED:
+    get_checkpoint_maintenance()
+if Config.METRICS_ENABLED and Config.METRICS_PORT:
+    get_metrics_server()
 
 # Display chat history
 for msg in st.session_state.messages:
@@ -58,23 +133,49 @@ if prompt := st.chat_input("Ask a question about your documents..."):
     # Add user message to chat
     st.session_state.messages.append({"role": "user", "content": prompt})
     st.chat_message("user").write(prompt)
-    
+
     # Get assistant response with streaming
     with st.chat_message("assistant"):
         try:
+            # Initialize RAG Agent (waits for the warm-up on the first question only)
+            rag_agent = get_agent(google_api_key)
+
             final_answer = ""
+            streamed_answer = ""
+            routed_intent = None
+            sources = []
+            turn_start = time.perf_counter()
             
-            # Use st.status to show agent progress
-            with st.status("Thinking...", expanded=True) as status:
+            # Use st.status to show agent progress, tokens are rendered below it as they arrive
+            status = st.status("Thinking...", expanded=True)
+            answer_placeholder = st.empty()
                 
-                config = {"configurable": {"thread_id": st.session_state["thread_id"]}}
-                
-                # Stream agent updates
-                for chunk in rag_agent.agent.stream(
+            config = {"configurable": {"thread_id": st.session_state["thread_id"]}}
+            
+            # Time each stage of the turn (LLM and tool calls via callbacks, the rest via spans)
+            with track_turn() as timings:
+                config["callbacks"] = [StageTimingHandler(timings)]
+
+                # Stream supervisor tokens ("messages") and step updates ("updates")
+                for mode, chunk in stream_agent(
+                    rag_agent,
                     {"messages": [{"role": "user", "content": prompt}]},
                     config=config,
-                    stream_mode="updates",
+                    stream_mode=["messages", "updates"],
                 ):
+                    # Handle supervisor tokens (sub-agent tokens are not streamed to the parent graph)
+                    if mode == "messages":
+                        token, metadata = chunk
+                        if metadata.get("langgraph_node") != "model":
+                            continue
+                        text = message_text(token.content)
+                        if text:
+                            if not streamed_answer:
+                                status.write("✨ Generating response...")
+                            streamed_answer += text
+                            answer_placeholder.markdown(streamed_answer + "▌")
+                        continue
+
                     for step, data in chunk.items():
                         # Skip if data is None
                         if not data:
@@ -83,52 +184,66 @@ if prompt := st.chat_input("Ask a question about your documents..."):
                         # Get the last message from this step
                         if "messages" not in data or not data["messages"]:
                             continue
-                            
-                        last_message = data["messages"][-1]
                         
+                        last_message = data["messages"][-1]
+
+                        # Knowledge-base sources (refs) from tool results, including locally routed ones
+                        for msg in data["messages"]:
+                            if getattr(msg, "name", None) == "ask_knowledge_base" and getattr(msg, "artifact", None):
+                                sources.extend(msg.artifact)
+                    
                         # Handle tool calls (agent deciding to use a tool)
                         if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+                            # Any text streamed in this step was preamble, not the answer
+                            streamed_answer = ""
+                            answer_placeholder.empty()
                             for tool_call in last_message.tool_calls:
                                 tool_name = tool_call.get("name", "unknown")
-                                st.write(f"🔧 Calling tool: `{tool_name}`")
-                        
+                                status.write(f"🔧 Calling tool: `{tool_name}`")
+                    
                         # Handle tool responses
                         elif step == "tools":
                             tool_name = getattr(last_message, "name", "tool")
-                            st.write(f"✅ `{tool_name}` returned results")
-                        
+                            status.write(f"✅ `{tool_name}` returned results")
+                    
                         # Handle model responses (final answer)
-                        elif step == "model":
+                        elif getattr(last_message, "type", None) == "ai":
                             content = getattr(last_message, "content", None)
                             if content:
-                                # Check if this is a final response (no tool calls)
-                                if not (hasattr(last_message, "tool_calls") and last_message.tool_calls):
-                                    st.write("✨ Generating response...")
-                                    
-                                    # Extract text content inline
-                                    if isinstance(content, str):
-                                        final_answer = content
-                                    elif isinstance(content, list):
-                                        text_parts = []
-                                        for part in content:
-                                            if isinstance(part, dict) and part.get("type") == "text":
-                                                text_parts.append(part.get("text", ""))
-                                            elif isinstance(part, str):
-                                                text_parts.append(part)
-                                        final_answer = "".join(text_parts)
-                                    else:
-                                        final_answer = str(content)
-                
-                status.update(label="✅ Complete!", state="complete", expanded=False)
+                                if last_message.response_metadata.get("semantic_cache"):
+                                    status.write("⚡ Answered from cache")
+                                if routed_intent := last_message.response_metadata.get("intent_router"):
+                                    status.write(f"🧭 Routed locally as `{routed_intent}`")
+                                final_answer = message_text(content)
+            
+            if Config.SHOW_STAGE_TIMINGS:
+                status.write("⏱️ Stage breakdown (nested stages overlap):")
+                status.table({stage: f"{t['seconds']:.2f}s ({t['calls']}x)" for stage, t in sorted(timings.breakdown().items())})
+            status.update(label="✅ Complete!", state="complete", expanded=False)
+            if Config.ROUTER_ENABLED:
+                get_intent_router().metrics.record_turn(routed_intent, time.perf_counter() - turn_start, text=prompt)
             
             # Display final answer
+            final_answer = final_answer or streamed_answer
             if final_answer:
-                st.markdown(final_answer)
+                answer_placeholder.markdown(final_answer)
                 st.session_state.messages.append({"role": "assistant", "content": final_answer})
             else:
-                st.warning("No response generated.")
+                answer_placeholder.warning("No response generated.")
+
+            # Fetch the cited chunks back from the vector store, the checkpoint only holds their ids
+            if sources:
+                with st.expander("📚 Sources"):
+                    try:
+                        for doc in rehydrate(sources):
+                            page = doc.metadata.get("page")
+                            label = doc.metadata.get("name") or "Unknown source"
+                            st.markdown(f"**{label}**" + (f", p. {int(page) + 1}" if isinstance(page, (int, float)) else ""))
+                            st.caption(doc.page_content)
+                    except Exception as e:
+                        st.caption(f"Sources unavailable: {e}")
                 
         except Exception as e:
             error_msg = f"Sorry, I encountered an error: {str(e)}"
             st.error(error_msg)
-            st.session_state.messages.append({"role": "assistant", "content": error_msg})
\ No newline at end of file
+            st.session_state.messages.append({"role": "assistant", "content": error_msg})
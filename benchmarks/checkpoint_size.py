@@ -0,0 +1,109 @@
+"""Measure checkpoint bytes written per turn with full-document vs ref artifacts.
+
+Scripted models drive the supervisor and the knowledge sub-agent through one
+`ask_knowledge_base` -> `retrieve_context` round trip per turn, the retrieval returns
+RERANKER_TOP_N synthetic chunks, and a counting serializer on the in-memory checkpointer
+records every byte the graph writes (checkpoints, channel blobs and pending writes).
+
+Run from the repository root:
+    python -m benchmarks.checkpoint_size --turns 10
+"""
+import argparse
+import itertools
+import uuid
+from langchain.agents import create_agent
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from benchmarks.stubs import StubSubAgent, scripted_model
+from src.config import Config
+from src.rag.artifacts import to_refs
+from src.rag.context_packer import pack_context
+from src.rag.rag_agent import DirectKnowledgeAgent, build_supervisor
+
+class CountingSerializer(JsonPlusSerializer):
+    """Serializer that counts the bytes it produces."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_written = 0
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        self.bytes_written += len(data)
+        return type_, data
+
+def fake_docs(query: str, n: int, chunk_chars: int) -> list:
+    text = ("Software requirements describe what the system must do and under which constraints. " * 20)[:chunk_chars]
+    return [
+        Document(
+            page_content=f"{query} {i}: {text}",
+            metadata={
+                "name": "software-engineering.pdf",
+                "page": i,
+                "ref_id": "bench-ref",
+                "source": "/tmp/tmp_software-engineering.pdf",
+                "start_index": i * chunk_chars,
+                "relevance_score": 1.0 - i / 10,
+            },
+        )
+        for i in range(n)
+    ]
+
+def tool_turns(tool: str, answer: str):
+    # One tool call then an answer per turn; fresh messages, the graph assigns their ids
+    for _ in itertools.count():
+        yield AIMessage(content="", tool_calls=[{"name": tool, "args": {"query": "What are requirements?"}, "id": f"call_{uuid.uuid4().hex}"}])
+        yield AIMessage(content=answer)
+
+def run(mode: str, knowledge: str, turns: int, chunk_chars: int) -> list:
+    def retrieve_context(query: str):
+        """Retrieve information from the knowledge base to help answer a query."""
+        docs = fake_docs(query, Config.RERANKER_TOP_N, chunk_chars)
+        return pack_context(docs), to_refs(docs) if mode == "refs" else docs
+
+    async def aretrieve_context(query: str):
+        return retrieve_context(query)
+
+    answer = " ".join(["answer"] * 150)
+    if knowledge == "fast-path":
+        knowledge_agent = DirectKnowledgeAgent(scripted_model(AIMessage(content=answer) for _ in itertools.count()), retrieve_context, aretrieve_context)
+    else:
+        knowledge_agent = create_agent(
+            model=scripted_model(tool_turns("retrieve_context", answer)),
+            tools=[StructuredTool.from_function(func=retrieve_context, coroutine=aretrieve_context, response_format="content_and_artifact")],
+        )
+
+    serde = CountingSerializer()
+    agent = build_supervisor(
+        model=scripted_model(tool_turns("ask_knowledge_base", answer)),
+        knowledge_agent=knowledge_agent,
+        search_agent=StubSubAgent("unused", 0.0),
+        checkpointer=InMemorySaver(serde=serde),
+    )
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+    per_turn = []
+    for turn in range(turns):
+        before = serde.bytes_written
+        agent.invoke({"messages": [{"role": "user", "content": f"Question {turn}: what are requirements?"}]}, config=config)
+        per_turn.append(serde.bytes_written - before)
+    return per_turn
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--chunk-chars", type=int, default=Config.TEXT_SPLITTER_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, {Config.RERANKER_TOP_N} chunks of {args.chunk_chars} chars per retrieval\n")
+    print(f"{'knowledge':<10} {'artifact':<10} {'first':>9} {'mean':>9} {'last':>9}  (checkpoint bytes per turn)")
+    for knowledge in ("sub-agent", "fast-path"):
+        for mode in ("documents", "refs"):
+            sizes = run(mode, knowledge, args.turns, args.chunk_chars)
+            print(f"{knowledge:<10} {mode:<10} {sizes[0]:>9} {sum(sizes) / len(sizes):>9.0f} {sizes[-1]:>9}")
+
+if __name__ == "__main__":
+    main()
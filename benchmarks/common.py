@@ -0,0 +1,5 @@
+import resource
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,166 @@
+"""Offline micro-benchmarks of the RAG components, compared against a stored baseline.
+
+Covers chunk_documents throughput, load_documents per file type, embedding + indexing
+throughput per batch size, rerank_documents latency vs candidate count and score_pairs
+batch size, and retrieve_context end to end. Models, sparse encoder and index are the
+offline stand-ins from benchmarks/offline.py, so absolute numbers only mean something
+relative to a baseline taken on the same machine.
+
+Run from the repository root:
+    python -m benchmarks.components                  # write results, compare to the baseline
+    python -m benchmarks.components --save-baseline  # store these results as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
+from benchmarks.offline import QUESTIONS, offline_retriever, sample_files, synthetic_pages, tiny_embeddings, tiny_reranker
+from src.config import Config
+
+RESULTS_PATH = os.path.join("benchmarks", "results", "components.json")
+BASELINE_PATH = os.path.join("benchmarks", "baseline", "components.json")
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `fn` in seconds, after one warm-up call."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+class Results:
+    def __init__(self):
+        self.metrics: Dict[str, Dict[str, object]] = {}
+
+    def add(self, name: str, value: float, unit: str, higher_is_better: bool) -> None:
+        self.metrics[name] = {"value": round(value, 4), "unit": unit, "higher_is_better": higher_is_better}
+        print(f"  {name:<40} {value:>12.2f} {unit}")
+
+def bench_chunking(results: Results, repeat: int) -> list:
+    from src.rag.text_splitter import chunk_documents
+
+    pages = synthetic_pages(200)
+    megabytes = sum(len(p.page_content) for p in pages) / 1e6
+    chunks = chunk_documents(pages)
+    seconds = measure(lambda: chunk_documents(pages), repeat)
+    results.add("chunk_documents.chunks_per_s", len(chunks) / seconds, "chunks/s", True)
+    results.add("chunk_documents.mb_per_s", megabytes / seconds, "MB/s", True)
+    return chunks
+
+def bench_loading(results: Results, repeat: int) -> None:
+    from src.rag.data_loader import load_documents
+
+    for ext, upload in sample_files().items():
+        seconds = measure(lambda: load_documents(upload, ref_id="bench"), repeat)
+        results.add(f"load_documents{ext}.ms", 1000 * seconds, "ms", False)
+
+def bench_indexing(results: Results, chunks: list, embeddings, repeat: int):
+    from src.rag.vectorstore import index_documents
+
+    texts = [c.page_content for c in chunks[:256]]
+    seconds = measure(lambda: embeddings.embed_documents(texts), repeat)
+    results.add("embed_documents.texts_per_s", len(texts) / seconds, "texts/s", True)
+
+    retriever = offline_retriever(embeddings)
+    for batch_size in (16, 64, 128):
+        # Ids are content-addressed, re-indexing the same chunks overwrites them
+        seconds = measure(lambda: index_documents(chunks, batch_size=batch_size, retriever=retriever), max(1, repeat // 2))
+        results.add(f"index_documents.batch{batch_size}.chunks_per_s", len(chunks) / seconds, "chunks/s", True)
+    return retriever
+
+def bench_reranking(results: Results, chunks: list, reranker, repeat: int) -> None:
+    from src.rag.reranker import rerank_documents, score_pairs
+
+    query = QUESTIONS["testing"]
+    for candidates in (10, 20, 50):
+        docs = chunks[:candidates]
+        seconds = measure(lambda: rerank_documents(query, docs, top_n=Config.RERANKER_TOP_N), repeat)
+        results.add(f"rerank_documents.k{candidates}.ms", 1000 * seconds, "ms", False)
+
+    pairs = [[query, c.page_content] for c in chunks[:64]]
+    for batch_size in (8, 16, 32, 64):
+        seconds = measure(lambda: score_pairs(pairs, reranker, batch_size=batch_size), repeat)
+        results.add(f"score_pairs.64pairs.batch{batch_size}.ms", 1000 * seconds, "ms", False)
+
+def bench_retrieve_context(results: Results, retriever, repeat: int) -> None:
+    from src.rag.rag_agent import make_retrieve_context
+
+    retrieve_context, _ = make_retrieve_context(retriever)
+    latencies = []
+    for question in QUESTIONS.values():
+        latencies.append(measure(lambda: retrieve_context(question), repeat))
+    results.add("retrieve_context.p50_ms", 1000 * statistics.median(latencies), "ms", False)
+    results.add("retrieve_context.max_ms", 1000 * max(latencies), "ms", False)
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print the change per metric and return the names that regressed beyond `tolerance`."""
+    regressions = []
+    print(f"\n{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metric in current["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<40} {'-':>12} {metric['value']:>12.2f} {'new':>8}")
+            continue
+        change = metric["value"] / base["value"] - 1
+        worse = -change if metric["higher_is_better"] else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        print(f"{name:<40} {base['value']:>12.2f} {metric['value']:>12.2f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    # Measure the components themselves, not the caches or the cross-session batcher
+    Config.RERANK_CACHE_ENABLED = False
+    Config.MICRO_BATCHING = False
+    Config.RERANK_MICRO_BATCHING = False
+    Config.ANSWER_CACHE_ENABLED = False
+
+    import src.rag.reranker as reranker_module
+    reranker = tiny_reranker()
+    reranker_module.get_reranker_model = lambda: reranker
+    embeddings = tiny_embeddings()
+
+    results = Results()
+    chunks = bench_chunking(results, args.repeat)
+    bench_loading(results, args.repeat)
+    retriever = bench_indexing(results, chunks, embeddings, args.repeat)
+    bench_reranking(results, chunks, reranker, args.repeat)
+    bench_retrieve_context(results, retriever, args.repeat)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "metrics": results.metrics,
+    }
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {path}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(report, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
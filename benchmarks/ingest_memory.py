@@ -0,0 +1,70 @@
+"""Compare peak RSS of eager vs streaming document loading and chunking.
+
+Indexing is replaced by a sink that drops each window of chunks, so the numbers reflect
+loading and splitting only. Each path runs in a fresh process.
+
+Run from the repository root:
+    python -m benchmarks.ingest_memory path/to/large.pdf
+"""
+import argparse
+import io
+import multiprocessing as mp
+import os
+import time
+from itertools import islice
+from benchmarks.common import peak_rss_mb
+
+class LocalUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+def run_path(mode: str, path: str, window_size: int, queue) -> None:
+    from src.rag.data_loader import lazy_load_documents, load_documents
+    from src.rag.text_splitter import chunk_documents, iter_chunks
+
+    upload = LocalUpload(path)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    num_chunks = 0
+
+    if mode == "eager":
+        chunks = chunk_documents(load_documents(upload, ref_id="bench"))
+        for i in range(0, len(chunks), window_size):
+            num_chunks += len(chunks[i:i + window_size])
+    else:
+        chunks = iter_chunks(lazy_load_documents(upload, ref_id="bench"))
+        while window := list(islice(chunks, window_size)):
+            num_chunks += len(window)
+
+    queue.put({
+        "mode": mode,
+        "chunks": num_chunks,
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+        "delta_mb": peak_rss_mb() - baseline,
+    })
+
+def main():
+    from src.config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--window", type=int, default=Config.INGEST_WINDOW_SIZE)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    print(f"{'path':<10} {'chunks':>7} {'time (s)':>9} {'peak RSS (MB)':>14} {'growth (MB)':>12}")
+    for mode in ("eager", "streaming"):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_path, args=(mode, args.path, args.window, queue))
+        proc.start()
+        res = queue.get()
+        proc.join()
+        print(f"{res['mode']:<10} {res['chunks']:>7} {res['seconds']:>9.2f} {res['peak_rss_mb']:>14.0f} {res['delta_mb']:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Load test of the full Agent graph under concurrent multi-turn conversations.
+
+The real supervisor, sub-agent, middleware, retrieval and reranking code runs against
+offline stand-ins: a replay chat model with a fixed latency per call, a stub web search,
+the tiny retrieval models over a LocalHybridIndex (benchmarks/offline.py), and a local
+checkpointer. By default the checkpointer is an InMemorySaver behind a simulated
+connection pool of DB_MAX_SIZE connections, each operation holding a connection for
+--db-latency seconds, so pool wait can be studied without a database. With
+--checkpointer postgres the real pool on DB_URI is used and psycopg_pool's own wait
+statistics are reported.
+
+Run from the repository root:
+    python -m benchmarks.load_test --concurrency 1 8 32 --turns 4
+    python -m benchmarks.load_test --mode async --pool-size 5 --db-latency 0.02
+    python -m benchmarks.load_test --checkpointer postgres --pool-size 20
+"""
+import argparse
+import asyncio
+import functools
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.offline import QUESTIONS, offline_retriever, synthetic_pages, tiny_embeddings, tiny_reranker
+from benchmarks.stubs import ReplayChatModel, StubSearchTool
+from src.config import Config
+
+FOLLOW_UPS = ["Can you give an example?", "How does that compare to the alternatives?", "Why does that matter in practice?"]
+
+class PoolSimulatingSaver(BaseCheckpointSaver):
+    """Checkpointer wrapper where every operation holds one of `pool_size` connections for
+    `db_latency` seconds, recording how long each operation waited for a connection."""
+
+    def __init__(self, inner: BaseCheckpointSaver, pool_size: int, db_latency: float):
+        super().__init__(serde=inner.serde)
+        self.inner = inner
+        self.pool_size = pool_size
+        self.db_latency = db_latency
+        self.waits: List[float] = []
+        self._semaphore = threading.BoundedSemaphore(pool_size)
+        self._asemaphore: Optional[asyncio.Semaphore] = None
+
+    @contextmanager
+    def _connection(self):
+        start = time.perf_counter()
+        with self._semaphore:
+            self.waits.append(time.perf_counter() - start)
+            time.sleep(self.db_latency)
+            yield
+
+    @asynccontextmanager
+    async def _aconnection(self):
+        # Created lazily so it binds to the running loop
+        if self._asemaphore is None:
+            self._asemaphore = asyncio.Semaphore(self.pool_size)
+        start = time.perf_counter()
+        async with self._asemaphore:
+            self.waits.append(time.perf_counter() - start)
+            await asyncio.sleep(self.db_latency)
+            yield
+
+    def get_tuple(self, config):
+        with self._connection():
+            return self.inner.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._connection():
+            return iter(list(self.inner.list(config, filter=filter, before=before, limit=limit)))
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._connection():
+            return self.inner.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._connection():
+            return self.inner.put_writes(config, writes, task_id, task_path)
+
+    async def aget_tuple(self, config):
+        async with self._aconnection():
+            return await self.inner.aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async with self._aconnection():
+            items = [item async for item in self.inner.alist(config, filter=filter, before=before, limit=limit)]
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        async with self._aconnection():
+            return await self.inner.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        async with self._aconnection():
+            return await self.inner.aput_writes(config, writes, task_id, task_path)
+
+    def get_next_version(self, current, channel):
+        return self.inner.get_next_version(current, channel)
+
+    def pool_stats(self) -> dict:
+        waits, self.waits = self.waits, []
+        return {
+            "ops": len(waits),
+            "mean_wait_ms": 1000 * statistics.fmean(waits) if waits else 0.0,
+            "max_wait_ms": 1000 * max(waits) if waits else 0.0,
+            "waited_pct": 100 * sum(w > 0.001 for w in waits) / len(waits) if waits else 0.0,
+        }
+
+def postgres_stats(pool) -> dict:
+    # pop_stats resets the counters, so each concurrency level is reported on its own
+    stats = pool.pop_stats()
+    requests = stats.get("requests_num", 0)
+    return {
+        "ops": requests,
+        "mean_wait_ms": stats.get("requests_wait_ms", 0) / requests if requests else 0.0,
+        "max_wait_ms": float("nan"),
+        "waited_pct": 100 * stats.get("requests_queued", 0) / requests if requests else 0.0,
+    }
+
+def conversation_turns(index: int, turns: int) -> List[str]:
+    questions = list(QUESTIONS.values())
+    return [questions[index % len(questions)]] + [FOLLOW_UPS[(index + t) % len(FOLLOW_UPS)] for t in range(turns - 1)]
+
+def run_sync(agent, concurrency: int, turns: int) -> List[float]:
+    def conversation(index: int) -> List[float]:
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        latencies = []
+        for text in conversation_turns(index, turns):
+            start = time.perf_counter()
+            agent.agent.invoke({"messages": [{"role": "user", "content": text}]}, config=config)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return [latency for result in pool.map(conversation, range(concurrency)) for latency in result]
+
+async def run_async(agent, concurrency: int, turns: int) -> List[float]:
+    async def conversation(index: int) -> List[float]:
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        latencies = []
+        for text in conversation_turns(index, turns):
+            start = time.perf_counter()
+            await agent.agent.ainvoke({"messages": [{"role": "user", "content": text}]}, config=config)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    results = await asyncio.gather(*(conversation(i) for i in range(concurrency)))
+    return [latency for result in results for latency in result]
+
+def build_retriever():
+    from src.rag.text_splitter import chunk_documents
+    from src.rag.vectorstore import index_documents
+
+    retriever = offline_retriever(tiny_embeddings())
+    index_documents(chunk_documents(synthetic_pages(100)), retriever=retriever)
+    return retriever
+
+def percentile(values: List[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[pct - 1]
+
+def report(concurrency: int, latencies: List[float], elapsed: float, pool: dict) -> None:
+    print(
+        f"{concurrency:>11} {len(latencies) / elapsed:>9.2f} "
+        f"{percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} {percentile(latencies, 99):>8.2f} "
+        f"{pool['ops']:>7} {pool['mean_wait_ms']:>12.1f} {pool['max_wait_ms']:>11.1f} {pool['waited_pct']:>8.1f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="concurrent conversations")
+    parser.add_argument("--turns", type=int, default=4, help="turns per conversation")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--checkpointer", choices=["memory", "postgres"], default="memory")
+    parser.add_argument("--pool-size", type=int, default=Config.DB_MAX_SIZE)
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds each simulated checkpoint operation holds a connection")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per chat model call")
+    parser.add_argument("--search-latency", type=float, default=1.0)
+    parser.add_argument("--answer-words", type=int, default=120)
+    args = parser.parse_args()
+
+    # Every concurrency level asks the same questions, so later levels would be served from
+    # caches warmed by earlier ones; make each level pay for its own encoding and scoring
+    Config.QUERY_CACHE_ENABLED = False
+    Config.RERANK_CACHE_ENABLED = False
+    Config.ANSWER_CACHE_ENABLED = False
+
+    # Stand-in reranker through the real rerank_documents path
+    import src.rag.reranker as reranker_module
+    reranker = tiny_reranker()
+    reranker_module.get_reranker_model = lambda: reranker
+
+    from src.rag.checkpoints import acreate_checkpointer, create_checkpointer
+    from src.rag.rag_agent import Agent
+
+    retriever = build_retriever()
+    model = ReplayChatModel(latency=args.llm_latency, answer_words=args.answer_words)
+    search_tool = StubSearchTool(args.search_latency)
+
+    print(f"mode={args.mode} checkpointer={args.checkpointer} pool_size={args.pool_size} "
+          f"llm_latency={args.llm_latency}s turns/conversation={args.turns}\n")
+    print(f"{'concurrency':>11} {'turns/s':>9} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+          f"{'db ops':>7} {'mean wait ms':>12} {'max wait ms':>11} {'waited %':>8}")
+
+    async def amain():
+        for concurrency in args.concurrency:
+            if args.checkpointer == "postgres":
+                Config.CHECKPOINTER_BACKEND, Config.DB_MAX_SIZE = "postgres", args.pool_size
+                checkpointer, pool = await acreate_checkpointer() if args.mode == "async" else create_checkpointer()
+                stats = functools.partial(postgres_stats, pool)
+            else:
+                checkpointer = PoolSimulatingSaver(InMemorySaver(), args.pool_size, args.db_latency)
+                pool, stats = None, checkpointer.pool_stats
+
+            agent = Agent(checkpointer=checkpointer, model=model, retriever=retriever, search_tool=search_tool)
+            start = time.perf_counter()
+            if args.mode == "async":
+                latencies = await run_async(agent, concurrency, args.turns)
+            else:
+                latencies = await asyncio.to_thread(run_sync, agent, concurrency, args.turns)
+            report(concurrency, latencies, time.perf_counter() - start, stats())
+
+            if pool is not None:
+                result = pool.close()
+                if asyncio.iscoroutine(result):
+                    await result
+
+    asyncio.run(amain())
+
+if __name__ == "__main__":
+    main()
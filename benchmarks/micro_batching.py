@@ -0,0 +1,127 @@
+"""Throughput and latency of direct vs micro-batched model calls at 1, 8 and 32 callers.
+
+Each caller thread issues requests back to back: a query embedding (one short text) or a
+rerank (RETRIEVER_K [query, chunk] pairs). "direct" calls the shared model per request,
+"batched" goes through MicroBatcher. By default the model is a stand-in whose forward pass
+costs a fixed overhead plus time per padded token and holds a device lock, so the run is
+fast and offline; `--real` uses the bge-m3 embeddings and the configured reranker instead.
+
+Run from the repository root:
+    python -m benchmarks.micro_batching --requests 20
+    python -m benchmarks.micro_batching --real --workload rerank
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
+from src.rag.batching import MicroBatcher
+from src.rag.tokens import estimate_tokens
+
+class SimulatedModel:
+    """Forward pass = overhead + per-token cost over the padded batch, one at a time."""
+
+    def __init__(self, overhead_ms: float, per_token_us: float, max_batch: int = 32):
+        self.overhead = overhead_ms / 1000
+        self.per_token = per_token_us / 1e6
+        self.max_batch = max_batch
+        self._device = threading.Lock()
+
+    def __call__(self, texts: list) -> list:
+        with self._device:
+            for i in range(0, len(texts), self.max_batch):
+                batch = texts[i:i + self.max_batch]
+                padded = len(batch) * max(estimate_tokens(t) for t in batch)
+                time.sleep(self.overhead + padded * self.per_token)
+        return [float(len(t)) for t in texts]
+
+def make_workload(kind: str, real: bool):
+    """Return (model function over a list of items, cost function, request generator)."""
+    rng = random.Random(0)
+    words = "software requirement design testing agile scrum pattern module interface quality".split()
+
+    def sentence(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    if kind == "embed":
+        if real:
+            from src.rag.retriever import get_embedding_model
+            model = get_embedding_model()
+            model = getattr(model, "embeddings", model)
+            fn = model.embed_documents
+        else:
+            fn = SimulatedModel(overhead_ms=8, per_token_us=40)
+        return fn, estimate_tokens, lambda: [sentence(rng.randint(4, 20))]
+
+    if real:
+        from src.rag.reranker import get_reranker_model, score_pairs
+        reranker = get_reranker_model()
+
+        def fn(pairs):
+            return list(score_pairs(pairs, reranker))
+    else:
+        simulated = SimulatedModel(overhead_ms=10, per_token_us=25)
+
+        def fn(pairs):
+            return simulated([q + " " + c for q, c in pairs])
+
+    def rerank_request():
+        query = sentence(rng.randint(4, 15))
+        return [[query, sentence(rng.randint(40, 100))] for _ in range(Config.RETRIEVER_K)]
+
+    return fn, lambda pair: estimate_tokens(pair[0]) + estimate_tokens(pair[1]), rerank_request
+
+def run(fn, callers: int, requests: list, batcher: MicroBatcher = None) -> dict:
+    latencies = []
+    lock = threading.Lock()
+
+    def caller(chunk):
+        for items in chunk:
+            start = time.perf_counter()
+            batcher.submit(items) if batcher else fn(items)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    chunks = [requests[i::callers] for i in range(callers)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(caller, chunks))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=20) if len(latencies) > 1 else latencies * 19
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * cuts[-1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", choices=["embed", "rerank", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=20, help="requests per caller")
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--real", action="store_true", help="use the real models instead of the stand-in")
+    args = parser.parse_args()
+
+    kinds = ["embed", "rerank"] if args.workload == "both" else [args.workload]
+    print(f"max_wait={Config.MICRO_BATCH_WAIT_MS}ms max_batch_tokens={Config.MICRO_BATCH_MAX_TOKENS} "
+          f"model={'real' if args.real else 'stand-in'}\n")
+    print(f"{'workload':<8} {'callers':>7} {'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'items/batch':>11}")
+
+    for kind in kinds:
+        fn, cost_fn, make_request = make_workload(kind, args.real)
+        for callers in args.callers:
+            requests = [make_request() for _ in range(callers * args.requests)]
+
+            direct = run(fn, callers, requests)
+            print(f"{kind:<8} {callers:>7} {'direct':<8} {direct['throughput']:>8.1f} {direct['p50_ms']:>8.1f} {direct['p95_ms']:>8.1f} {'-':>11}")
+
+            batcher = MicroBatcher(fn, cost_fn, Config.MICRO_BATCH_WAIT_MS, Config.MICRO_BATCH_MAX_TOKENS)
+            batched = run(fn, callers, requests, batcher)
+            per_batch = batcher.stats()["mean_items_per_batch"]
+            print(f"{kind:<8} {callers:>7} {'batched':<8} {batched['throughput']:>8.1f} {batched['p50_ms']:>8.1f} {batched['p95_ms']:>8.1f} {per_batch:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Offline stand-ins for the retrieval stack used by the benchmark scripts.
+
+Tiny randomly initialized BERT models (saved once under .cache/bench-models) take the place
+of bge-m3 and bge-reranker-v2-m3 and go through the same loading and scoring code, a hashed
+term-frequency encoder replaces BM25 (no corpus statistics or downloads), and the
+LocalHybridIndex replaces Pinecone.
+"""
+import io
+import os
+import random
+import re
+import tempfile
+import zipfile
+import zlib
+from typing import Dict, List, Optional
+from langchain_core.documents import Document
+from src.config import Config
+
+STANDIN_DIR = os.path.join(".cache", "bench-models")
+
+# Synthetic software-engineering corpus: each topic is a small pool of related sentences
+TOPICS: Dict[str, List[str]] = {
+    "waterfall": [
+        "The waterfall model completes each phase before the next phase begins.",
+        "Changing requirements late in a waterfall project is expensive because design is already fixed.",
+        "Waterfall projects produce detailed documentation at the end of every phase.",
+    ],
+    "agile": [
+        "Agile teams deliver working software in short iterations called sprints.",
+        "Scrum defines the roles of product owner, scrum master and development team.",
+        "A sprint retrospective lets the team inspect its process and plan improvements.",
+    ],
+    "testing": [
+        "Unit tests verify a single function or class in isolation with dependencies mocked.",
+        "Integration tests exercise several components together to check their interfaces agree.",
+        "Regression testing re-runs existing tests to make sure changes did not break features.",
+    ],
+    "solid": [
+        "The single responsibility principle says a class should have only one reason to change.",
+        "The open closed principle asks modules to be open for extension but closed for modification.",
+        "The Liskov substitution principle requires subtypes to be usable wherever the base type is.",
+    ],
+    "requirements": [
+        "Functional requirements describe what the system must do for its users.",
+        "Non-functional requirements constrain qualities such as performance, security and usability.",
+        "Requirements elicitation gathers stakeholder needs through interviews and workshops.",
+    ],
+    "uml": [
+        "A use case diagram shows actors and the goals they achieve with the system.",
+        "Class diagrams describe classes, their attributes, operations and relationships.",
+        "Sequence diagrams show how objects interact through messages over time.",
+    ],
+    "patterns": [
+        "The observer pattern notifies dependent objects automatically when a subject changes state.",
+        "The factory method pattern lets subclasses decide which class to instantiate.",
+        "The adapter pattern converts the interface of a class into one that clients expect.",
+    ],
+    "verification": [
+        "Verification checks that the product is built right according to its specification.",
+        "Validation checks that the right product is built for the needs of its users.",
+        "Code reviews and static analysis are verification activities performed without execution.",
+    ],
+}
+
+QUESTIONS: Dict[str, str] = {
+    "waterfall": "Why is changing requirements expensive in the waterfall model?",
+    "agile": "What roles does scrum define?",
+    "testing": "What is the difference between unit and integration tests?",
+    "solid": "What does the single responsibility principle say?",
+    "requirements": "What are non-functional requirements?",
+    "uml": "What does a sequence diagram show?",
+    "patterns": "How does the observer pattern work?",
+    "verification": "What is the difference between verification and validation?",
+}
+
+# The TOPICS sentence that answers each question, used to label relevant chunks
+ANSWERS: Dict[str, str] = {
+    "waterfall": TOPICS["waterfall"][1],
+    "agile": TOPICS["agile"][1],
+    "testing": TOPICS["testing"][1],
+    "solid": TOPICS["solid"][0],
+    "requirements": TOPICS["requirements"][1],
+    "uml": TOPICS["uml"][2],
+    "patterns": TOPICS["patterns"][0],
+    "verification": TOPICS["verification"][1],
+}
+
+def _vocabulary() -> List[str]:
+    text = " ".join(s for sentences in TOPICS.values() for s in sentences) + " " + " ".join(QUESTIONS.values())
+    return sorted(set(re.findall(r"[a-z]+", text.lower())))
+
+def synthetic_pages(num_pages: int, sentences_per_page: int = 40, seed: int = 0, ref_id: str = "bench") -> List[Document]:
+    """Pages of text, each mostly about one topic (recorded as metadata["topic"])."""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    pages = []
+    for page in range(num_pages):
+        topic = topics[page % len(topics)]
+        sentences = [
+            rng.choice(TOPICS[topic] if rng.random() < 0.8 else TOPICS[rng.choice(topics)])
+            for _ in range(sentences_per_page)
+        ]
+        pages.append(Document(
+            page_content=" ".join(sentences),
+            metadata={"name": "synthetic.pdf", "page": page, "ref_id": ref_id, "topic": topic},
+        ))
+    return pages
+
+def labelled_queries(chunks: List[Document]) -> List[Dict[str, object]]:
+    """QUESTIONS labelled with the ids of the chunks that contain their answer sentence."""
+    from src.rag.vectorstore import chunk_id
+
+    return [
+        {"question": question, "relevant_ids": sorted({chunk_id(c) for c in chunks if ANSWERS[topic] in c.page_content})}
+        for topic, question in QUESTIONS.items()
+    ]
+
+def _tiny_bert(kind: str) -> str:
+    """Save (once) a tiny randomly initialized BERT with a corpus vocabulary and return its directory."""
+    path = os.path.join(STANDIN_DIR, kind)
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertModel, BertTokenizerFast
+
+    os.makedirs(path, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *_vocabulary()]
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+
+    config = BertConfig(
+        vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=128, max_position_embeddings=512, num_labels=1,
+    )
+    torch.manual_seed(0)
+    model = BertForSequenceClassification(config) if kind == "reranker" else BertModel(config)
+    model.save_pretrained(path)
+    BertTokenizerFast(vocab_file=vocab_file).save_pretrained(path)
+    return path
+
+def tiny_reranker():
+    """(tokenizer, model, device) in the shape `score_pairs` expects."""
+    from src.rag.reranker import _load_torch_reranker
+    return _load_torch_reranker(_tiny_bert("reranker"))
+
+def tiny_embeddings():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=_tiny_bert("embeddings"),
+        model_kwargs={"device": "cpu"},
+        encode_kwargs=Config.EMBEDDINGS_MODEL_ENCODE_KWARGS,
+    )
+
+class HashSparseEncoder:
+    """BM25-shaped sparse encoder over hashed term frequencies."""
+
+    def __init__(self, dim: int = 2 ** 18):
+        self.dim = dim
+
+    def _encode(self, text: str) -> Dict[str, list]:
+        counts: Dict[int, float] = {}
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        for token in tokens:
+            index = zlib.crc32(token.encode()) % self.dim
+            counts[index] = counts.get(index, 0.0) + 1.0
+        total = sum(counts.values()) or 1.0
+        return {"indices": list(counts), "values": [v / total for v in counts.values()]}
+
+    def encode_documents(self, texts):
+        return self._encode(texts) if isinstance(texts, str) else [self._encode(t) for t in texts]
+
+    def encode_queries(self, texts):
+        return self._encode(texts) if isinstance(texts, str) else [self._encode(t) for t in texts]
+
+def offline_retriever(embeddings=None, path: Optional[str] = None, top_k: int = Config.RETRIEVER_K, alpha: float = Config.RETRIEVER_ALPHA):
+    """PineconeHybridSearchRetriever over a fresh LocalHybridIndex and the stand-in encoders."""
+    from langchain_community.retrievers import PineconeHybridSearchRetriever
+    from src.rag.local_index import LocalHybridIndex
+
+    return PineconeHybridSearchRetriever(
+        embeddings=embeddings or tiny_embeddings(),
+        sparse_encoder=HashSparseEncoder(),
+        index=LocalHybridIndex(path or tempfile.mkdtemp(prefix="bench-index-")),
+        alpha=alpha,
+        top_k=top_k,
+    )
+
+class LocalUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile."""
+
+    def __init__(self, name: str, data: bytes):
+        super().__init__(data)
+        self.name = name
+
+def _pdf(pages: List[str]) -> bytes:
+    """Minimal PDF with one Helvetica text line per page (enough for pypdf to extract)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        safe = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 10 Tf 40 800 Td ({safe}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {content} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = io.BytesIO(), []
+    out.write(b"%PDF-1.4\n")
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+def _docx(paragraphs: List[str]) -> bytes:
+    """Minimal .docx (just word/document.xml, which is what docx2txt reads)."""
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    )
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as zf:
+        zf.writestr("[Content_Types].xml", content_types)
+        zf.writestr("word/document.xml", document)
+    return out.getvalue()
+
+def sample_files(num_pages: int = 20) -> Dict[str, LocalUpload]:
+    """One synthetic upload per supported file type, with the same text content."""
+    pages = [doc.page_content for doc in synthetic_pages(num_pages)]
+    sentences = [s for page in pages for s in re.split(r"(?<=\.) ", page)]
+    csv_rows = "\n".join(f'{i},"{s}"' for i, s in enumerate(sentences))
+    return {
+        ".pdf": LocalUpload("sample.pdf", _pdf(pages)),
+        ".txt": LocalUpload("sample.txt", "\n\n".join(pages).encode()),
+        ".md": LocalUpload("sample.md", "\n\n".join(f"## Page {i}\n\n{p}" for i, p in enumerate(pages)).encode()),
+        ".docx": LocalUpload("sample.docx", _docx(pages)),
+        ".csv": LocalUpload("sample.csv", ("id,text\n" + csv_rows).encode()),
+    }
@@ -0,0 +1,59 @@
+"""Measure supervisor prompt size over a long thread for both trimming strategies.
+
+A scripted model answers every turn with a fixed-length reply and every fifth user
+message pastes a long document, so the count-based trim (first + last 9 messages) and the
+token-budgeted rolling summary can be compared without any API calls.
+
+Run from the repository root:
+    python -m benchmarks.prompt_growth --turns 60
+"""
+import argparse
+import itertools
+import statistics
+import uuid
+from langchain.agents import create_agent
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.stubs import RecordingChatModel, scripted_model
+from src.config import Config
+from src.rag.conversation import RollingSummaryMiddleware
+from src.rag.rag_agent import trim_messages
+
+def replies(text: str):
+    # Fresh message objects, the graph assigns ids to the messages it stores
+    return (AIMessage(content=text) for _ in itertools.count())
+
+def run(strategy: str, turns: int, answer_words: int, paste_words: int) -> list:
+    model = RecordingChatModel(messages=replies(" ".join(["answer"] * answer_words)))
+    if strategy == "tokens":
+        summarizer = scripted_model(replies(" ".join(["summary"] * 150)))
+        middleware = [RollingSummaryMiddleware(summarizer)]
+    else:
+        middleware = [trim_messages]
+
+    agent = create_agent(model=model, tools=[], checkpointer=InMemorySaver(), middleware=middleware)
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+    for turn in range(turns):
+        text = f"Question {turn}: explain the next concept."
+        if turn % 5 == 4:
+            text += " Here is the document: " + " ".join(["lorem"] * paste_words)
+        agent.invoke({"messages": [{"role": "user", "content": text}]}, config=config)
+    return model.prompt_tokens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--answer-words", type=int, default=250)
+    parser.add_argument("--paste-words", type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"Budget: TRIM_MAX_TOKENS={Config.TRIM_MAX_TOKENS}, TRIM_KEEP_TOKENS={Config.TRIM_KEEP_TOKENS}\n")
+    print(f"{'strategy':<8} {'mean':>7} {'p95':>7} {'max':>7} {'last':>7}  (estimated prompt tokens per call)")
+    for strategy in ("count", "tokens"):
+        sizes = run(strategy, args.turns, args.answer_words, args.paste_words)
+        p95 = statistics.quantiles(sizes, n=20)[-1]
+        print(f"{strategy:<8} {statistics.fmean(sizes):>7.0f} {p95:>7.0f} {max(sizes):>7} {sizes[-1]:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compare the torch and ONNX int8 reranker backends.
+
+Run from the repository root:
+    python -m benchmarks.reranker_backends --queries 20 --candidates 20
+"""
+import argparse
+import multiprocessing as mp
+import queue as queue_module
+import statistics
+import time
+import numpy as np
+from benchmarks.common import peak_rss_mb
+
+QUERIES = [
+    "What is the difference between unit testing and integration testing?",
+    "Explain the SOLID principles in object-oriented design.",
+    "How does the waterfall model handle changing requirements?",
+    "What are the responsibilities of a scrum master?",
+]
+
+PASSAGES = [
+    "Unit tests verify a single function or class in isolation, usually with dependencies mocked out.",
+    "Integration tests exercise several components together to check that their interfaces agree.",
+    "The Single Responsibility Principle states that a class should have only one reason to change.",
+    "In the waterfall model each phase must be completed before the next phase begins.",
+    "A scrum master facilitates the sprint events and removes impediments for the development team.",
+    "Requirements elicitation gathers needs from stakeholders through interviews and workshops.",
+    "Continuous integration merges developer changes into the main branch several times a day.",
+    "The Liskov Substitution Principle requires subtypes to be usable wherever their base type is.",
+]
+
+def build_pairs(num_queries: int, num_candidates: int) -> list:
+    """Build one list of [query, passage] pairs per query."""
+    batches = []
+    for q in range(num_queries):
+        query = QUERIES[q % len(QUERIES)]
+        batches.append([[query, PASSAGES[c % len(PASSAGES)]] for c in range(num_candidates)])
+    return batches
+
+def run_backend(backend: str, num_queries: int, num_candidates: int, queue) -> None:
+    """Load one backend in a fresh process and time per-query scoring."""
+    from src.rag.reranker import load_reranker, score_pairs
+
+    start = time.perf_counter()
+    reranker = load_reranker(backend)
+    load_s = time.perf_counter() - start
+
+    batches = build_pairs(num_queries, num_candidates)
+    # Warm-up pass so one-off graph initialisation is not counted
+    score_pairs(batches[0], reranker=reranker)
+
+    latencies = []
+    scores = []
+    for pairs in batches:
+        start = time.perf_counter()
+        scores.append(score_pairs(pairs, reranker=reranker))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    queue.put({
+        "backend": backend,
+        "load_s": load_s,
+        "p50_ms": statistics.median(latencies),
+        "mean_ms": statistics.fmean(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+        "scores": np.stack(scores),
+    })
+
+def check_parity(reference: np.ndarray, candidate: np.ndarray, top_n: int) -> dict:
+    """Compare two [num_queries, num_candidates] score matrices."""
+    max_abs_diff = float(np.max(np.abs(reference - candidate)))
+    overlaps = []
+    for ref_row, cand_row in zip(reference, candidate):
+        ref_top = set(np.argsort(ref_row)[::-1][:top_n])
+        cand_top = set(np.argsort(cand_row)[::-1][:top_n])
+        overlaps.append(len(ref_top & cand_top) / top_n)
+    return {"max_abs_diff": max_abs_diff, "top_n_overlap": float(np.mean(overlaps))}
+
+def collect_result(proc, queue, poll_s: float = 1.0):
+    """Result the child put on `queue`, or None if it exited without one (e.g. killed when
+    it ran out of memory loading the model)."""
+    while True:
+        try:
+            return queue.get(timeout=poll_s)
+        except queue_module.Empty:
+            if proc.exitcode is not None:
+                # The child may have put its result just before exiting
+                try:
+                    return queue.get(timeout=poll_s)
+                except queue_module.Empty:
+                    return None
+
+def main():
+    from src.config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=Config.RETRIEVER_K)
+    parser.add_argument("--top-n", type=int, default=Config.RERANKER_TOP_N)
+    args = parser.parse_args()
+
+    # Each backend runs in its own process so peak RSS is not shared
+    ctx = mp.get_context("spawn")
+    results = {}
+    for backend in ("torch", "onnx"):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, args.queries, args.candidates, queue))
+        proc.start()
+        result = collect_result(proc, queue)
+        proc.join()
+        if result is None:
+            print(f"{backend} backend failed (exit code {proc.exitcode}), skipped")
+            continue
+        results[backend] = result
+
+    print(f"{'backend':<8} {'load (s)':>9} {'p50 (ms)':>9} {'mean (ms)':>10} {'peak RSS (MB)':>14}")
+    for backend, res in results.items():
+        print(f"{backend:<8} {res['load_s']:>9.1f} {res['p50_ms']:>9.1f} {res['mean_ms']:>10.1f} {res['peak_rss_mb']:>14.0f}")
+
+    if len(results) < 2:
+        return
+    parity = check_parity(results["torch"]["scores"], results["onnx"]["scores"], args.top_n)
+    print(f"\nParity: max |score diff| = {parity['max_abs_diff']:.4f}, "
+          f"top-{args.top_n} overlap = {parity['top_n_overlap']:.0%}")
+
+if __name__ == "__main__":
+    main()
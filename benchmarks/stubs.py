@@ -0,0 +1,100 @@
+"""Offline stand-ins for the chat model and sub-agents used by the benchmark scripts."""
+import asyncio
+import hashlib
+import time
+import uuid
+from typing import Any, List, Tuple
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+from src.rag.tokens import message_tokens
+
+class ScriptedChatModel(GenericFakeChatModel):
+    """Fake chat model that replays a fixed list of AIMessages and accepts tool binding."""
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        return self
+
+class RecordingChatModel(ScriptedChatModel):
+    """Scripted model that records the estimated token size of every prompt it receives."""
+
+    prompt_tokens: List[int] = Field(default_factory=list)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompt_tokens.append(sum(message_tokens(m) for m in messages))
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+def scripted_model(responses: List[AIMessage]) -> ScriptedChatModel:
+    return ScriptedChatModel(messages=iter(responses))
+
+class StubSubAgent:
+    """Sub-agent stand-in that sleeps for a fixed latency and returns a canned answer."""
+
+    def __init__(self, answer: str, latency: float):
+        self.answer = answer
+        self.latency = latency
+
+    def invoke(self, inputs: dict, config: Any = None, **kwargs) -> dict:
+        time.sleep(self.latency)
+        return {"messages": [AIMessage(content=self.answer)]}
+
+    async def ainvoke(self, inputs: dict, config: Any = None, **kwargs) -> dict:
+        await asyncio.sleep(self.latency)
+        return {"messages": [AIMessage(content=self.answer)]}
+
+class ReplayChatModel(BaseChatModel):
+    """Deterministic chat model with a fixed latency per call, safe to share across threads.
+
+    With tools bound, a user message is answered with a call to the first tool (preferring
+    `ask_knowledge_base`) passing the message as the query; anything else gets a canned
+    answer of `answer_words` words derived from a hash of the prompt.
+    """
+
+    latency: float = 0.5
+    answer_words: int = 120
+    tool_names: Tuple[str, ...] = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any):
+        names = tuple(getattr(tool, "name", None) or tool.__name__ for tool in tools)
+        return self.model_copy(update={"tool_names": names})
+
+    def _reply(self, messages) -> AIMessage:
+        last = messages[-1]
+        if self.tool_names and isinstance(last, HumanMessage):
+            tool = "ask_knowledge_base" if "ask_knowledge_base" in self.tool_names else self.tool_names[0]
+            call = {"name": tool, "args": {"query": str(last.content)}, "id": f"call_{uuid.uuid4().hex}"}
+            return AIMessage(content="", tool_calls=[call])
+
+        digest = hashlib.sha256("".join(str(m.content) for m in messages).encode()).hexdigest()
+        return AIMessage(content=" ".join(digest[8 * i % 56:8 * i % 56 + 8] for i in range(self.answer_words)))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+class StubSearchTool:
+    """Stand-in for TavilySearch with a fixed latency and canned results."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def _results(self, query: str) -> dict:
+        return {"query": query, "results": [{"url": "https://example.com", "title": "Example", "content": f"Results for {query}"}]}
+
+    def invoke(self, query: str, *args, **kwargs) -> dict:
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def ainvoke(self, query: str, *args, **kwargs) -> dict:
+        await asyncio.sleep(self.latency)
+        return self._results(query)
@@ -1,7 +1,8 @@
+import asyncio
 import uuid
 from typing import Dict, Any
-from langsmith import evaluate, Client
-from src.rag.rag_agent import Agent
+from langsmith import aevaluate, evaluate, Client
+from src.rag.rag_agent import Agent, AsyncAgent
 
 def get_input_query(inputs: Dict[str, Any]) -> str:
     """Extract the user query from dataset inputs using common keys."""
@@ -15,6 +16,22 @@ def get_input_query(inputs: Dict[str, Any]) -> str:
         raise ValueError(f"Could not find query in inputs. Available keys: {list(inputs.keys())}")
     return query
 
+def extract_answer(response: Dict[str, Any]) -> Dict[str, str]:
+    """Extract the final answer text from an agent response."""
+    messages = response.get("messages", [])
+    if not messages:
+        return {"output": "Error: No response generated"}
+        
+    content = messages[-1].content
+    
+    # Handle both string and complex list content types
+    if isinstance(content, list):
+        answer = "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    else:
+        answer = str(content)
+
+    return {"output": answer}
+
 def run_evaluation(dataset_name: str, experiment_prefix: str, max_concurrency: int):
     """Run the LangSmith evaluation suite."""
     print("--- Initializing Agent ---")
@@ -36,19 +53,7 @@ def run_evaluation(dataset_name: str, experiment_prefix: str, max_concurrency: i
         )
 
         # 4. Extract Answer from Message Objects
-        messages = response.get("messages", [])
-        if not messages:
-            return {"output": "Error: No response generated"}
-            
-        content = messages[-1].content
-        
-        # Handle both string and complex list content types
-        if isinstance(content, list):
-            answer = "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
-        else:
-            answer = str(content)
-
-        return {"output": answer}
+        return extract_answer(response)
 
     print(f"🚀 Starting Eval: {dataset_name}")
 
@@ -61,17 +66,59 @@ def run_evaluation(dataset_name: str, experiment_prefix: str, max_concurrency: i
             max_concurrency=max_concurrency,
             client=client
         )
-        print(f"\n✅ Evaluation Task Submitted! Check results in LangSmith UI.")
+        print("\n✅ Evaluation Task Submitted! Check results in LangSmith UI.")
         return results
         
     except Exception as e:
         print(f"\n❌ Evaluation Failed: {e}")
         raise
 
+async def arun_evaluation(dataset_name: str, experiment_prefix: str, max_concurrency: int):
+    """Run the LangSmith evaluation suite on the async agent, many examples per worker."""
+    print("--- Initializing Async Agent ---")
+    rag_agent = await AsyncAgent.create()
+    client = Client()
+
+    async def target(inputs: Dict[str, Any]) -> Dict[str, str]:
+        query = get_input_query(inputs)
+        print(f"👉 Processing: {query[:50]}...")
+
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        response = await rag_agent.agent.ainvoke(
+            {"messages": [{"role": "user", "content": query}]},
+            config=config
+        )
+        return extract_answer(response)
+
+    print(f"🚀 Starting Async Eval: {dataset_name}")
+
+    try:
+        results = await aevaluate(
+            target,
+            data=dataset_name,
+            evaluators=[],  # Built-in 'Correctness' evaluator triggered via LangSmith UI
+            experiment_prefix=experiment_prefix,
+            max_concurrency=max_concurrency,
+            client=client
+        )
+        print("\n✅ Evaluation Task Submitted! Check results in LangSmith UI.")
+        return results
+
+    except Exception as e:
+        print(f"\n❌ Evaluation Failed: {e}")
+        raise
+
+    finally:
+        await rag_agent.aclose()
+
 if __name__ == "__main__":
     
     DATASET_NAME = "ds-enchanted-thump-19"
     EXPERIMENT_PREFIX = "rag-agent-eval"
     MAX_CONCURRENCY = 1
+    USE_ASYNC = False
 
-    run_evaluation(dataset_name=DATASET_NAME, experiment_prefix=EXPERIMENT_PREFIX, max_concurrency=MAX_CONCURRENCY)
\ No newline at end of file
+    if USE_ASYNC:
+        asyncio.run(arun_evaluation(dataset_name=DATASET_NAME, experiment_prefix=EXPERIMENT_PREFIX, max_concurrency=MAX_CONCURRENCY))
+    else:
+        run_evaluation(dataset_name=DATASET_NAME, experiment_prefix=EXPERIMENT_PREFIX, max_concurrency=MAX_CONCURRENCY)
\ No newline at end of file
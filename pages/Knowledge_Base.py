@@ -4,14 +4,18 @@ import pandas as pd
 from firebase_admin import firestore
 from math import ceil
 import io
+import multiprocessing
+import os
 import zipfile
 import base64
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from src.config import Config
 from src.firebase_init import firebase_init
 from google.cloud.firestore_v1 import FieldFilter
-from src.rag.data_loader import load_documents
-from src.rag.text_splitter import chunk_documents
-from src.rag.vectorstore import index_documents, delete_index
+from src.rag.data_loader import lazy_load_documents, parse_file, read_chunks
+from src.rag.text_splitter import iter_chunks
+from src.rag.vectorstore import sync_documents, delete_index
 
 # --- Firebase Initialization ---
 try:
@@ -25,54 +29,71 @@ st.title("📝 Knowledge Base")
 
 # --- Functions ---
 def ingest_files(uploaded_file, ref_id: str):
-    # Load the documents for indexing 
-    documents = load_documents(uploaded_file, ref_id)
-    st.toast(f"📄 Loaded {len(documents)} pages of documents...", icon='⏳')
+    # Stream pages -> chunks -> batched indexing, so memory stays bounded for large files
+    documents = lazy_load_documents(uploaded_file, ref_id)
+    chunks = iter_chunks(documents)
+
+    # Report throughput as each batch lands (the total is unknown while streaming)
+    progress = st.empty()
+    progress.caption(f"Indexing {uploaded_file.name}...")
+    indexed = 0
+
+    def on_batch(batch_stats):
+        nonlocal indexed
+        indexed += batch_stats.chunks
+        progress.caption(f"Indexed {indexed} chunks of {uploaded_file.name} ({batch_stats.chunks_per_second:.1f} chunks/s)")
+
+    # Only new or changed chunks are embedded, stale ones from a previous upload are removed
+    sync_stats = sync_documents(chunks, ref_id, on_batch=on_batch)
+    progress.empty()
+    st.toast(
+        f"📚 Indexed {sync_stats.added} new chunks, removed {sync_stats.deleted} stale, "
+        f"skipped {sync_stats.unchanged} unchanged.",
+        icon='⏳',
+    ) 
     
-    # Chunk the documents
-    chunks = chunk_documents(documents)
-    st.toast(f"✂️ Split {uploaded_file.name} into {len(chunks)} chunks.", icon='⏳') 
-         
-    # Index these documents 
-    index_documents(chunks)
-    st.toast(f"📚 Indexed {len(chunks)} chunks to Vector Store.", icon='⏳') 
+def store_file(uploaded_file) -> str:
+    """Upload a file to Firebase Storage, upsert its Firestore metadata and return the doc id (ref_id)."""
+    # 1. Upload to Firebase Storage
+    file_path = f"knowledge_base/{uploaded_file.name}"
+    blob = bucket.blob(file_path)
     
+    # Ensure file pointer is at the beginning
+    uploaded_file.seek(0)
+    blob.upload_from_file(uploaded_file, content_type=uploaded_file.type)
+
+    # 2. Store Metadata in Firestore
+    file_metadata = {
+        "name": uploaded_file.name,
+        "type": uploaded_file.type,
+        "path": file_path,
+        "date": firestore.SERVER_TIMESTAMP,
+        "file_size": uploaded_file.size
+    }
+    
+    # Check if file with same name exists
+    existing_docs = list(db.collection("knowledge_base").where(filter=FieldFilter("name", "==", uploaded_file.name)).stream())   
+    if existing_docs:
+        # Update existing document
+        doc_ref = existing_docs[0].reference
+        doc_ref.update(file_metadata)
+    else:
+        # Add new document
+        update_time, doc_ref = db.collection("knowledge_base").add(file_metadata)
+
+    # Reset file pointer before ingesting
+    uploaded_file.seek(0)
+    return doc_ref.id
+
 def upload_files(uploaded_files):    
     for uploaded_file in uploaded_files:
         st.write(f"Uploading {uploaded_file.name}...")
         try:
-            # 1. Upload to Firebase Storage
-            file_path = f"knowledge_base/{uploaded_file.name}"
-            blob = bucket.blob(file_path)
-            
-            # Ensure file pointer is at the beginning
-            uploaded_file.seek(0)
-            blob.upload_from_file(uploaded_file, content_type=uploaded_file.type)
-
-            # 2. Store Metadata in Firestore
-            file_metadata = {
-                "name": uploaded_file.name,
-                "type": uploaded_file.type,
-                "path": file_path,
-                "date": firestore.SERVER_TIMESTAMP,
-                "file_size": uploaded_file.size
-            }
-            
-            # Check if file with same name exists
-            existing_docs = list(db.collection("knowledge_base").where(filter=FieldFilter("name", "==", uploaded_file.name)).stream())   
-            if existing_docs:
-                # Update existing document
-                doc_ref = existing_docs[0].reference
-                doc_ref.update(file_metadata)
-            else:
-                # Add new document
-                update_time, doc_ref = db.collection("knowledge_base").add(file_metadata)
-
-            # Reset file pointer before ingesting
-            uploaded_file.seek(0)
+            # 1-2. Upload to Firebase Storage and store metadata in Firestore
+            ref_id = store_file(uploaded_file)
             
             # 3. Ingest the files
-            ingest_files(uploaded_file, ref_id=doc_ref.id) 
+            ingest_files(uploaded_file, ref_id=ref_id) 
             
             # Only show when all steps are successful
             st.success(f"✅ Successfully uploaded {uploaded_file.name}")
@@ -86,6 +107,66 @@ def upload_files(uploaded_files):
     # Refresh the page
     st.rerun()
 
+def upload_files_concurrently(uploaded_files):
+    """Storage/Firestore writes run on threads and parsing in processes, while embedding and
+    upserts happen one file at a time on the shared models as parsed files come in.
+
+    Parsed chunks come back through a spill file and are streamed into `sync_documents`, so
+    memory stays bounded per window as on the sequential path."""
+    status = {f.name: st.empty() for f in uploaded_files}
+    for uploaded_file in uploaded_files:
+        status[uploaded_file.name].write(f"⏳ Uploading {uploaded_file.name}...")
+
+    with ThreadPoolExecutor(max_workers=Config.INGEST_IO_WORKERS) as io_pool, \
+            ProcessPoolExecutor(
+                max_workers=Config.INGEST_PARSE_WORKERS,
+                # Forking this multithreaded process (model and batcher threads) can deadlock the children
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as parse_pool:
+        def store_and_parse(uploaded_file):
+            # Submit the parse from the I/O thread, so it starts while the main thread is busy indexing
+            ref_id = store_file(uploaded_file)
+            return ref_id, parse_pool.submit(parse_file, uploaded_file.name, uploaded_file.getvalue(), ref_id)
+
+        storing = {io_pool.submit(store_and_parse, f): f for f in uploaded_files}
+        parsing = {}
+
+        while storing or parsing:
+            done, _ = wait([*storing, *parsing], return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in storing:
+                    uploaded_file = storing.pop(future)
+                    name = uploaded_file.name
+                    try:
+                        # Stored, and already handed to a parser process
+                        ref_id, parse_future = future.result()
+                        parsing[parse_future] = (name, ref_id)
+                        status[name].write(f"📄 Parsing {name}...")
+                    except Exception as e:
+                        status[name].error(f"❌ Error uploading {name}: {e}")
+                    continue
+
+                name, ref_id = parsing.pop(future)
+                spill_path = None
+                try:
+                    spill_path = future.result()
+                    status[name].write(f"📚 Indexing {name}...")
+                    sync_stats = sync_documents(read_chunks(spill_path), ref_id)
+                    status[name].success(
+                        f"✅ Successfully uploaded {name} "
+                        f"({sync_stats.added} new, {sync_stats.deleted} stale, {sync_stats.unchanged} unchanged chunks)"
+                    )
+                except Exception as e:
+                    status[name].error(f"❌ Error uploading {name}: {e}")
+                finally:
+                    if spill_path and os.path.exists(spill_path):
+                        os.remove(spill_path)
+
+    fetch_files.clear()
+    time.sleep(1)
+    # Refresh the page
+    st.rerun()
+
 @st.cache_data()
 def fetch_files():
     """Fetches files from Firestore and formats metadata."""
@@ -182,7 +263,10 @@ with st.expander("Upload New Files", expanded=False):
         submitted = st.form_submit_button("Upload Files")
 
 if submitted and uploaded_files:
-    upload_files(uploaded_files)
+    if Config.INGEST_CONCURRENT and len(uploaded_files) > 1:
+        upload_files_concurrently(uploaded_files)
+    else:
+        upload_files(uploaded_files)
 
 # --- File Display Logic ---
 st.header("🗂️ Files")
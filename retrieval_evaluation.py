@@ -0,0 +1,220 @@
+"""Offline retrieval evaluation: sweep RETRIEVER_ALPHA, RETRIEVER_K and RERANKER_TOP_N.
+
+Runs hybrid retrieval and reranking for every query of a labelled dataset at every grid
+point and reports recall, MRR and per-query latency, then picks the cheapest configuration
+that meets the quality bar. No LangSmith or LLM calls are involved.
+
+The dataset is a JSON list of {"question": ..., "relevant_ids": [...]}, where the ids are
+vector ids as produced by `chunk_id` (the "id" of each source in the refs artifact).
+Recall is capped: hits / min(#relevant, depth), so a query with many relevant chunks can
+still reach 1.0. With --adaptive every grid point is also evaluated with cascaded reranking
+(`rerank_adaptive`), and the mean number of pairs scored per query is compared to fixed K.
+
+Run from the repository root:
+    python retrieval_evaluation.py --dataset labelled.json       # configured index and models
+    python retrieval_evaluation.py --offline                     # synthetic corpus and stand-in models
+    python retrieval_evaluation.py --offline --alphas 0.3 0.5 0.7 0.9 --ks 10 20 40 --min-recall 0.9
+    python retrieval_evaluation.py --offline --adaptive
+"""
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from src.config import Config
+
+@dataclass
+class QueryRun:
+    candidate_ids: List[str]
+    retrieve_seconds: float
+    # (mode, top_n) -> (reranked ids, rerank seconds, pairs scored)
+    reranked: Dict[Tuple[str, int], Tuple[List[str], float, int]]
+
+@dataclass
+class SweepResult:
+    mode: str
+    alpha: float
+    k: int
+    top_n: int
+    recall: float            # capped recall of the reranked top_n (what the model sees)
+    retrieval_recall: float  # capped recall of the K candidates before reranking
+    mrr: float
+    mean_ms: float
+    p95_ms: float
+    retrieve_ms: float
+    rerank_ms: float
+    pairs_scored: float
+
+def load_dataset(path: str) -> List[Dict[str, object]]:
+    with open(path, encoding="utf-8") as f:
+        dataset = json.load(f)
+    labelled = [item for item in dataset if item.get("relevant_ids")]
+    if len(labelled) < len(dataset):
+        print(f"Skipping {len(dataset) - len(labelled)} queries without relevant_ids")
+    return labelled
+
+def recall_at(ranked_ids: List[str], relevant: Set[str], depth: int) -> float:
+    hits = len(set(ranked_ids[:depth]) & relevant)
+    return hits / min(len(relevant), depth)
+
+def reciprocal_rank(ranked_ids: List[str], relevant: Set[str]) -> float:
+    for rank, id_ in enumerate(ranked_ids, start=1):
+        if id_ in relevant:
+            return 1 / rank
+    return 0.0
+
+def run_query(retriever, question: str, top_ns: List[int], adaptive: bool) -> QueryRun:
+    """Retrieve once, then rerank the candidates fixed (and adaptively, per top_n), timing each step."""
+    from src.rag.reranker import rerank_adaptive, rerank_documents
+    from src.rag.vectorstore import chunk_id
+
+    start = time.perf_counter()
+    candidates = retriever.invoke(question)
+    run = QueryRun([chunk_id(doc) for doc in candidates], time.perf_counter() - start, {})
+
+    # Reranking orders all K candidates, so every top_n is a prefix of one rerank at max(top_ns)
+    start = time.perf_counter()
+    reranked = [chunk_id(doc) for doc in rerank_documents(question, candidates, top_n=max(top_ns))]
+    seconds = time.perf_counter() - start
+    for top_n in top_ns:
+        run.reranked[("fixed", top_n)] = (reranked[:top_n], seconds, len(candidates))
+
+    if adaptive:
+        for top_n in top_ns:
+            start = time.perf_counter()
+            docs, pairs = rerank_adaptive(question, candidates, top_n=top_n, max_pairs=len(candidates))
+            run.reranked[("adaptive", top_n)] = ([chunk_id(doc) for doc in docs], time.perf_counter() - start, pairs)
+    return run
+
+def sweep(retriever, dataset: list, alphas: List[float], ks: List[int], top_ns: List[int], workers: int, adaptive: bool = False) -> List[SweepResult]:
+    """Evaluate every (mode, alpha, K, top_n) on the dataset, running queries across `workers` threads."""
+    retrievers = {(alpha, k): retriever.model_copy(update={"alpha": alpha, "top_k": k}) for alpha in alphas for k in ks}
+    tasks = [(alpha, k, i) for alpha, k in retrievers for i in range(len(dataset))]
+
+    def task(args):
+        alpha, k, i = args
+        return args, run_query(retrievers[(alpha, k)], dataset[i]["question"], top_ns, adaptive)
+
+    # Load models and caches outside the timed runs
+    run_query(retriever, dataset[0]["question"], top_ns, adaptive)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outputs = dict(pool.map(task, tasks))
+
+    results = []
+    for alpha, k in retrievers:
+        runs = [(outputs[(alpha, k, i)], set(item["relevant_ids"])) for i, item in enumerate(dataset)]
+        retrieval_recall = statistics.fmean(recall_at(run.candidate_ids, relevant, k) for run, relevant in runs)
+        retrieve_ms = [1000 * run.retrieve_seconds for run, _ in runs]
+        for mode in ["fixed", "adaptive"] if adaptive else ["fixed"]:
+            for top_n in top_ns:
+                reranked = [(run.reranked[(mode, top_n)], relevant) for run, relevant in runs]
+                rerank_ms = [1000 * seconds for (_, seconds, _), _ in reranked]
+                totals = [r + rr for r, rr in zip(retrieve_ms, rerank_ms)]
+                results.append(SweepResult(
+                    mode=mode,
+                    alpha=alpha,
+                    k=k,
+                    top_n=top_n,
+                    recall=statistics.fmean(recall_at(ids, relevant, top_n) for (ids, _, _), relevant in reranked),
+                    retrieval_recall=retrieval_recall,
+                    mrr=statistics.fmean(reciprocal_rank(ids, relevant) for (ids, _, _), relevant in reranked),
+                    mean_ms=statistics.fmean(totals),
+                    p95_ms=statistics.quantiles(totals, n=20)[-1] if len(totals) > 1 else totals[0],
+                    retrieve_ms=statistics.fmean(retrieve_ms),
+                    rerank_ms=statistics.fmean(rerank_ms),
+                    pairs_scored=statistics.fmean(pairs for (_, _, pairs), _ in reranked),
+                ))
+    return results
+
+def cheapest(results: List[SweepResult], min_recall: float, min_mrr: float) -> Optional[SweepResult]:
+    """Lowest mean latency among configurations meeting the bar (fewer pairs, then fewer docs, on ties)."""
+    passing = [r for r in results if r.recall >= min_recall and r.mrr >= min_mrr]
+    return min(passing, key=lambda r: (r.mean_ms, r.pairs_scored, r.top_n), default=None)
+
+def offline_setup(num_pages: int):
+    """Synthetic corpus indexed with the stand-in models, and its labelled queries."""
+    import src.rag.reranker as reranker_module
+    from benchmarks.offline import labelled_queries, offline_retriever, synthetic_pages, tiny_reranker
+    from src.rag.text_splitter import chunk_documents
+    from src.rag.vectorstore import index_documents
+
+    reranker = tiny_reranker()
+    reranker_module.get_reranker_model = lambda: reranker
+
+    chunks = chunk_documents(synthetic_pages(num_pages))
+    retriever = offline_retriever()
+    index_documents(chunks, retriever=retriever)
+    return retriever, labelled_queries(chunks)
+
+def print_results(results: List[SweepResult], best: Optional[SweepResult]) -> None:
+    print(f"\n{'mode':<8} {'alpha':>5} {'K':>4} {'top_n':>5} {'recall':>7} {'cand.recall':>11} {'MRR':>6} "
+          f"{'mean ms':>8} {'p95 ms':>8} {'retr. ms':>8} {'rerank ms':>9} {'pairs':>6}")
+    for r in sorted(results, key=lambda r: (r.alpha, r.k, r.top_n, r.mode)):
+        mark = "  <- cheapest" if r is best else ""
+        print(f"{r.mode:<8} {r.alpha:>5.2f} {r.k:>4} {r.top_n:>5} {r.recall:>7.3f} {r.retrieval_recall:>11.3f} {r.mrr:>6.3f} "
+              f"{r.mean_ms:>8.1f} {r.p95_ms:>8.1f} {r.retrieve_ms:>8.1f} {r.rerank_ms:>9.1f} {r.pairs_scored:>6.1f}{mark}")
+
+def print_pairs_comparison(results: List[SweepResult]) -> None:
+    """Mean pairs scored per query and quality, adaptive vs fixed, for each K and top_n (all alphas)."""
+    print(f"\n{'K':>4} {'top_n':>5} {'fixed pairs':>11} {'adaptive pairs':>14} {'saved':>6} {'recall fixed/adaptive':>22} {'rerank ms fixed/adaptive':>25}")
+    groups: Dict[Tuple[int, int], Dict[str, List[SweepResult]]] = {}
+    for r in results:
+        groups.setdefault((r.k, r.top_n), {}).setdefault(r.mode, []).append(r)
+    for (k, top_n), modes in sorted(groups.items()):
+        fixed, adaptive = modes["fixed"], modes["adaptive"]
+        fixed_pairs = statistics.fmean(r.pairs_scored for r in fixed)
+        adaptive_pairs = statistics.fmean(r.pairs_scored for r in adaptive)
+        saved = 1 - adaptive_pairs / fixed_pairs if fixed_pairs else 0.0
+        recall = f"{statistics.fmean(r.recall for r in fixed):.3f}/{statistics.fmean(r.recall for r in adaptive):.3f}"
+        rerank_ms = f"{statistics.fmean(r.rerank_ms for r in fixed):.1f}/{statistics.fmean(r.rerank_ms for r in adaptive):.1f}"
+        print(f"{k:>4} {top_n:>5} {fixed_pairs:>11.1f} {adaptive_pairs:>14.1f} {saved:>6.0%} {recall:>22} {rerank_ms:>25}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", help="labelled JSON dataset (required unless --offline)")
+    parser.add_argument("--offline", action="store_true", help="synthetic corpus, labels and stand-in models")
+    parser.add_argument("--pages", type=int, default=200, help="synthetic pages indexed with --offline")
+    parser.add_argument("--alphas", type=float, nargs="+", default=[0.3, 0.5, 0.7, 0.9])
+    parser.add_argument("--ks", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--top-ns", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--min-recall", type=float, default=0.8)
+    parser.add_argument("--min-mrr", type=float, default=0.0)
+    parser.add_argument("--adaptive", action="store_true", help="also evaluate cascaded reranking")
+    parser.add_argument("--workers", type=int, default=4, help="queries evaluated in parallel")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    # Every grid point should pay for its own encoding and scoring
+    Config.QUERY_CACHE_ENABLED = False
+    Config.RERANK_CACHE_ENABLED = False
+    Config.MICRO_BATCHING = False
+    Config.RERANK_MICRO_BATCHING = False
+
+    if args.offline:
+        retriever, dataset = offline_setup(args.pages)
+    elif args.dataset:
+        from src.rag.retriever import hybrid_retriever
+        retriever, dataset = hybrid_retriever(), load_dataset(args.dataset)
+    else:
+        parser.error("--dataset is required unless --offline is given")
+
+    print(f"{len(dataset)} queries, {len(args.alphas) * len(args.ks) * len(args.top_ns)} configurations, "
+          f"current: alpha={Config.RETRIEVER_ALPHA} K={Config.RETRIEVER_K} top_n={Config.RERANKER_TOP_N}")
+    results = sweep(retriever, dataset, args.alphas, args.ks, args.top_ns, args.workers, args.adaptive)
+    best = cheapest(results, args.min_recall, args.min_mrr)
+    print_results(results, best)
+
+    if best is None:
+        print(f"\nNo configuration reaches recall >= {args.min_recall} and MRR >= {args.min_mrr}")
+    else:
+        print(f"\nCheapest meeting the bar: {best.mode} RETRIEVER_ALPHA={best.alpha} RETRIEVER_K={best.k} RERANKER_TOP_N={best.top_n} "
+              f"(recall {best.recall:.3f}, MRR {best.mrr:.3f}, {best.mean_ms:.1f} ms/query)")
+
+    if args.adaptive:
+        print_pairs_comparison(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
@@ -1,5 +1,5 @@
 import os
-import torch
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -22,21 +22,75 @@ class Config:
     DB_CONNECTION_KWARGS = {"autocommit": True, "prepare_threshold": None}
     DB_MAX_SIZE = 20
 
+    # Checkpointer Backend: "postgres" (DB_URI), "sqlite" (single node) or "memory" (local testing)
+    CHECKPOINTER_BACKEND = os.environ.get("CHECKPOINTER_BACKEND", "postgres").lower()
+    CHECKPOINTER_SQLITE_PATH = os.environ.get("CHECKPOINTER_SQLITE_PATH", ".cache/checkpoints.sqlite")
+
+    # Checkpoint Maintenance (python -m src.rag.checkpoints, or in-process when enabled)
+    CHECKPOINT_MAINTENANCE_ENABLED = os.environ.get("CHECKPOINT_MAINTENANCE_ENABLED", "false").lower() == "true"
+    CHECKPOINT_MAINTENANCE_INTERVAL = 3600  # seconds between in-process runs
+    CHECKPOINT_MAINTENANCE_BATCH = 500  # threads per delete transaction
+    CHECKPOINT_COMPACT_AFTER = 24 * 3600  # idle seconds before a thread is compacted to its latest checkpoint
+    CHECKPOINT_THREAD_TTL = 30 * 24 * 3600  # idle seconds before a thread is deleted
+
+    # Conversation Trimming: "count" (first + last 9 messages) or "tokens" (budget + rolling summary, opt-in: one extra LLM call per trim)
+    TRIM_STRATEGY = os.environ.get("TRIM_STRATEGY", "count").lower()
+    TRIM_MAX_TOKENS = 6000  # estimated history tokens that trigger a trim
+    TRIM_KEEP_TOKENS = 3000  # recent history kept verbatim after a trim
+
+    # Run the chat agent on AsyncPostgresSaver / ainvoke (one shared event loop per process)
+    AGENT_ASYNC = os.environ.get("AGENT_ASYNC", "false").lower() == "true"
+
+    # Latency Instrumentation (per-stage histograms, see src/rag/telemetry.py)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_PORT = int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None  # Prometheus endpoint
+    METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")  # set to 0.0.0.0 to let a remote Prometheus scrape it
+    METRICS_JSON_LOG = os.environ.get("METRICS_JSON_LOG")  # JSON lines file, one entry per turn
+    SHOW_STAGE_TIMINGS = os.environ.get("SHOW_STAGE_TIMINGS", "false").lower() == "true"  # breakdown in the chat status panel
+
     # Model Configuration 
     CHAT_MODEL_NAME = "google_genai:gemini-2.5-flash"
     CHAT_MODEL_TEMPERATURE = 0.7
     CHAT_MODEL_TIMEOUT = 30
     CHAT_MODEL_MAX_TOKENS = 1000
 
+    # Answer knowledge-base questions with retrieve + rerank + one LLM call instead of a tool-calling sub-agent (opt-in)
+    KNOWLEDGE_FAST_PATH = os.environ.get("KNOWLEDGE_FAST_PATH", "false").lower() == "true"
+
+    # Local Intent Router (embedding similarity to labelled exemplars, falls back to the supervisor)
+    ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "false").lower() == "true"
+    ROUTER_THRESHOLD = 0.75  # minimum cosine similarity to the closest exemplar
+    ROUTER_MARGIN = 0.05  # minimum lead over the runner-up intent
+
     # Embeddings Model Configuration
     EMBEDDINGS_MODEL = "BAAI/bge-m3"
     EMBEDDINGS_MODEL_ENCODE_KWARGS = {'normalize_embeddings': True}
-    EMBEDDINGS_MODEL_KWARGS = {"device": "cuda" if torch.cuda.is_available() else "cpu"}
+    EMBEDDINGS_MODEL_KWARGS = {}  # the device is added at load time, see get_device()
+
+    # Device for the embedding model and reranker ("cuda" or "cpu"), unset auto-detects on first model load
+    DEVICE = os.environ.get("DEVICE")
+
+    # Load the models and open connections in background threads while the first page renders
+    WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
     
     # Pinecone Index Configuration
     PINECONE_INDEX_NAME = "knowledge-base"
     #PINECONE_INDEX_NAME = "hybrid-search-index"
 
+    # Vector Store Backend: "pinecone" or "local" (in-process, memory-mapped index on disk)
+    VECTORSTORE_BACKEND = os.environ.get("VECTORSTORE_BACKEND", "pinecone").lower()
+    LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", ".cache/local-index")
+
+    # Ingestion Pipeline Configuration
+    INDEX_BATCH_SIZE = 64  # chunks embedded per batch
+    INDEX_UPSERT_WORKERS = 4  # concurrent upserts (also caps batches held in memory)
+    INGEST_WINDOW_SIZE = 256  # chunks held in memory at once while streaming a file
+
+    # Multi-file Upload Configuration
+    INGEST_CONCURRENT = os.environ.get("INGEST_CONCURRENT", "true").lower() == "true"
+    INGEST_IO_WORKERS = 8  # threads for Firebase Storage uploads and Firestore writes
+    INGEST_PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # processes for parsing and chunking
+
     # Text Splitter Configuration
     TEXT_SPLITTER_CHUNK_SIZE = 400
     TEXT_SPLITTER_CHUNK_OVERLAP = 50
@@ -45,11 +99,51 @@ class Config:
     # Configure Reranker model
     RERANKER_MODEL = "BAAI/bge-reranker-v2-m3"
     RERANKER_TOP_N = 5
+    # "torch" (fp32 / fp16 on GPU) or "onnx" (int8 dynamic-quantized ONNX Runtime graph, CPU)
+    RERANKER_BACKEND = os.environ.get("RERANKER_BACKEND", "torch").lower()
+    RERANKER_ONNX_DIR = os.environ.get("RERANKER_ONNX_DIR", ".cache/reranker-onnx-int8")
+
+    # Rerank Score Cache Configuration
+    RERANK_CACHE_ENABLED = os.environ.get("RERANK_CACHE_ENABLED", "true").lower() == "true"
+    RERANK_CACHE_SIZE = 50_000  # (query, chunk) pairs kept in memory
+    RERANK_CACHE_PATH = os.environ.get("RERANK_CACHE_PATH")  # SQLite file, unset keeps the cache in memory only
+    RERANK_CACHE_DISK_ROWS = 1_000_000  # scores kept in the SQLite file, oldest writes evicted first
+
+    # Micro-batching: concurrent query embeddings from all sessions share one forward pass
+    MICRO_BATCHING = os.environ.get("MICRO_BATCHING", "true").lower() == "true"
+    # Same for rerank calls (opt-in: padding RETRIEVER_K pairs per caller into one batch measured slower than direct calls)
+    RERANK_MICRO_BATCHING = os.environ.get("RERANK_MICRO_BATCHING", "false").lower() == "true"
+    MICRO_BATCH_WAIT_MS = 5  # how long the first request waits for others to join
+    MICRO_BATCH_MAX_TOKENS = 8192  # estimated tokens per batch
 
     # Retriever Configuration 
     RETRIEVER_ALPHA = 0.7
     RETRIEVER_K = 20
 
+    # Adaptive reranking: cross-encode only the candidates whose hybrid scores are close to the top_n cut
+    ADAPTIVE_RERANK = os.environ.get("ADAPTIVE_RERANK", "false").lower() == "true"
+    ADAPTIVE_RERANK_MARGIN = 0.15  # fraction of the hybrid score spread below the top_n-th score
+    ADAPTIVE_RERANK_STEP = 5  # candidates added per cascade stage
+    ADAPTIVE_RERANK_MAX = RETRIEVER_K  # most pairs scored per query
+
+    # retrieve_context artifact: "documents" (full chunks) or "refs" (chunk ids + scores, rehydrated from the index on demand)
+    ARTIFACT_MODE = os.environ.get("ARTIFACT_MODE", "documents").lower()
+
+    # Context Packing Configuration (retrieve_context output, opt-in)
+    CONTEXT_PACKING = os.environ.get("CONTEXT_PACKING", "false").lower() == "true"
+    CONTEXT_TOKEN_BUDGET = 1500  # estimated tokens of retrieved context per call
+    CONTEXT_CHARS_PER_TOKEN = 4  # rough characters-per-token ratio used for the estimate
+
+    # Query Vector Cache Configuration (dense + sparse query encodings)
+    QUERY_CACHE_ENABLED = os.environ.get("QUERY_CACHE_ENABLED", "true").lower() == "true"
+    QUERY_CACHE_SIZE = 2048
+    QUERY_CACHE_TTL = 3600  # seconds
+
+    # Semantic Answer Cache Configuration (opt-in)
+    ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = 0.92  # cosine similarity between questions
+    ANSWER_CACHE_SIZE = 1000
+
     # Agent Prompt
     SUPERVISOR_PROMPT = (
         "You are an intelligent Supervisor Agent acting as a wise Socratic Tutor."
@@ -87,4 +181,12 @@ class Config:
         "Summarize the key findings clearly."
         "Ensure the information is current and factually accurate."
         "ALWAYS list the source URLs used at the end of your response."
-    )
\ No newline at end of file
+    )
+
+@lru_cache(maxsize=None)
+def get_device() -> str:
+    # torch takes seconds to import, only do it once a model is actually loaded
+    if Config.DEVICE:
+        return Config.DEVICE
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
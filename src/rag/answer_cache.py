@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import numpy as np
+import streamlit as st
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+from langchain.agents import AgentState
+from langchain.agents.middleware import AgentMiddleware, hook_config
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.runtime import Runtime
+from src.config import Config
+from src.rag.retriever import get_embedding_model
+from src.rag.tokens import message_text
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    ref_ids: set = field(default_factory=set)
+    # True when the answer came from the knowledge base, even if no chunk matched
+    uses_knowledge_base: bool = False
+
+class SemanticAnswerCache:
+    """Nearest-neighbour cache of final answers keyed by the question embedding."""
+
+    def __init__(self, embeddings: Embeddings, threshold: float, max_size: int):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: List[CachedAnswer] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question: str) -> Optional[CachedAnswer]:
+        vector = self._embed(question)
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return self._entries[best]
+
+    def add(self, entry: CachedAnswer) -> None:
+        vector = self._embed(entry.question)
+        with self._lock:
+            self._entries.append(entry)
+            self._matrix = vector[None, :] if self._matrix is None else np.vstack([self._matrix, vector])
+
+            # Evict the oldest entries first
+            overflow = len(self._entries) - self.max_size
+            if overflow > 0:
+                self._entries = self._entries[overflow:]
+                self._matrix = self._matrix[overflow:]
+
+    def invalidate(self, ref_ids: Iterable[str]) -> int:
+        """Drop answers grounded in any of the given ref_ids, plus knowledge-base
+        answers that found nothing (new content may now answer them)."""
+        ref_ids = set(ref_ids)
+        with self._lock:
+            keep = [
+                i for i, entry in enumerate(self._entries)
+                if not (entry.ref_ids & ref_ids or (entry.uses_knowledge_base and not entry.ref_ids))
+            ]
+            removed = len(self._entries) - len(keep)
+            self._entries = [self._entries[i] for i in keep]
+            self._matrix = self._matrix[keep] if keep else None
+            return removed
+
+    def invalidate_knowledge_base(self) -> int:
+        """Drop every answer that consulted the knowledge base (new content may answer it better)."""
+        with self._lock:
+            keep = [i for i, entry in enumerate(self._entries) if not entry.uses_knowledge_base]
+            removed = len(self._entries) - len(keep)
+            self._entries = [self._entries[i] for i in keep]
+            self._matrix = self._matrix[keep] if keep else None
+            return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "max_size": self.max_size}
+
+@st.cache_resource
+def get_answer_cache() -> SemanticAnswerCache:
+    # Shared across sessions so the Knowledge Base page can invalidate what the chat page cached
+    return SemanticAnswerCache(
+        embeddings=get_embedding_model(),
+        threshold=Config.ANSWER_CACHE_THRESHOLD,
+        max_size=Config.ANSWER_CACHE_SIZE,
+    )
+
+def invalidate_answer_cache(ref_ids: Iterable[str]) -> None:
+    if Config.ANSWER_CACHE_ENABLED:
+        get_answer_cache().invalidate(ref_ids)
+
+def clear_knowledge_base_answers() -> None:
+    if Config.ANSWER_CACHE_ENABLED:
+        get_answer_cache().invalidate_knowledge_base()
+
+def _current_turn(messages: list) -> tuple[int, list]:
+    """Return the number of user turns and the messages since the last user message."""
+    human_indices = [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+    if not human_indices:
+        return 0, []
+    return len(human_indices), messages[human_indices[-1]:]
+
+def _lookup(state: AgentState) -> dict[str, Any] | None:
+    turns, turn_messages = _current_turn(state["messages"])
+    # Follow-up questions depend on the thread history, only opening questions are cached
+    if turns != 1:
+        return None
+
+    entry = get_answer_cache().lookup(message_text(turn_messages[0].content))
+    if entry is None:
+        return None
+
+    message = AIMessage(
+        content=entry.answer,
+        response_metadata={"semantic_cache": True, "cached_question": entry.question, "sources": entry.sources},
+    )
+    return {"messages": [message], "jump_to": "end"}
+
+def _store(state: AgentState) -> None:
+    turns, turn_messages = _current_turn(state["messages"])
+    if turns != 1 or len(turn_messages) < 2:
+        return
+
+    final = turn_messages[-1]
+    if not isinstance(final, AIMessage) or final.tool_calls or final.response_metadata.get("semantic_cache"):
+        return
+
+    sources, uses_knowledge_base = [], False
+    for msg in turn_messages:
+        if not isinstance(msg, ToolMessage):
+            continue
+        # Web results go stale, never replay them
+        if msg.name == "ask_web_search":
+            return
+        if msg.name == "ask_knowledge_base":
+            uses_knowledge_base = True
+            sources.extend(msg.artifact or [])
+
+    answer = message_text(final.content)
+    if answer:
+        get_answer_cache().add(CachedAnswer(
+            question=message_text(turn_messages[0].content),
+            answer=answer,
+            sources=sources,
+            ref_ids={source["ref_id"] for source in sources if source.get("ref_id")},
+            uses_knowledge_base=uses_knowledge_base,
+        ))
+
+class AnswerCacheMiddleware(AgentMiddleware):
+    """Answer a thread's opening question from the semantic cache when a near-duplicate exists,
+    and store the final answer of opening questions. The async hooks run the question
+    embedding on a worker thread so it does not block the event loop."""
+
+    @hook_config(can_jump_to=["end"])
+    def before_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        return _lookup(state)
+
+    @hook_config(can_jump_to=["end"])
+    async def abefore_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        return await asyncio.to_thread(_lookup, state)
+
+    def after_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        _store(state)
+        return None
+
+    async def aafter_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        await asyncio.to_thread(_store, state)
+        return None
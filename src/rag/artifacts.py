@@ -0,0 +1,79 @@
+from typing import Any, Dict, List, Optional
+from langchain_core.documents import Document
+from src.rag.cache import fingerprint
+from src.rag.retriever import get_vector_index, hybrid_retriever
+from src.rag.vectorstore import chunk_id
+
+def to_ref(doc: Document) -> Dict[str, Any]:
+    """Chunk id and rerank score, plus the name/page needed for citations.
+
+    Vectors indexed with `add_texts` before content-addressed ids are keyed by the bare text
+    hash, so that id is kept too for `rehydrate` until the file is re-synced.
+    """
+    return {
+        "id": chunk_id(doc),
+        "legacy_id": fingerprint(doc.page_content),
+        "score": doc.metadata.get("relevance_score"),
+        "name": doc.metadata.get("name"),
+        "page": doc.metadata.get("page"),
+    }
+
+def to_refs(docs: List[Document]) -> List[Dict[str, Any]]:
+    """Compact `retrieve_context` artifact, instead of the full chunk text and metadata."""
+    return [to_ref(doc) for doc in docs]
+
+def is_ref(item: Any) -> bool:
+    return isinstance(item, dict) and "id" in item
+
+def artifact_sources(artifact: Optional[list]) -> List[Dict[str, Any]]:
+    """Refs with their ref_id for a `retrieve_context` artifact, whether it holds docs or refs."""
+    sources = []
+    for item in artifact or []:
+        ref = item if is_ref(item) else to_ref(item)
+        sources.append({**ref, "ref_id": ref["id"].split("#", 1)[0]})
+    return sources
+
+def _vectors(response) -> Dict[str, Any]:
+    # Pinecone returns a FetchResponse, the local index a plain dict
+    return response.vectors if hasattr(response, "vectors") else response["vectors"]
+
+def _metadata(vector) -> Dict[str, Any]:
+    return dict(vector.metadata if hasattr(vector, "metadata") else vector["metadata"])
+
+def rehydrate(refs: Optional[list], retriever=None) -> List[Document]:
+    """Fetch the chunks behind refs back from the vector store, in order. Documents are passed
+    through, and chunks deleted from the index since the turn are skipped.
+
+    `retriever` defaults to the shared hybrid retriever and its index.
+    """
+    items = refs or []
+    wanted = [item for item in items if is_ref(item)]
+    if not wanted:
+        return [item for item in items if isinstance(item, Document)]
+
+    if retriever is None:
+        retriever, index = hybrid_retriever(), get_vector_index()
+    else:
+        index = retriever.index
+    ids = sorted({id_ for ref in wanted for id_ in (ref["id"], ref.get("legacy_id")) if id_})
+    vectors = {}
+    # Pinecone fetches at most 100 ids per request
+    for i in range(0, len(ids), 100):
+        vectors.update(_vectors(index.fetch(ids=ids[i:i + 100], namespace=retriever.namespace)))
+
+    docs = []
+    for item in items:
+        if isinstance(item, Document):
+            docs.append(item)
+            continue
+        if not is_ref(item):
+            continue
+        vector = vectors.get(item["id"]) or vectors.get(item.get("legacy_id"))
+        if vector is None:
+            continue
+        metadata = _metadata(vector)
+        text = metadata.pop(retriever.text_key, "")
+        if item.get("score") is not None:
+            metadata["relevance_score"] = item["score"]
+        docs.append(Document(page_content=text, metadata=metadata))
+    return docs
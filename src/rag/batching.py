@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+@dataclass
+class _Request(Generic[T]):
+    items: List[T]
+    cost: int
+    future: Future = field(default_factory=Future)
+
+class MicroBatcher(Generic[T, R]):
+    """Coalesce concurrent calls to a batched model function.
+
+    Callers `submit` a list of items and block for their results. A single worker thread
+    takes the first pending request and, when other callers are active, keeps collecting
+    requests for up to `max_wait_ms` or until `max_batch_cost` is reached. It then runs
+    `batch_fn` once over all items sorted by cost (so padded sub-batches hold similar
+    lengths), and scatters the results back in order.
+    The model is only ever called from the worker thread.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Sequence[R]],
+        cost_fn: Callable[[T], int],
+        max_wait_ms: float = 5.0,
+        max_batch_cost: int = 8192,
+        name: str = "micro-batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.cost_fn = cost_fn
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_cost = max_batch_cost
+        self._queue: "queue.Queue[_Request[T]]" = queue.Queue()
+        # Request that did not fit in the previous batch, it opens the next one
+        self._carry: Optional[_Request[T]] = None
+        self._concurrent = False
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+
+        self._worker = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, items: List[T]) -> List[R]:
+        if not items:
+            return []
+        request = _Request(items=list(items), cost=sum(self.cost_fn(item) for item in items))
+        self._queue.put(request)
+        return request.future.result()
+
+    def _collect(self) -> List[_Request[T]]:
+        first, self._carry = self._carry or self._queue.get(), None
+        batch, cost = [first], first.cost
+        # Only hold the batch open under concurrent load, a lone caller should not pay the wait
+        wait = self.max_wait if self._concurrent else 0.0
+        deadline = time.perf_counter() + wait
+
+        while cost < self.max_batch_cost:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            # A request that would blow the budget opens the next batch instead
+            if cost + request.cost > self.max_batch_cost:
+                self._carry = request
+                break
+            batch.append(request)
+            cost += request.cost
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            requests = self._collect()
+            flat = [(r, i, item) for r, request in enumerate(requests) for i, item in enumerate(request.items)]
+            order = sorted(range(len(flat)), key=lambda k: self.cost_fn(flat[k][2]))
+
+            try:
+                outputs = list(self.batch_fn([flat[k][2] for k in order]))
+                if len(outputs) != len(flat):
+                    raise ValueError(f"batch_fn returned {len(outputs)} outputs for {len(flat)} inputs")
+            except Exception as exc:
+                for request in requests:
+                    request.future.set_exception(exc)
+                continue
+            finally:
+                # Requests that queued up during the forward pass mean other callers are active
+                self._concurrent = len(requests) > 1 or not self._queue.empty()
+
+            # Scatter the sorted outputs back to each request, in its original item order
+            results = [[None] * len(request.items) for request in requests]
+            for k, output in zip(order, outputs):
+                r, i, _ = flat[k]
+                results[r][i] = output
+            for request, result in zip(requests, results):
+                request.future.set_result(result)
+
+            with self._lock:
+                self.batches += 1
+                self.items += len(flat)
+                self.requests += len(requests)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "items": self.items,
+                "mean_requests_per_batch": self.requests / self.batches if self.batches else 0.0,
+                "mean_items_per_batch": self.items / self.batches if self.batches else 0.0,
+            }
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return " ".join(query.lower().split())
+
+def fingerprint(text: str) -> str:
+    """Stable content hash used as a cache key component."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with an optional time-to-live per entry."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                # Expired, drop it and report a miss
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "max_size": self.max_size}
+
+class RerankScoreCache:
+    """Cross-encoder score cache keyed by (normalized query hash, chunk content hash).
+
+    Lookups go to an in-memory LRU first and then, if a path is given, to a SQLite table
+    that survives restarts. Scores found on disk are promoted back into memory. The table
+    keeps at most `max_rows` scores, the least recently written are evicted first.
+    """
+
+    def __init__(self, max_size: int, db_path: Optional[str] = None, namespace: str = "", max_rows: int = 1_000_000):
+        self.memory = LRUCache(max_size)
+        self.namespace = namespace
+        self.max_rows = max_rows
+        self.disk_hits = 0
+        self._db = None
+        self._db_rows = 0
+        self._db_lock = threading.Lock()
+
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rerank_scores ("
+                "query_hash TEXT NOT NULL, chunk_hash TEXT NOT NULL, score REAL NOT NULL, "
+                "PRIMARY KEY (query_hash, chunk_hash))"
+            )
+            # Tables written before eviction existed have no write time, treat their rows as oldest
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(rerank_scores)")]
+            if "written_at" not in columns:
+                self._db.execute("ALTER TABLE rerank_scores ADD COLUMN written_at REAL NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS rerank_scores_written_at ON rerank_scores (written_at)")
+            self._db.commit()
+            self._db_rows = self._db.execute("SELECT count(*) FROM rerank_scores").fetchone()[0]
+
+    def query_key(self, query: str) -> str:
+        # The namespace keeps scores from different models/backends apart
+        return fingerprint(f"{self.namespace}\x00{normalize_query(query)}")
+
+    def get_many(self, query: str, chunks: List[str]) -> List[Optional[float]]:
+        """Return cached scores in chunk order, None for misses."""
+        query_hash = self.query_key(query)
+        chunk_hashes = [fingerprint(chunk) for chunk in chunks]
+        scores = [self.memory.get((query_hash, h)) for h in chunk_hashes]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing and self._db is not None:
+            wanted = {chunk_hashes[i] for i in missing}
+            placeholders = ",".join("?" * len(wanted))
+            with self._db_lock:
+                rows = self._db.execute(
+                    f"SELECT chunk_hash, score FROM rerank_scores WHERE query_hash = ? AND chunk_hash IN ({placeholders})",
+                    (query_hash, *wanted),
+                ).fetchall()
+            found = dict(rows)
+            for i in missing:
+                score = found.get(chunk_hashes[i])
+                if score is not None:
+                    scores[i] = score
+                    self.disk_hits += 1
+                    self.memory.set((query_hash, chunk_hashes[i]), score)
+
+        return scores
+
+    def set_many(self, query: str, chunks: List[str], scores: List[float]) -> None:
+        query_hash = self.query_key(query)
+        rows = []
+        for chunk, score in zip(chunks, scores):
+            chunk_hash = fingerprint(chunk)
+            self.memory.set((query_hash, chunk_hash), float(score))
+            rows.append((query_hash, chunk_hash, float(score), time.time()))
+
+        if self._db is not None and rows:
+            with self._db_lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO rerank_scores (query_hash, chunk_hash, score, written_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                # Replaced rows make this an upper bound, only count exactly once it says we're over
+                self._db_rows += len(rows)
+                if self._db_rows > self.max_rows:
+                    self._evict()
+                self._db.commit()
+
+    def _evict(self) -> None:
+        self._db_rows = self._db.execute("SELECT count(*) FROM rerank_scores").fetchone()[0]
+        excess = self._db_rows - self.max_rows
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM rerank_scores WHERE rowid IN "
+                "(SELECT rowid FROM rerank_scores ORDER BY written_at, rowid LIMIT ?)",
+                (excess,),
+            )
+            self._db_rows = self.max_rows
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.memory.stats()
+        # A disk hit is first counted as a memory miss
+        stats["disk_hits"] = self.disk_hits
+        stats["misses"] = stats["misses"] - self.disk_hits
+        stats["disk_rows"] = self._db_rows
+        return stats
@@ -0,0 +1,272 @@
+"""Checkpointer backends and checkpoint maintenance.
+
+Backends are selected with `Config.CHECKPOINTER_BACKEND`:
+- "postgres": PostgresSaver / AsyncPostgresSaver on a connection pool (default)
+- "sqlite": SqliteSaver / AsyncSqliteSaver on a local file, for single-node deployments
+- "memory": InMemorySaver, for local testing
+
+Maintenance compacts idle threads to their latest checkpoint and deletes threads idle for
+longer than the TTL, in batches. Run it once from cron with `python -m src.rag.checkpoints`
+or periodically in-process with `start_maintenance_thread()`.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Tuple
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+def _sqlite_path(path: str) -> str:
+    """Create the parent directory of a SQLite file (the default lives under .cache/)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return path
+
+def create_checkpointer() -> Tuple[BaseCheckpointSaver, Any]:
+    """Return (checkpointer, underlying pool/connection or None) for the configured backend."""
+    backend = Config.CHECKPOINTER_BACKEND
+    if backend == "postgres":
+        from langgraph.checkpoint.postgres import PostgresSaver
+        from psycopg_pool import ConnectionPool
+
+        # Initialize Checkpointer with Postgres using ConnectionPool
+        pool = ConnectionPool(conninfo=Config.DB_URI, max_size=Config.DB_MAX_SIZE, kwargs=Config.DB_CONNECTION_KWARGS)
+        checkpointer = PostgresSaver(pool)
+        checkpointer.setup() # Ensure tables are created
+        return checkpointer, pool
+
+    if backend == "sqlite":
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        conn = sqlite3.connect(_sqlite_path(Config.CHECKPOINTER_SQLITE_PATH), check_same_thread=False)
+        checkpointer = SqliteSaver(conn)
+        checkpointer.setup()
+        return checkpointer, conn
+
+    if backend == "memory":
+        return InMemorySaver(), None
+
+    raise ValueError(f"Unsupported checkpointer backend: {backend}. Supported backends: postgres, sqlite, memory")
+
+async def acreate_checkpointer() -> Tuple[BaseCheckpointSaver, Any]:
+    """Async counterpart of `create_checkpointer`, to be awaited in the loop that will use it."""
+    backend = Config.CHECKPOINTER_BACKEND
+    if backend == "postgres":
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg_pool import AsyncConnectionPool
+
+        # Initialize Checkpointer with Postgres using AsyncConnectionPool
+        pool = AsyncConnectionPool(conninfo=Config.DB_URI, max_size=Config.DB_MAX_SIZE, kwargs=Config.DB_CONNECTION_KWARGS, open=False)
+        await pool.open()
+        checkpointer = AsyncPostgresSaver(pool)
+        await checkpointer.setup() # Ensure tables are created
+        return checkpointer, pool
+
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        conn = await aiosqlite.connect(_sqlite_path(Config.CHECKPOINTER_SQLITE_PATH))
+        checkpointer = AsyncSqliteSaver(conn)
+        await checkpointer.setup()
+        return checkpointer, conn
+
+    if backend == "memory":
+        return InMemorySaver(), None
+
+    raise ValueError(f"Unsupported checkpointer backend: {backend}. Supported backends: postgres, sqlite, memory")
+
+def checkpoint_time(checkpoint_id: str) -> datetime:
+    """Creation time encoded in a LangGraph checkpoint id (a time-ordered UUIDv6)."""
+    value = uuid.UUID(checkpoint_id).int
+    time_high = value >> 96
+    time_mid = (value >> 80) & 0xFFFF
+    time_low = (value >> 64) & 0x0FFF
+    # 100ns intervals since the Gregorian epoch, as in UUIDv1
+    ticks = (time_high << 28) | (time_mid << 12) | time_low
+    return datetime(1582, 10, 15, tzinfo=timezone.utc) + timedelta(microseconds=ticks // 10)
+
+@dataclass
+class MaintenanceStats:
+    compacted_checkpoints: int = 0
+    expired_threads: int = 0
+
+class PostgresMaintenance:
+    """Compaction and TTL expiry directly on the PostgresSaver tables."""
+
+    def __init__(self, conninfo: str, batch_size: int):
+        self.conninfo = conninfo
+        self.batch_size = batch_size
+
+    def _connect(self):
+        import psycopg
+        return psycopg.connect(self.conninfo, **Config.DB_CONNECTION_KWARGS)
+
+    def _idle_threads(self, conn, idle: timedelta, compactable: bool = False) -> List[str]:
+        # Compaction keeps one checkpoint per namespace, so a thread only has something left to
+        # remove while some namespace (the root or a sub-agent's "tools:<task_id>") has several
+        rows = conn.execute(
+            """
+            SELECT thread_id FROM checkpoints
+            GROUP BY thread_id
+            HAVING max((checkpoint->>'ts')::timestamptz) < now() - %s
+               AND (NOT %s OR count(*) > count(DISTINCT checkpoint_ns))
+            LIMIT %s
+            """,
+            (idle, compactable, self.batch_size),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def compact(self, idle: timedelta) -> int:
+        """Keep only the latest checkpoint (per namespace) of threads idle for `idle`."""
+        removed = 0
+        with self._connect() as conn:
+            while threads := self._idle_threads(conn, idle, compactable=True):
+                with conn.transaction():
+                    # Checkpoint ids are time-ordered UUIDs, the max is the latest
+                    cur = conn.execute(
+                        """
+                        DELETE FROM checkpoints c
+                        WHERE c.thread_id = ANY(%s) AND c.checkpoint_id < (
+                            SELECT max(l.checkpoint_id) FROM checkpoints l
+                            WHERE l.thread_id = c.thread_id AND l.checkpoint_ns = c.checkpoint_ns
+                        )
+                        """,
+                        (threads,),
+                    )
+                    deleted = cur.rowcount
+                    removed += deleted
+                    conn.execute(
+                        """
+                        DELETE FROM checkpoint_writes w
+                        WHERE w.thread_id = ANY(%s) AND NOT EXISTS (
+                            SELECT 1 FROM checkpoints c
+                            WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+                              AND c.checkpoint_id = w.checkpoint_id
+                        )
+                        """,
+                        (threads,),
+                    )
+                    # Blobs are shared between checkpoints, keep the versions the survivors reference
+                    conn.execute(
+                        """
+                        DELETE FROM checkpoint_blobs b
+                        WHERE b.thread_id = ANY(%s) AND NOT EXISTS (
+                            SELECT 1 FROM checkpoints c
+                            WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+                              AND c.checkpoint->'channel_versions'->>b.channel = b.version
+                        )
+                        """,
+                        (threads,),
+                    )
+                if deleted == 0:
+                    # Nothing left to compact in this batch, don't select it again forever
+                    break
+        return removed
+
+    def expire(self, ttl: timedelta) -> int:
+        """Delete every thread whose latest checkpoint is older than `ttl`."""
+        expired = 0
+        with self._connect() as conn:
+            while threads := self._idle_threads(conn, ttl):
+                with conn.transaction():
+                    for table in ("checkpoint_writes", "checkpoint_blobs", "checkpoints"):
+                        conn.execute(f"DELETE FROM {table} WHERE thread_id = ANY(%s)", (threads,))
+                expired += len(threads)
+        return expired
+
+class SqliteMaintenance:
+    """Compaction and TTL expiry on the SqliteSaver tables (checkpoint blobs are inline)."""
+
+    def __init__(self, path: str, batch_size: int):
+        self.path = _sqlite_path(path)
+        self.batch_size = batch_size
+
+    def _latest(self, conn) -> List[Tuple[str, str]]:
+        return conn.execute("SELECT thread_id, max(checkpoint_id) FROM checkpoints GROUP BY thread_id").fetchall()
+
+    def compact(self, idle: timedelta) -> int:
+        cutoff = datetime.now(timezone.utc) - idle
+        with sqlite3.connect(self.path) as conn:
+            threads = [t for t, latest in self._latest(conn) if checkpoint_time(latest) < cutoff]
+            removed = 0
+            for i in range(0, len(threads), self.batch_size):
+                batch = threads[i:i + self.batch_size]
+                marks = ",".join("?" * len(batch))
+                cur = conn.execute(
+                    f"""
+                    DELETE FROM checkpoints WHERE thread_id IN ({marks}) AND checkpoint_id < (
+                        SELECT max(l.checkpoint_id) FROM checkpoints l
+                        WHERE l.thread_id = checkpoints.thread_id AND l.checkpoint_ns = checkpoints.checkpoint_ns
+                    )
+                    """,
+                    batch,
+                )
+                removed += cur.rowcount
+                conn.execute(
+                    f"""
+                    DELETE FROM writes WHERE thread_id IN ({marks}) AND NOT EXISTS (
+                        SELECT 1 FROM checkpoints c
+                        WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+                          AND c.checkpoint_id = writes.checkpoint_id
+                    )
+                    """,
+                    batch,
+                )
+                conn.commit()
+        return removed
+
+    def expire(self, ttl: timedelta) -> int:
+        cutoff = datetime.now(timezone.utc) - ttl
+        with sqlite3.connect(self.path) as conn:
+            threads = [t for t, latest in self._latest(conn) if checkpoint_time(latest) < cutoff]
+            for i in range(0, len(threads), self.batch_size):
+                batch = threads[i:i + self.batch_size]
+                marks = ",".join("?" * len(batch))
+                conn.execute(f"DELETE FROM writes WHERE thread_id IN ({marks})", batch)
+                conn.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({marks})", batch)
+                conn.commit()
+        return len(threads)
+
+def get_maintenance():
+    """Maintenance runner for the configured backend, or None for the in-memory backend."""
+    if Config.CHECKPOINTER_BACKEND == "postgres":
+        return PostgresMaintenance(Config.DB_URI, Config.CHECKPOINT_MAINTENANCE_BATCH)
+    if Config.CHECKPOINTER_BACKEND == "sqlite":
+        return SqliteMaintenance(Config.CHECKPOINTER_SQLITE_PATH, Config.CHECKPOINT_MAINTENANCE_BATCH)
+    return None
+
+def run_maintenance() -> MaintenanceStats:
+    """Expire threads past the TTL, then compact the remaining idle ones."""
+    maintenance = get_maintenance()
+    if maintenance is None:
+        return MaintenanceStats()
+
+    expired = maintenance.expire(timedelta(seconds=Config.CHECKPOINT_THREAD_TTL))
+    compacted = maintenance.compact(timedelta(seconds=Config.CHECKPOINT_COMPACT_AFTER))
+    return MaintenanceStats(compacted_checkpoints=compacted, expired_threads=expired)
+
+def start_maintenance_thread(interval: float = Config.CHECKPOINT_MAINTENANCE_INTERVAL) -> threading.Thread:
+    """Run maintenance every `interval` seconds in a daemon thread."""
+    def loop():
+        while True:
+            try:
+                stats = run_maintenance()
+                logger.info("Checkpoint maintenance: %s", stats)
+            except Exception:
+                logger.exception("Checkpoint maintenance failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="checkpoint-maintenance", daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    print(run_maintenance())
@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+from langchain_core.documents import Document
+from src.config import Config
+from src.rag.tokens import estimate_tokens
+
+# The splitter strips the separator ("\n\n", "\n" or " ") between adjacent chunks, so touching
+# chunks usually start a character or two after the previous one ends
+MAX_MERGE_GAP = 2
+
+@dataclass
+class Passage:
+    name: Optional[str]
+    page: Optional[object]
+    start: Optional[int]
+    text: str
+    score: float = 0.0
+    chunks: List[Document] = field(default_factory=list)
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+def citation(passage: Passage) -> str:
+    """Compact 'filename, p. N' label (1-based page numbers, as the prompts ask users to cite)."""
+    label = passage.name or "Unknown source"
+    page = passage.page
+    if isinstance(page, int):
+        page = page + 1
+    return f"{label}, p. {page}" if page is not None else label
+
+def merge_chunks(docs: List[Document]) -> List[Passage]:
+    """Merge chunks that are adjacent or overlapping in the same file and page.
+
+    Chunks overlap by up to TEXT_SPLITTER_CHUNK_OVERLAP characters; `start_index` tells where
+    each chunk begins, so the overlapping prefix of the later chunk is dropped. Chunks separated
+    only by the stripped separator are joined with a space. Passages keep the best relevance
+    score of their chunks and are returned best first.
+    """
+    groups = {}
+    for doc in docs:
+        key = (doc.metadata.get("ref_id"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append(doc)
+
+    passages: List[Passage] = []
+    for chunks in groups.values():
+        chunks.sort(key=lambda d: (d.metadata.get("start_index") is None, d.metadata.get("start_index") or 0))
+        current: Optional[Passage] = None
+
+        for doc in chunks:
+            start = doc.metadata.get("start_index")
+            score = float(doc.metadata.get("relevance_score", 0.0))
+
+            if current is not None and start is not None and current.end is not None and start <= current.end + MAX_MERGE_GAP:
+                if start > current.end:
+                    # Touching chunks, keep `start + len(text)` aligned with the file offsets
+                    current.text += " " * (start - current.end) + doc.page_content
+                    current.score = max(current.score, score)
+                    current.chunks.append(doc)
+                    continue
+
+                overlap = current.end - start
+                # Only trust start_index when the overlapping text actually matches
+                if current.text.endswith(doc.page_content[:overlap]):
+                    current.text += doc.page_content[overlap:]
+                    current.score = max(current.score, score)
+                    current.chunks.append(doc)
+                    continue
+
+            current = Passage(
+                name=doc.metadata.get("name"),
+                page=doc.metadata.get("page"),
+                start=start,
+                text=doc.page_content,
+                score=score,
+                chunks=[doc],
+            )
+            passages.append(current)
+
+    passages.sort(key=lambda p: p.score, reverse=True)
+    return passages
+
+def pack_context(docs: List[Document], token_budget: int = Config.CONTEXT_TOKEN_BUDGET) -> str:
+    """Serialize reranked docs as merged, cited passages that fit within `token_budget`."""
+    blocks = []
+    remaining = token_budget
+
+    for i, passage in enumerate(merge_chunks(docs), start=1):
+        header = f"[{i}] {citation(passage)}\n"
+        available = remaining - estimate_tokens(header)
+        if available <= 0:
+            break
+
+        text = passage.text
+        if estimate_tokens(text) > available:
+            # Cut the last passage at a word boundary to fill the budget exactly
+            text = text[:available * Config.CONTEXT_CHARS_PER_TOKEN].rsplit(" ", 1)[0] + " ..."
+
+        block = header + text
+        blocks.append(block)
+        remaining -= estimate_tokens(block)
+
+    return "\n\n".join(blocks)
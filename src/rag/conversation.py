@@ -0,0 +1,134 @@
+from typing import Any, List, Optional, Tuple
+from langchain.agents import AgentState
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langgraph.runtime import Runtime
+from src.config import Config
+from src.rag.tokens import message_text, message_tokens
+
+# Fixed id of the message carrying the rolling summary, so each trim replaces it
+SUMMARY_MESSAGE_ID = "conversation-summary"
+SUMMARY_PREFIX = "[Summary of the earlier conversation]\n"
+TRUNCATION_NOTE = "\n[... truncated to fit the context window]"
+MIN_TRUNCATED_TOKENS = 50  # never cut a message shorter than this
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI tutor."
+    "Extend the current summary with the new lines of conversation."
+    "Keep facts, user goals, decisions and cited sources; drop greetings and filler."
+    "Return only the updated summary, in at most 200 words."
+)
+
+def _transcript(messages: List[BaseMessage], max_chars: int = 1500) -> str:
+    lines = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            role = "User"
+        elif isinstance(msg, ToolMessage):
+            role = f"Tool ({msg.name})"
+        elif isinstance(msg, AIMessage):
+            if msg.tool_calls and not message_text(msg.content):
+                lines.append("Assistant called: " + ", ".join(call["name"] for call in msg.tool_calls))
+                continue
+            role = "Assistant"
+        else:
+            continue
+        text = message_text(msg.content)
+        # Long tool outputs and pasted documents only need their gist
+        lines.append(f"{role}: {text[:max_chars]}{' ...' if len(text) > max_chars else ''}")
+    return "\n".join(lines)
+
+class RollingSummaryMiddleware(AgentMiddleware):
+    """Token-budgeted history trimming that folds evicted turns into a rolling summary.
+
+    When the estimated prompt exceeds `max_tokens`, the oldest whole turns are evicted until
+    the rest fits in `keep_tokens`. Only the evicted turns and the previous summary are sent
+    to the summarizer, so the summary is updated incrementally rather than rebuilt from the
+    full history. It is stored as the first message of the thread (with a fixed id), so it
+    is checkpointed along with the messages it replaces.
+
+    The current turn is always kept. If it alone exceeds `max_tokens` (a pasted document or a
+    long tool output), its largest messages are truncated until it fits in `keep_tokens`.
+    """
+
+    def __init__(self, model, max_tokens: int = Config.TRIM_MAX_TOKENS, keep_tokens: int = Config.TRIM_KEEP_TOKENS):
+        super().__init__()
+        self.model = model
+        self.max_tokens = max_tokens
+        self.keep_tokens = keep_tokens
+
+    def _plan(self, messages: List[BaseMessage]) -> Optional[Tuple[str, List[BaseMessage], List[BaseMessage]]]:
+        """Return (previous summary, evicted messages, kept messages), or None if under budget."""
+        if sum(message_tokens(m) for m in messages) <= self.max_tokens:
+            return None
+
+        summary = ""
+        if messages and messages[0].id == SUMMARY_MESSAGE_ID:
+            summary = message_text(messages[0].content)[len(SUMMARY_PREFIX):]
+            messages = messages[1:]
+
+        # Only cut in front of a user message so tool calls stay paired with their results
+        turn_starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if not turn_starts:
+            return None
+
+        # Keep the newest turns that fit in keep_tokens, but always the current turn
+        cut = turn_starts[-1]
+        for start in reversed(turn_starts[:-1]):
+            if sum(message_tokens(m) for m in messages[start:]) > self.keep_tokens:
+                break
+            cut = start
+
+        kept = messages[cut:]
+        if sum(message_tokens(m) for m in kept) > self.max_tokens:
+            kept = self._truncate_turn(kept)
+        elif cut == 0:
+            return None
+        return summary, messages[:cut], kept
+
+    def _truncate_turn(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Cut the text of the largest messages, keeping their ids, until the turn fits in keep_tokens."""
+        messages = list(messages)
+        excess = sum(message_tokens(m) for m in messages) - self.keep_tokens
+        for i in sorted(range(len(messages)), key=lambda i: message_tokens(messages[i]), reverse=True):
+            tokens = message_tokens(messages[i])
+            if excess <= 0 or tokens <= MIN_TRUNCATED_TOKENS:
+                break
+            chars = max(tokens - excess, MIN_TRUNCATED_TOKENS) * Config.CONTEXT_CHARS_PER_TOKEN
+            text = message_text(messages[i].content)
+            messages[i] = messages[i].model_copy(update={"content": text[:chars] + TRUNCATION_NOTE})
+            excess -= tokens - message_tokens(messages[i])
+        return messages
+
+    def _prompt(self, summary: str, evicted: List[BaseMessage]) -> list:
+        return [
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=f"Current summary:\n{summary or '(empty)'}\n\nNew lines of conversation:\n{_transcript(evicted)}"),
+        ]
+
+    @staticmethod
+    def _update(summary: str, kept: List[BaseMessage]) -> dict[str, Any]:
+        # Only the current turn was truncated and nothing summarized yet
+        if not summary:
+            return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept]}
+        summary_message = HumanMessage(content=SUMMARY_PREFIX + summary, id=SUMMARY_MESSAGE_ID)
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), summary_message, *kept]}
+
+    def before_model(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        plan = self._plan(state["messages"])
+        if plan is None:
+            return None
+        summary, evicted, kept = plan
+        if evicted:
+            summary = message_text(self.model.invoke(self._prompt(summary, evicted)).content)
+        return self._update(summary, kept)
+
+    async def abefore_model(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        plan = self._plan(state["messages"])
+        if plan is None:
+            return None
+        summary, evicted, kept = plan
+        if evicted:
+            summary = message_text((await self.model.ainvoke(self._prompt(summary, evicted))).content)
+        return self._update(summary, kept)
@@ -1,9 +1,13 @@
+import io
+import json
 import os
+import shutil
 import tempfile
-from typing import List, Dict, Type
+from typing import Dict, Iterator, List, Type
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader, CSVLoader, UnstructuredMarkdownLoader
 from langchain_core.documents import Document
 from streamlit.runtime.uploaded_file_manager import UploadedFile
+from src.rag.text_splitter import iter_chunks
 
 # Mapping of file extensions to their corresponding loaders
 LOADER_MAPPING: Dict[str, Type] = {
@@ -23,13 +27,17 @@ def get_file_extension(filename: str) -> str:
     return os.path.splitext(filename)[1].lower()
 
 
-def load_documents(uploaded_file: UploadedFile, ref_id: str) -> List[Document]:
-    # 1. Get file extension and validate
-    file_ext = get_file_extension(uploaded_file.name)
-    
+def _validate_extension(filename: str) -> str:
+    file_ext = get_file_extension(filename)
     if file_ext not in LOADER_MAPPING:
         supported = ", ".join(SUPPORTED_EXTENSIONS)
         raise ValueError(f"Unsupported file type: {file_ext}. Supported types: {supported}")
+    return file_ext
+
+
+def load_documents(uploaded_file: UploadedFile, ref_id: str) -> List[Document]:
+    # 1. Get file extension and validate
+    file_ext = _validate_extension(uploaded_file.name)
     
     # 2. Initialize temporary file path
     tmp_file_path = None
@@ -57,3 +65,58 @@ def load_documents(uploaded_file: UploadedFile, ref_id: str) -> List[Document]:
         # 6. Clean up the temporary file
         if tmp_file_path and os.path.exists(tmp_file_path):
             os.remove(tmp_file_path)
+
+
+def lazy_load_documents(uploaded_file: UploadedFile, ref_id: str) -> Iterator[Document]:
+    """Yield documents (pages, rows, ...) one at a time instead of materializing the file.
+
+    Validation happens on the first `next()`, the temporary file is removed once the
+    generator is exhausted or closed.
+    """
+    file_ext = _validate_extension(uploaded_file.name)
+    tmp_file_path = None
+
+    try:
+        # Stream the upload to disk without an extra in-memory copy
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, tmp_file)
+            tmp_file_path = tmp_file.name
+
+        loader = LOADER_MAPPING[file_ext](tmp_file_path)
+        for doc in loader.lazy_load():
+            doc.metadata["name"] = uploaded_file.name
+            doc.metadata["ref_id"] = ref_id
+            yield doc
+
+    finally:
+        if tmp_file_path and os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+
+
+def parse_file(filename: str, data: bytes, ref_id: str) -> str:
+    """Load and chunk raw file bytes in a worker process. Takes plain, picklable arguments so it
+    can run in a process pool.
+
+    Pages are streamed through the splitter and the chunks spilled to a JSON lines file, so
+    neither process holds all of a file's chunks; returns the file path for `read_chunks`.
+    """
+    upload = io.BytesIO(data)
+    upload.name = filename
+    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".jsonl", encoding="utf-8") as spill:
+        try:
+            for chunk in iter_chunks(lazy_load_documents(upload, ref_id)):
+                spill.write(json.dumps({"page_content": chunk.page_content, "metadata": chunk.metadata}, default=str) + "\n")
+        except BaseException:
+            # The caller never learns the path of a failed parse, so remove the partial spill here
+            spill.close()
+            os.unlink(spill.name)
+            raise
+        return spill.name
+
+
+def read_chunks(path: str) -> Iterator[Document]:
+    """Yield the chunks spilled by `parse_file` one at a time. The caller removes the file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield Document(**json.loads(line))
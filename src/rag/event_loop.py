@@ -0,0 +1,39 @@
+import asyncio
+import contextvars
+import threading
+from typing import AsyncIterator, Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+class BackgroundEventLoop:
+    """An asyncio event loop running in a daemon thread.
+
+    Lets synchronous callers (Streamlit script threads) share async resources such as the
+    AsyncAgent's connection pool: many sessions await on one loop instead of each holding
+    a thread for the whole agent run.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="agent-event-loop", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    async def _in_context(coro: Awaitable[T], context: contextvars.Context) -> T:
+        # Tasks start from the loop thread's context, carry over the caller's variables
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run a coroutine on the loop and block until it finishes."""
+        context = contextvars.copy_context()
+        return asyncio.run_coroutine_threadsafe(self._in_context(coro, context), self.loop).result()
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Consume an async iterator on the loop, yielding items to the calling thread."""
+        while True:
+            try:
+                yield self.run(agen.__anext__())
+            except StopAsyncIteration:
+                return
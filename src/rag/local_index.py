@@ -0,0 +1,312 @@
+import json
+import os
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+def match_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Pinecone-style metadata filter ($eq, $ne, $in, $nin, implicit AND)."""
+    if not filter:
+        return True
+
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+            if op not in ("$eq", "$ne", "$in", "$nin"):
+                raise ValueError(f"Unsupported filter operator: {op}")
+    return True
+
+class LocalHybridIndex:
+    """In-process hybrid (dense + sparse) vector index with a Pinecone-compatible surface.
+
+    Dense vectors live in a memory-mapped float32 matrix, sparse BM25 vectors in CSR arrays
+    and ids/metadata in a JSON sidecar. Scores are dense dot product plus sparse dot product,
+    so alpha-weighted query vectors from `hybrid_convex_scale` score exactly as on Pinecone.
+    Only `upsert`, `update`, `query`, `fetch`, `list`, `delete` and `describe_index_stats` are provided, which is
+    what `PineconeHybridSearchRetriever` and the vectorstore helpers use.
+
+    Upserts only mark the sidecar dirty; call `flush()` after a batch run to persist it, so
+    indexing N chunks in batches writes the sidecar once instead of once per batch. Deletes
+    may compact the dense rows in place and are persisted immediately.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+
+        self._dim: Optional[int] = None
+        self._dense: Optional[np.memmap] = None
+        self._size = 0  # rows in use, including deleted ones
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._sparse_rows: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+
+        # CSR view of the sparse rows plus the alive-row mask, rebuilt lazily after writes
+        self._csr: Optional[tuple] = None
+        self._dirty = False
+        self._load()
+
+    # --- Persistence ---
+    @property
+    def _dense_path(self) -> str:
+        return os.path.join(self.path, "dense.f32")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self._dim = meta["dim"]
+        self._size = len(meta["ids"])
+        self._ids = meta["ids"]
+        self._metadata = meta["metadata"]
+        self._sparse_rows = meta["sparse"]
+        self._row_of = {id_: row for row, id_ in enumerate(self._ids) if id_ is not None}
+        if self._dim:
+            self._dense = np.memmap(self._dense_path, dtype=np.float32, mode="r+", shape=(meta["capacity"], self._dim))
+
+    def _save(self) -> None:
+        if self._dense is not None:
+            self._dense.flush()
+
+        meta = {
+            "dim": self._dim,
+            "capacity": 0 if self._dense is None else self._dense.shape[0],
+            "ids": self._ids,
+            "metadata": self._metadata,
+            "sparse": self._sparse_rows,
+        }
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+        self._dirty = False
+
+    def flush(self) -> None:
+        """Persist upserts made since the last save."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _reserve(self, rows: int) -> None:
+        """Grow the memory-mapped dense matrix (by doubling) to hold `rows` rows."""
+        capacity = 0 if self._dense is None else self._dense.shape[0]
+        if rows <= capacity:
+            return
+
+        new_capacity = max(rows, capacity * 2, 1024)
+        if self._dense is not None:
+            self._dense.flush()
+            self._dense = None  # release the old mapping before resizing the file
+        # Extending the file keeps existing rows in place and zero-fills the rest
+        with open(self._dense_path, "ab") as f:
+            f.truncate(new_capacity * self._dim * 4)
+        self._dense = np.memmap(self._dense_path, dtype=np.float32, mode="r+", shape=(new_capacity, self._dim))
+
+    def _compact(self) -> None:
+        """Drop deleted rows once they make up most of the index."""
+        alive = [row for row, id_ in enumerate(self._ids) if id_ is not None]
+        if len(alive) * 2 >= self._size:
+            return
+
+        dense = np.array(self._dense[alive]) if self._dense is not None else None
+        self._ids = [self._ids[row] for row in alive]
+        self._metadata = [self._metadata[row] for row in alive]
+        self._sparse_rows = [self._sparse_rows[row] for row in alive]
+        self._row_of = {id_: row for row, id_ in enumerate(self._ids)}
+        self._size = len(alive)
+        if dense is not None:
+            self._dense[:self._size] = dense
+
+    def _build_csr(self) -> tuple:
+        if self._csr is None:
+            lengths = [len(row["indices"]) if row else 0 for row in self._sparse_rows]
+            indptr = np.zeros(self._size + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            indices = np.fromiter((i for row in self._sparse_rows if row for i in row["indices"]), dtype=np.int64, count=int(indptr[-1]))
+            data = np.fromiter((v for row in self._sparse_rows if row for v in row["values"]), dtype=np.float32, count=int(indptr[-1]))
+            # Row number of every stored entry, used to scatter the per-entry products
+            entry_rows = np.repeat(np.arange(self._size), lengths)
+            alive = np.array([id_ is not None for id_ in self._ids], dtype=bool)
+            self._csr = (indptr, indices, data, entry_rows, alive)
+        return self._csr
+
+    # --- Pinecone-compatible API ---
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: Optional[str] = None, **kwargs) -> Dict[str, int]:
+        if not vectors:
+            return {"upserted_count": 0}
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = len(vectors[0]["values"])
+            self._reserve(self._size + len(vectors))
+
+            for vec in vectors:
+                values = np.asarray(vec["values"], dtype=np.float32)
+                if values.shape != (self._dim,):
+                    raise ValueError(f"Vector dimension {values.shape[0]} does not match index dimension {self._dim}")
+
+                sparse = vec.get("sparse_values")
+                sparse = {"indices": [int(i) for i in sparse["indices"]], "values": [float(v) for v in sparse["values"]]} if sparse else None
+
+                row = self._row_of.get(vec["id"])
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(vec["id"])
+                    self._metadata.append(None)
+                    self._sparse_rows.append(None)
+                    self._row_of[vec["id"]] = row
+
+                self._dense[row] = values
+                self._metadata[row] = dict(vec.get("metadata") or {})
+                self._sparse_rows[row] = sparse
+
+            self._csr = None
+            self._dirty = True
+        return {"upserted_count": len(vectors)}
+
+    def update(self, id: str, set_metadata: Optional[Dict[str, Any]] = None, namespace: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Merge `set_metadata` into a stored vector's metadata, like `Index.update` on Pinecone."""
+        with self._lock:
+            row = self._row_of.get(id)
+            if row is not None and set_metadata:
+                self._metadata[row].update(set_metadata)
+                self._dirty = True
+        return {}
+
+    def query(
+        self,
+        vector: List[float],
+        sparse_vector: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        include_metadata: bool = False,
+        include_values: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            if not self._size or self._dense is None:
+                return {"matches": []}
+
+            # 1. Dense scores for every row
+            scores = self._dense[:self._size] @ np.asarray(vector, dtype=np.float32)
+
+            # 2. Sparse dot product over the CSR entries that share a term with the query
+            if sparse_vector and sparse_vector.get("indices"):
+                _, indices, data, entry_rows, _ = self._build_csr()
+                order = np.argsort(sparse_vector["indices"])
+                q_indices = np.asarray(sparse_vector["indices"], dtype=np.int64)[order]
+                q_values = np.asarray(sparse_vector["values"], dtype=np.float32)[order]
+
+                pos = np.clip(np.searchsorted(q_indices, indices), 0, len(q_indices) - 1)
+                hit = q_indices[pos] == indices
+                scores = scores + np.bincount(entry_rows[hit], weights=data[hit] * q_values[pos[hit]], minlength=self._size)
+
+            # 3. Mask deleted and filtered rows
+            valid = self._build_csr()[4]
+            if filter:
+                valid = valid & np.array([
+                    id_ is not None and match_filter(self._metadata[row], filter)
+                    for row, id_ in enumerate(self._ids)
+                ], dtype=bool)
+            scores = np.where(valid, scores, -np.inf)
+
+            # 4. Top k
+            k = min(top_k, int(valid.sum()))
+            if k == 0:
+                return {"matches": []}
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for row in top:
+                match = {"id": self._ids[row], "score": float(scores[row])}
+                if include_metadata:
+                    # Copies, callers are allowed to mutate the returned metadata
+                    match["metadata"] = dict(self._metadata[row])
+                if include_values:
+                    match["values"] = self._dense[row].tolist()
+                    match["sparse_values"] = self._sparse_rows[row]
+                matches.append(match)
+            return {"matches": matches}
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            vectors = {}
+            for id_ in ids:
+                row = self._row_of.get(id_)
+                if row is not None:
+                    vectors[id_] = {
+                        "id": id_,
+                        "values": self._dense[row].tolist(),
+                        "sparse_values": self._sparse_rows[row],
+                        "metadata": dict(self._metadata[row]),
+                    }
+            return {"vectors": vectors}
+
+    def list(self, prefix: str = "", limit: int = 100, namespace: Optional[str] = None, **kwargs):
+        """Yield pages of ids starting with `prefix`, like `Index.list` on Pinecone serverless."""
+        with self._lock:
+            ids = sorted(id_ for id_ in self._row_of if id_.startswith(prefix))
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        delete_all: bool = False,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            if delete_all:
+                rows = list(self._row_of.values())
+            elif ids is not None:
+                rows = [self._row_of[id_] for id_ in ids if id_ in self._row_of]
+            elif filter:
+                rows = [row for id_, row in self._row_of.items() if match_filter(self._metadata[row], filter)]
+            else:
+                raise ValueError("delete requires ids, filter or delete_all=True")
+
+            for row in rows:
+                del self._row_of[self._ids[row]]
+                self._ids[row] = None
+                self._metadata[row] = None
+                self._sparse_rows[row] = None
+
+            if rows:
+                self._compact()
+                self._csr = None
+                self._save()
+        return {}
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            return {"dimension": self._dim, "total_vector_count": len(self._row_of)}
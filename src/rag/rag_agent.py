@@ -1,16 +1,23 @@
+import asyncio
 from langchain.agents import create_agent, AgentState
 from langchain.agents.middleware import before_model
 from langchain.chat_models import init_chat_model
-from langchain_core.messages import RemoveMessage
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, ToolMessage
 from langchain_tavily import TavilySearch
-from langchain.tools import tool
-from langgraph.checkpoint.postgres import PostgresSaver
+from langchain_core.tools import StructuredTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from langgraph.runtime import Runtime
-from psycopg_pool import ConnectionPool
 from src.config import Config
+from src.rag.checkpoints import acreate_checkpointer, create_checkpointer
 from src.rag.retriever import hybrid_retriever
-from src.rag.reranker import rerank_documents
+from src.rag.reranker import rerank_adaptive, rerank_documents
+from src.rag.context_packer import pack_context
+from src.rag.artifacts import artifact_sources, to_refs
+from src.rag.conversation import RollingSummaryMiddleware
+from src.rag.answer_cache import AnswerCacheMiddleware
+from src.rag.router import IntentRouter, IntentRouterMiddleware, get_intent_router
+from src.rag.telemetry import span
 from typing import Any
 
 @before_model
@@ -33,89 +40,237 @@ def trim_messages(state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
         ]
     }
 
+def _serialize_docs(docs) -> str:
+    # Merge overlapping chunks into cited passages within the token budget
+    if Config.CONTEXT_PACKING:
+        return pack_context(docs)
+
+    # Convert docs to a serializable artifact representation
+    return "\n\n".join(
+        (f"Source: {doc.metadata}\nContent: {doc.page_content}")
+        for doc in docs
+    )
+
+def _artifact(docs):
+    # Full Documents are checkpointed with every tool message, refs only carry chunk ids and scores
+    if Config.ARTIFACT_MODE == "refs":
+        return to_refs(docs)
+    return docs
+
+def _knowledge_result(result: dict):
+    """Final sub-agent text plus the sources its `retrieve_context` calls returned."""
+    if "messages" not in result:
+        return str(result), []
+
+    # Collect the sources retrieved by the sub-agent (used by the answer cache)
+    sources = []
+    for msg in result["messages"]:
+        if getattr(msg, "name", None) == "retrieve_context" and msg.artifact:
+            sources.extend(artifact_sources(msg.artifact))
+
+    # Return the final response text
+    return result["messages"][-1].content, sources
+
+def _final_text(result: dict):
+    # Return the final response text
+    if "messages" in result:
+        return result["messages"][-1].content
+    return str(result)
+
+class DirectKnowledgeAgent:
+    """Fast path for the knowledge sub-agent: retrieve and rerank directly, then make a single
+    grounded generation call under KNOWLEDGE_AGENT_PROMPT.
+
+    The knowledge agent has one tool it must always call, so its first LLM hop only ever
+    decides to call `retrieve_context`. Skipping it saves a round trip and its tokens. The
+    result has the same shape as the sub-agent's (a `retrieve_context` ToolMessage carrying the
+    reranked docs or their refs, then the answer), so callers don't need to tell the two apart.
+    """
+
+    def __init__(self, model, retrieve, aretrieve):
+        self.model = model
+        self.retrieve = retrieve
+        self.aretrieve = aretrieve
+
+    @staticmethod
+    def _query(inputs: dict) -> str:
+        message = inputs["messages"][-1]
+        return message["content"] if isinstance(message, dict) else message.content
+
+    @staticmethod
+    def _prompt(query: str, serialized: str) -> list:
+        return [
+            SystemMessage(content=Config.KNOWLEDGE_AGENT_PROMPT),
+            HumanMessage(content=f"{query}\n\nRetrieved context from `retrieve_context`:\n\n{serialized}"),
+        ]
+
+    @staticmethod
+    def _result(serialized: str, docs: list, response) -> dict:
+        tool_message = ToolMessage(content=serialized, artifact=docs, name="retrieve_context", tool_call_id="knowledge_fast_path")
+        return {"messages": [tool_message, response]}
+
+    def invoke(self, inputs: dict, config=None, **kwargs) -> dict:
+        query = self._query(inputs)
+        serialized, docs = self.retrieve(query)
+        response = self.model.invoke(self._prompt(query, serialized), config=config)
+        return self._result(serialized, docs, response)
+
+    async def ainvoke(self, inputs: dict, config=None, **kwargs) -> dict:
+        query = self._query(inputs)
+        serialized, docs = await self.aretrieve(query)
+        response = await self.model.ainvoke(self._prompt(query, serialized), config=config)
+        return self._result(serialized, docs, response)
+
+def _rerank(query: str, docs: list) -> list:
+    # Adaptive mode cross-encodes only as many candidates as the hybrid scores call for
+    if Config.ADAPTIVE_RERANK:
+        return rerank_adaptive(query, docs, top_n=Config.RERANKER_TOP_N)[0]
+    return rerank_documents(query, docs, top_n=Config.RERANKER_TOP_N)
+
+def make_retrieve_context(retriever):
+    """Build the sync and async `retrieve_context` tool functions over a hybrid retriever."""
+    def retrieve_context(query: str):
+        """Retrieve information from the knowledge base to help answer a query."""
+        # Invoke Hybrid Search
+        with span("retrieve"):
+            retrieved_docs = retriever.invoke(query)
+
+        # Rerank Documents
+        reranked_docs = _rerank(query, retrieved_docs)
+        return _serialize_docs(reranked_docs), _artifact(reranked_docs)
+
+    async def aretrieve_context(query: str):
+        with span("retrieve"):
+            retrieved_docs = await retriever.ainvoke(query)
+
+        # The cross-encoder is CPU-bound, keep it off the event loop
+        reranked_docs = await asyncio.to_thread(_rerank, query, retrieved_docs)
+        return _serialize_docs(reranked_docs), _artifact(reranked_docs)
+
+    return retrieve_context, aretrieve_context
+
+def build_supervisor(model, knowledge_agent, search_agent, checkpointer=None, middleware=(), router: IntentRouter | None = None):
+    """Create the supervisor graph with the sub-agents wrapped as its tools.
+
+    When the supervisor emits several tool calls in one turn, `create_agent` dispatches each
+    call as its own task in the same step, so `ask_knowledge_base` and `ask_web_search` run
+    concurrently (threads for invoke/stream, the event loop for ainvoke/astream) and their
+    ToolMessages are applied in tool-call order. A turn with both costs max(latency), not sum.
+
+    With a `router`, obvious intents are dispatched before the supervisor's first model call.
+    """
+    # Wrap Sub-Agents as Supervisor Tools
+    def ask_knowledge_base(query: str):
+        """Use this tool to ask questions that might be found in the internal knowledge base documents"""
+        # Invoking the sub-agent
+        return _knowledge_result(knowledge_agent.invoke({"messages": [{"role": "user", "content": query}]}))
+
+    async def aask_knowledge_base(query: str):
+        return _knowledge_result(await knowledge_agent.ainvoke({"messages": [{"role": "user", "content": query}]}))
+
+    def ask_web_search(query: str):
+        """Use this tool to search for information on the public web"""
+        # Invoking the sub-agent
+        return _final_text(search_agent.invoke({"messages": [{"role": "user", "content": query}]}))
+
+    async def aask_web_search(query: str):
+        return _final_text(await search_agent.ainvoke({"messages": [{"role": "user", "content": query}]}))
+
+    middleware = list(middleware)
+    if router is not None:
+        # After the caller's middleware, so e.g. the answer cache is consulted first
+        middleware.append(IntentRouterMiddleware(router, ask_knowledge_base, aask_knowledge_base))
+
+    return create_agent(
+        model=model,
+        tools=[
+            StructuredTool.from_function(func=ask_knowledge_base, coroutine=aask_knowledge_base, response_format="content_and_artifact"),
+            StructuredTool.from_function(func=ask_web_search, coroutine=aask_web_search),
+        ],
+        system_prompt=Config.SUPERVISOR_PROMPT,
+        checkpointer=checkpointer,
+        middleware=middleware,
+    )
+
 class Agent:
-    def __init__(self):
-        # Initialize Checkpointer with Postgres using ConnectionPool    
-        self.pool = ConnectionPool(conninfo=Config.DB_URI, max_size=Config.DB_MAX_SIZE, kwargs=Config.DB_CONNECTION_KWARGS)
-        self.checkpointer = PostgresSaver(self.pool)
-        self.checkpointer.setup() # Ensure tables are created
+    def __init__(self, checkpointer: BaseCheckpointSaver | None = None, model=None, retriever=None, search_tool=None):
+        """Components left as None are created from Config; passing them in lets the load test
+        run the real graph with stand-in models, a local index and a local checkpointer."""
+        self.pool = None
+        if checkpointer is None:
+            # Initialize Checkpointer for the configured backend (Postgres ConnectionPool by default)
+            checkpointer, self.pool = create_checkpointer()
+        self.checkpointer = checkpointer
 
         # Initialize Hybrid Retriever
-        self.retriever = hybrid_retriever()
+        self.retriever = retriever or hybrid_retriever()
         # Initialize Tavily Search Tool
-        self.tavily_tool = TavilySearch(max_results=5)
+        self.tavily_tool = search_tool or TavilySearch(max_results=5)
         # Initialize Chat Model
-        self.model = init_chat_model(
+        self.model = model or init_chat_model(
             model=Config.CHAT_MODEL_NAME,
             temperature=Config.CHAT_MODEL_TEMPERATURE,
             timeout=Config.CHAT_MODEL_TIMEOUT,
             max_tokens=Config.CHAT_MODEL_MAX_TOKENS,
         )
 
-        # Define Tools
-        @tool(response_format="content_and_artifact")
-        def retrieve_context(query: str):
-            """Retrieve information from the knowledge base to help answer a query."""
-            # Invoke Hybrid Search
-            retrieved_docs = self.retriever.invoke(query)
-
-            # Rerank Documents
-            reranked_docs = rerank_documents(query, retrieved_docs, top_n=Config.RERANKER_TOP_N)
-            
-            # Convert docs to a serializable artifact representation
-            serialized = "\n\n".join(
-                (f"Source: {doc.metadata}\nContent: {doc.page_content}")
-                for doc in reranked_docs
-            )
-            return serialized, reranked_docs
-        
-        @tool
+        # Define Tools (each has a sync and an async implementation, used by invoke/stream and ainvoke/astream)
+        retrieve_context, aretrieve_context = make_retrieve_context(self.retriever)
+
         def web_search(query: str):
             """Search the web for information using Tavily."""
             # Invoke Tavily Search
-            web_search_results = self.tavily_tool.invoke(query)
-            # Return results
-            return web_search_results
+            return self.tavily_tool.invoke(query)
+
+        async def aweb_search(query: str):
+            return await self.tavily_tool.ainvoke(query)
 
         # Specialized Sub-Agents
-        knowledge_agent = create_agent(
-            model=self.model,
-            tools=[retrieve_context],
-            system_prompt=Config.KNOWLEDGE_AGENT_PROMPT
-        )
+        if Config.KNOWLEDGE_FAST_PATH:
+            knowledge_agent = DirectKnowledgeAgent(self.model, retrieve_context, aretrieve_context)
+        else:
+            knowledge_agent = create_agent(
+                model=self.model,
+                tools=[StructuredTool.from_function(func=retrieve_context, coroutine=aretrieve_context, response_format="content_and_artifact")],
+                system_prompt=Config.KNOWLEDGE_AGENT_PROMPT
+            )
         
         search_agent = create_agent(
             model=self.model,
-            tools=[web_search],
+            tools=[StructuredTool.from_function(func=web_search, coroutine=aweb_search)],
             system_prompt=Config.SEARCH_AGENT_PROMPT
         )
 
-        # Wrap Sub-Agents as Supervisor Tools
-        @tool
-        def ask_knowledge_base(query: str):
-            """Use this tool to ask questions that might be found in the internal knowledge base documents"""
-            # Invoking the sub-agent
-            result = knowledge_agent.invoke({"messages": [{"role": "user", "content": query}]})
-            # Return the final response text
-            if "messages" in result:
-                return result["messages"][-1].content
-            return str(result)
-
-        @tool
-        def ask_web_search(query: str):
-            """Use this tool to search for information on the public web"""
-            # Invoking the sub-agent
-            result = search_agent.invoke({"messages": [{"role": "user", "content": query}]})
-            # Return the final response text
-            if "messages" in result:
-                return result["messages"][-1].content
-            return str(result)
-
         # Supervisor Agent 
-        self.agent = create_agent(
+        if Config.TRIM_STRATEGY == "tokens":
+            middleware = [RollingSummaryMiddleware(self.model)]
+        else:
+            middleware = [trim_messages]
+        if Config.ANSWER_CACHE_ENABLED:
+            middleware = [AnswerCacheMiddleware(), *middleware]
+
+        self.agent = build_supervisor(
             model=self.model,
-            tools=[ask_knowledge_base, ask_web_search],
-            system_prompt=Config.SUPERVISOR_PROMPT,
+            knowledge_agent=knowledge_agent,
+            search_agent=search_agent,
             checkpointer=self.checkpointer,
-            middleware=[trim_messages],
+            middleware=middleware,
+            router=get_intent_router() if Config.ROUTER_ENABLED else None,
         )
+
+class AsyncAgent(Agent):
+    """Agent with an async checkpointer (AsyncPostgresSaver / AsyncSqliteSaver), for use with `agent.ainvoke` / `agent.astream`.
+
+    Create it inside the event loop that will run it: `agent = await AsyncAgent.create()`.
+    """
+
+    @classmethod
+    async def create(cls) -> "AsyncAgent":
+        checkpointer, pool = await acreate_checkpointer()
+        agent = cls(checkpointer=checkpointer)
+        agent.pool = pool
+        return agent
+
+    async def aclose(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
@@ -1,66 +1,218 @@
-import torch
+import os
+import time
+import numpy as np
+from typing import Tuple
 import streamlit as st
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-from src.config import Config
+from src.config import Config, get_device
+from src.rag.batching import MicroBatcher
+from src.rag.cache import RerankScoreCache
+from src.rag.telemetry import record, timed
+from src.rag.tokens import estimate_tokens
+
+def _load_torch_reranker(model_name: str):
+    # torch / transformers are imported with the model, not at page load
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
-@st.cache_resource
-def get_reranker_model():
-    # Reranker Model
-    model_name = Config.RERANKER_MODEL
     tokenizer = AutoTokenizer.from_pretrained(model_name)
     model = AutoModelForSequenceClassification.from_pretrained(model_name)
     model.eval()
-    
+
     # Auto detect device
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model.to(device)    
-    
+    device = get_device()
+    model.to(device)
+
     # For float16 precision on GPU
     if device == "cuda":
         model = model.half()
-        
+
     return tokenizer, model, device
 
-def rerank_documents(query: str, docs: list, top_n: int = Config.RERANKER_TOP_N):
-    # Return if empty
-    if not docs:
-        return []
+def _load_onnx_reranker(model_name: str):
+    # Optional dependency, only needed for the ONNX backend
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    onnx_dir = Config.RERANKER_ONNX_DIR
+    quantized_file = "model_quantized.onnx"
+
+    # 1. Export and quantize once, then reuse the files on disk
+    if not os.path.exists(os.path.join(onnx_dir, quantized_file)):
+        ort_model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        ort_model.save_pretrained(onnx_dir)
+
+        # Dynamic int8 quantization of the weights (activations stay fp32)
+        quantizer = ORTQuantizer.from_pretrained(ort_model)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=onnx_dir, quantization_config=qconfig)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(onnx_dir)
+
+    # 2. Load the quantized graph on the CPU execution provider
+    tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+    model = ORTModelForSequenceClassification.from_pretrained(
+        onnx_dir,
+        file_name=quantized_file,
+        provider="CPUExecutionProvider",
+    )
+    return tokenizer, model, "cpu"
+
+def load_reranker(backend: str = Config.RERANKER_BACKEND):
+    """Load the reranker tokenizer and model for the given backend ("torch" or "onnx")."""
+    if backend == "torch":
+        return _load_torch_reranker(Config.RERANKER_MODEL)
+    if backend == "onnx":
+        return _load_onnx_reranker(Config.RERANKER_MODEL)
+    raise ValueError(f"Unsupported reranker backend: {backend}. Supported backends: torch, onnx")
+
+@st.cache_resource
+def get_reranker_model():
+    # Reranker Model
+    return load_reranker(Config.RERANKER_BACKEND)
+
+@st.cache_resource
+def get_rerank_cache() -> RerankScoreCache:
+    # Scores depend on the model and backend, so both are part of the key namespace
+    return RerankScoreCache(
+        max_size=Config.RERANK_CACHE_SIZE,
+        db_path=Config.RERANK_CACHE_PATH,
+        max_rows=Config.RERANK_CACHE_DISK_ROWS,
+        namespace=f"{Config.RERANKER_MODEL}:{Config.RERANKER_BACKEND}",
+    )
+
+def _pair_tokens(pair: list) -> int:
+    # Pairs are truncated to 512 tokens by the tokenizer
+    return min(512, estimate_tokens(pair[0]) + estimate_tokens(pair[1]))
+
+@st.cache_resource
+def get_rerank_batcher() -> MicroBatcher:
+    # Shared by every session: concurrent rerank calls are scored in one padded batch
+    reranker = get_reranker_model()
+    return MicroBatcher(
+        batch_fn=lambda pairs: score_pairs(pairs, reranker),
+        cost_fn=_pair_tokens,
+        max_wait_ms=Config.MICRO_BATCH_WAIT_MS,
+        max_batch_cost=Config.MICRO_BATCH_MAX_TOKENS,
+        name="rerank-batcher",
+    )
+
+def score_pairs(pairs: list, reranker=None, batch_size: int = 32) -> np.ndarray:
+    """Score [query, passage] pairs with the cross-encoder and return the raw logits."""
+    import torch
 
-    # 1. Initialize Reranker model
-    tokenizer, model, device = get_reranker_model()
-    
-    # 2. Build [Query, Document Content] pairs
-    pairs = [[query, doc.page_content] for doc in docs]
-    
-    # Batch inference
-    batch_size = 32
+    tokenizer, model, device = reranker or get_reranker_model()
     all_scores = []
-    
-    # 3. Model inference
+    tokenize_seconds = forward_seconds = 0.0
+
     with torch.no_grad():
         for i in range(0, len(pairs), batch_size):
             batch_pairs = pairs[i:i + batch_size]
+            start = time.perf_counter()
             inputs = tokenizer(
-                batch_pairs, 
-                padding=True, 
-                truncation=True, 
-                return_tensors='pt', 
+                batch_pairs,
+                padding=True,
+                truncation=True,
+                return_tensors='pt',
                 max_length=512
             ).to(device)
-            
+            tokenize_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
             scores = model(**inputs, return_dict=True).logits.view(-1, ).float()
             all_scores.extend(scores.cpu().numpy())
-            
-    # 4. Associate scores with documents
-    import numpy as np
-    scores_array = np.array(all_scores)
-    top_indices = np.argsort(scores_array)[::-1][:top_n]
-    
-    # 5. Add scores to top n documents
+            forward_seconds += time.perf_counter() - start
+
+    record("rerank.tokenize", tokenize_seconds)
+    record("rerank.forward", forward_seconds)
+    return np.array(all_scores, dtype=np.float32)
+
+def _score_documents(query: str, docs: list) -> np.ndarray:
+    """Cross-encoder scores for `docs`, with cached pairs skipped and misses micro-batched."""
+    # 1. Look up cached scores, only unseen (query, chunk) pairs go to the model
+    contents = [doc.page_content for doc in docs]
+    cache = get_rerank_cache() if Config.RERANK_CACHE_ENABLED else None
+    cached = cache.get_many(query, contents) if cache is not None else [None] * len(docs)
+    miss_indices = [i for i, score in enumerate(cached) if score is None]
+
+    # 2. Build [Query, Document Content] pairs for the misses and run inference
+    if miss_indices:
+        pairs = [[query, contents[i]] for i in miss_indices]
+        if Config.RERANK_MICRO_BATCHING:
+            miss_scores = np.array(get_rerank_batcher().submit(pairs), dtype=np.float32)
+        else:
+            miss_scores = score_pairs(pairs)
+        for i, score in zip(miss_indices, miss_scores):
+            cached[i] = float(score)
+        if cache is not None:
+            cache.set_many(query, [contents[i] for i in miss_indices], miss_scores)
+
+    return np.array(cached, dtype=np.float32)
+
+def _top_documents(docs: list, scores: np.ndarray, top_n: int) -> list:
+    # Highest scores first, with the score added to each returned document
     result_docs = []
-    for idx in top_indices:
+    for idx in np.argsort(scores)[::-1][:top_n]:
         doc = docs[idx]
-        doc.metadata["relevance_score"] = float(scores_array[idx])
+        doc.metadata["relevance_score"] = float(scores[idx])
         result_docs.append(doc)
-    
-    return result_docs
\ No newline at end of file
+    return result_docs
+
+@timed("rerank")
+def rerank_documents(query: str, docs: list, top_n: int = Config.RERANKER_TOP_N):
+    # Return if empty
+    if not docs:
+        return []
+
+    return _top_documents(docs, _score_documents(query, docs), top_n)
+
+def rerank_depth(hybrid_scores: list, top_n: int, margin: float = Config.ADAPTIVE_RERANK_MARGIN) -> int:
+    """How many leading candidates (hybrid scores in descending order) need cross-encoder scoring.
+
+    Candidates scoring within `margin` of the score spread below the top_n-th one could still
+    overtake it, the rest are left out. When the top_n are well separated from the rest the
+    depth is just top_n (early exit), when the scores are flat every candidate is scored.
+    """
+    if len(hybrid_scores) <= top_n:
+        return len(hybrid_scores)
+    spread = hybrid_scores[0] - hybrid_scores[-1]
+    if spread <= 0:
+        return len(hybrid_scores)
+    cutoff = hybrid_scores[top_n - 1] - margin * spread
+    return top_n + sum(1 for score in hybrid_scores[top_n:] if score >= cutoff)
+
+@timed("rerank")
+def rerank_adaptive(
+    query: str,
+    docs: list,
+    top_n: int = Config.RERANKER_TOP_N,
+    max_pairs: int = Config.ADAPTIVE_RERANK_MAX,
+    step: int = Config.ADAPTIVE_RERANK_STEP,
+) -> Tuple[list, int]:
+    """Cascaded reranking: cross-encode only as deep as the hybrid scores suggest, then keep
+    going `step` candidates at a time while the reranker pulls winners from the edge of the
+    scored window. Returns the top documents and the number of pairs scored.
+
+    `docs` must be in retrieval order with the hybrid score in metadata["score"].
+    """
+    if not docs:
+        return [], 0
+
+    limit = min(len(docs), max_pairs)
+    hybrid_scores = [doc.metadata.get("score") for doc in docs[:limit]]
+    if any(score is None for score in hybrid_scores):
+        # No score distribution to go on, score up to the maximum
+        return _top_documents(docs, _score_documents(query, docs[:limit]), top_n), limit
+
+    # 1. Initial depth from the hybrid score distribution
+    depth = max(1, rerank_depth(hybrid_scores, top_n))
+    scores = _score_documents(query, docs[:depth])
+
+    # 2. Extend while a winner sits among the newest candidates past the hybrid top_n
+    while depth < limit and depth > top_n:
+        winners = np.argsort(scores)[::-1][:top_n]
+        if winners.max() < max(top_n, depth - step):
+            break
+        new_depth = min(limit, depth + step)
+        scores = np.concatenate([scores, _score_documents(query, docs[depth:new_depth])])
+        depth = new_depth
+
+    return _top_documents(docs, scores, top_n), depth
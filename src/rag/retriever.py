@@ -1,17 +1,123 @@
 import streamlit as st
+from typing import List
 from pinecone import Pinecone
 from pinecone_text.sparse import BM25Encoder
 from langchain_community.retrievers import PineconeHybridSearchRetriever
-from langchain_huggingface import HuggingFaceEmbeddings
-from src.config import Config
+from langchain_core.embeddings import Embeddings
+from src.config import Config, get_device
+from src.rag.batching import MicroBatcher
+from src.rag.cache import LRUCache, normalize_query
+from src.rag.tokens import estimate_tokens
+from src.rag.local_index import LocalHybridIndex
+from src.rag.telemetry import span
+
+class CachedQueryEmbeddings(Embeddings):
+    """Memoize dense query vectors; document embedding goes straight to the model."""
+
+    def __init__(self, embeddings: Embeddings, cache: LRUCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+class BatchedQueryEmbeddings(Embeddings):
+    """Send single-query embeddings through a shared micro-batcher; document batches
+    (ingestion) are already batched and go straight to the model."""
+
+    def __init__(self, embeddings: Embeddings, batcher: MicroBatcher):
+        self.embeddings = embeddings
+        self.batcher = batcher
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.submit([text])[0]
+
+class CachedSparseEncoder:
+    """Memoize BM25 query vectors; everything else is delegated to the wrapped encoder."""
+
+    def __init__(self, encoder: BM25Encoder, cache: LRUCache):
+        self.encoder = encoder
+        self.cache = cache
+
+    def encode_queries(self, texts):
+        # Batched calls are rare on the query path, pass them through
+        if not isinstance(texts, str):
+            return self.encoder.encode_queries(texts)
+
+        key = normalize_query(texts)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.encoder.encode_queries(texts)
+            self.cache.set(key, vector)
+        return vector
+
+    def __getattr__(self, name):
+        return getattr(self.encoder, name)
+
+class TimedQueryEmbeddings(Embeddings):
+    """Record dense query encoding time (including any cache lookup)."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with span("encode.dense"):
+            return self.embeddings.embed_query(text)
+
+class TimedProxy:
+    """Record the time of selected methods of the wrapped object, delegating everything else."""
+
+    def __init__(self, target, stages: dict):
+        self._target = target
+        self._stages = stages
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        stage = self._stages.get(name)
+        if stage is None or not callable(attr):
+            return attr
+
+        def timed_call(*args, **kwargs):
+            with span(stage):
+                return attr(*args, **kwargs)
+        return timed_call
 
 @st.cache_resource
 def get_embedding_model():
+    # Imported here so sentence-transformers / torch load with the model, not with the page
+    from langchain_huggingface import HuggingFaceEmbeddings
+
     embedding_model = HuggingFaceEmbeddings(
         model_name=Config.EMBEDDINGS_MODEL,
-        model_kwargs=Config.EMBEDDINGS_MODEL_KWARGS,
+        model_kwargs={"device": get_device(), **Config.EMBEDDINGS_MODEL_KWARGS},
         encode_kwargs=Config.EMBEDDINGS_MODEL_ENCODE_KWARGS  
     )
+
+    # Concurrent queries from all sessions share one forward pass
+    if Config.MICRO_BATCHING:
+        # bge-m3 encodes queries and documents the same way, so queries can be batched as documents
+        batcher = MicroBatcher(
+            batch_fn=embedding_model.embed_documents,
+            cost_fn=estimate_tokens,
+            max_wait_ms=Config.MICRO_BATCH_WAIT_MS,
+            max_batch_cost=Config.MICRO_BATCH_MAX_TOKENS,
+            name="embedding-batcher",
+        )
+        return BatchedQueryEmbeddings(embedding_model, batcher)
     return embedding_model  
 
 @st.cache_resource
@@ -19,6 +125,23 @@ def get_bm25_encoder():
     bm25_encoder = BM25Encoder.default()
     return bm25_encoder
 
+@st.cache_resource
+def get_vector_index():
+    """Return the index backing the hybrid retriever ("pinecone" or the in-process "local" engine)."""
+    if Config.VECTORSTORE_BACKEND == "local":
+        return LocalHybridIndex(Config.LOCAL_INDEX_DIR)
+    if Config.VECTORSTORE_BACKEND == "pinecone":
+        pc = Pinecone(api_key=Config.PINECONE_API_KEY)
+        return pc.Index(Config.PINECONE_INDEX_NAME)
+    raise ValueError(f"Unsupported vector store backend: {Config.VECTORSTORE_BACKEND}. Supported backends: pinecone, local")
+
+@st.cache_resource
+def get_query_vector_caches() -> tuple[LRUCache, LRUCache]:
+    # Shared by every Streamlit session through the cached retriever
+    dense_cache = LRUCache(Config.QUERY_CACHE_SIZE, ttl=Config.QUERY_CACHE_TTL)
+    sparse_cache = LRUCache(Config.QUERY_CACHE_SIZE, ttl=Config.QUERY_CACHE_TTL)
+    return dense_cache, sparse_cache
+
 @st.cache_resource
 def hybrid_retriever() -> PineconeHybridSearchRetriever:  
     # 1. Get Cached Embeddings Model (Dense Vector)
@@ -27,9 +150,20 @@ def hybrid_retriever() -> PineconeHybridSearchRetriever:
     # 2. Get Cached BM25 Encoder (Sparse Vector)
     bm25_encoder = get_bm25_encoder()
 
-    # 3. Connect to Pinecone
-    pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-    index = pc.Index(Config.PINECONE_INDEX_NAME)
+    # Memoize query vectors so repeated queries skip both encoders
+    if Config.QUERY_CACHE_ENABLED:
+        dense_cache, sparse_cache = get_query_vector_caches()
+        embedding_model = CachedQueryEmbeddings(embedding_model, dense_cache)
+        bm25_encoder = CachedSparseEncoder(bm25_encoder, sparse_cache)
+
+    # 3. Connect to the vector index (Pinecone or local)
+    index = get_vector_index()
+
+    # Per-stage latency spans for the query path
+    if Config.METRICS_ENABLED:
+        embedding_model = TimedQueryEmbeddings(embedding_model)
+        bm25_encoder = TimedProxy(bm25_encoder, {"encode_queries": "encode.sparse"})
+        index = TimedProxy(index, {"query": "vector_search"})
 
     # 4. Build hybrid retriever
     retriever = PineconeHybridSearchRetriever(
@@ -0,0 +1,230 @@
+import asyncio
+import threading
+import time
+import uuid
+import numpy as np
+import streamlit as st
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from langchain.agents import AgentState
+from langchain.agents.middleware import AgentMiddleware, hook_config
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.runtime import Runtime
+from src.config import Config
+from src.rag.cache import LRUCache
+from src.rag.retriever import get_embedding_model
+
+# Labelled exemplars per intent. "web_search" is never dispatched locally, it is here so
+# current-events questions land on it instead of being mistaken for knowledge-base ones.
+INTENT_EXEMPLARS: Dict[str, List[str]] = {
+    "greeting": [
+        "hi", "hello", "hey there", "good morning", "good afternoon", "how are you?",
+        "hello, who are you?", "what can you do?",
+    ],
+    "closing": [
+        "thanks", "thank you so much", "thanks for the help", "bye", "goodbye", "that's all, thanks",
+    ],
+    "knowledge_base": [
+        "What is the waterfall model?",
+        "Explain the SOLID principles.",
+        "What is the difference between verification and validation?",
+        "Define software requirements specification.",
+        "What is unit testing?",
+        "Explain agile methodology and scrum.",
+        "What are UML use case diagrams?",
+        "What does the course outline say about assessments?",
+        "Summarize the chapter on software design patterns.",
+        "What are functional and non-functional requirements?",
+    ],
+    "web_search": [
+        "What is the latest news about AI?",
+        "Who won the match yesterday?",
+        "What is the current version of React?",
+        "What are the software engineering trends this year?",
+        "What's the weather today?",
+    ],
+}
+
+# Intents that may be dispatched without the supervisor
+LOCAL_INTENTS = ("greeting", "closing", "knowledge_base")
+
+# Canned replies for intents that do not need a model at all
+CANNED_REPLIES = {
+    "greeting": "Hello! I can answer questions based on your knowledge base or search the web. How can I help you?",
+    "closing": "You're welcome! Feel free to come back if you have more questions.",
+}
+
+class RouterMetrics:
+    """Counts routing decisions and compares turn latency of routed vs supervised turns."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.decisions: Dict[str, int] = defaultdict(int)
+        self.router_seconds = 0.0
+        # label -> [turns, total seconds]; "supervisor" holds the fallback turns
+        self._turns: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        # Fallback turns by the intent the router classified them as, [turns, total seconds]
+        self._supervised: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        # Question text -> classified intent, to attribute fallback turns once they finish
+        self._intents = LRUCache(1024)
+
+    def record_decision(self, label: str, seconds: float, intent: Optional[str] = None, text: Optional[str] = None) -> None:
+        with self._lock:
+            self.decisions[label] += 1
+            self.router_seconds += seconds
+        if intent and text is not None:
+            self._intents.set(text, intent)
+
+    def record_turn(self, label: Optional[str], seconds: float, text: Optional[str] = None) -> None:
+        """Record end-to-end turn latency; label is the routed intent or None for the supervisor,
+        `text` the question (used to look up the intent of a supervised turn)."""
+        intent = self._intents.get(text) if label is None and text is not None else None
+        with self._lock:
+            turns = self._turns[label or "supervisor"]
+            turns[0] += 1
+            turns[1] += seconds
+            if intent:
+                supervised = self._supervised[intent]
+                supervised[0] += 1
+                supervised[1] += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.decisions.values())
+            routed = sum(n for label, n in self.decisions.items() if label != "supervisor")
+            mean = {label: secs / n for label, (n, secs) in self._turns.items() if n}
+            supervised = {intent: secs / n for intent, (n, secs) in self._supervised.items() if n}
+
+            # Estimated saving: each routed turn vs supervised turns of the same intent (ones the
+            # router was not confident about, or knowledge-base follow-ups). Intents the
+            # supervisor has not handled yet have nothing to compare against and are left out.
+            saved = sum(
+                n * (supervised[label] - mean[label])
+                for label, (n, _) in self._turns.items() if label in supervised and n
+            )
+
+            return {
+                "decisions": dict(self.decisions),
+                "short_circuit_rate": routed / total if total else 0.0,
+                "mean_router_ms": 1000 * self.router_seconds / total if total else 0.0,
+                "mean_turn_seconds": mean,
+                "mean_supervised_turn_seconds_by_intent": supervised,
+                "estimated_seconds_saved": saved,
+            }
+
+class IntentRouter:
+    """Nearest-exemplar intent classifier over the shared embedding model."""
+
+    def __init__(self, embeddings: Embeddings, exemplars: Dict[str, List[str]], threshold: float, margin: float):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.margin = margin
+        self.metrics = RouterMetrics()
+
+        self.labels = list(exemplars)
+        texts, owners = [], []
+        for i, label in enumerate(self.labels):
+            texts.extend(exemplars[label])
+            owners.extend([i] * len(exemplars[label]))
+        self._owners = np.array(owners)
+        self._matrix = self._normalize(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def classify(self, text: str) -> Tuple[str, float, float]:
+        """Return (best label, best similarity, margin over the runner-up label)."""
+        vector = self._normalize(np.asarray(self.embeddings.embed_query(text), dtype=np.float32))
+        similarities = self._matrix @ vector
+
+        # Score each label by its closest exemplar
+        label_scores = np.full(len(self.labels), -np.inf)
+        np.maximum.at(label_scores, self._owners, similarities)
+        order = np.argsort(label_scores)[::-1]
+        best, runner_up = label_scores[order[0]], label_scores[order[1]]
+        return self.labels[order[0]], float(best), float(best - runner_up)
+
+    def route(self, text: str, allowed: Iterable[str] = LOCAL_INTENTS) -> Optional[str]:
+        """Return the intent to dispatch locally, or None to fall back to the supervisor."""
+        start = time.perf_counter()
+        label, score, margin = self.classify(text)
+        confident = score >= self.threshold and margin >= self.margin
+        decision = label if confident and label in allowed else None
+        self.metrics.record_decision(decision or "supervisor", time.perf_counter() - start, intent=label, text=text)
+        return decision
+
+@st.cache_resource
+def get_intent_router() -> IntentRouter:
+    return IntentRouter(
+        embeddings=get_embedding_model(),
+        exemplars=INTENT_EXEMPLARS,
+        threshold=Config.ROUTER_THRESHOLD,
+        margin=Config.ROUTER_MARGIN,
+    )
+
+def _latest_question(messages: list) -> Tuple[int, Optional[HumanMessage]]:
+    human = [msg for msg in messages if isinstance(msg, HumanMessage)]
+    return len(human), (human[-1] if human else None)
+
+class IntentRouterMiddleware(AgentMiddleware):
+    """Dispatch obvious intents before the supervisor's first model call.
+
+    Greetings and closings get a canned reply on any turn. Knowledge-base questions are sent
+    straight to the knowledge sub-agent, but only on a thread's opening turn, where they do
+    not depend on earlier context. Everything else falls through to the supervisor.
+    """
+
+    def __init__(
+        self,
+        router: IntentRouter,
+        ask_knowledge_base: Callable[[str], Tuple[Any, list]],
+        aask_knowledge_base: Callable[[str], Awaitable[Tuple[Any, list]]],
+    ):
+        super().__init__()
+        self.router = router
+        self.ask_knowledge_base = ask_knowledge_base
+        self.aask_knowledge_base = aask_knowledge_base
+
+    def _decide(self, state: AgentState) -> Tuple[Optional[str], Optional[str]]:
+        turns, question = _latest_question(state["messages"])
+        if question is None or not isinstance(question.content, str):
+            return None, None
+
+        # Follow-up questions may depend on the thread history, leave those to the supervisor
+        allowed = LOCAL_INTENTS if turns == 1 else ("greeting", "closing")
+        return self.router.route(question.content, allowed), question.content
+
+    @staticmethod
+    def _messages(label: str, query: str, result: Optional[Tuple[Any, list]] = None) -> list:
+        metadata = {"intent_router": label}
+        if result is None:
+            return [AIMessage(content=CANNED_REPLIES[label], response_metadata=metadata)]
+
+        # Record the dispatch as if the supervisor had called the tool itself
+        content, sources = result
+        call_id = f"call_{uuid.uuid4().hex}"
+        return [
+            AIMessage(content="", tool_calls=[{"name": "ask_knowledge_base", "args": {"query": query}, "id": call_id}], response_metadata=metadata),
+            ToolMessage(content=content, artifact=sources, name="ask_knowledge_base", tool_call_id=call_id),
+            AIMessage(content=content, response_metadata=metadata),
+        ]
+
+    @hook_config(can_jump_to=["end"])
+    def before_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        label, query = self._decide(state)
+        if label is None:
+            return None
+        result = self.ask_knowledge_base(query) if label == "knowledge_base" else None
+        return {"messages": self._messages(label, query, result), "jump_to": "end"}
+
+    @hook_config(can_jump_to=["end"])
+    async def abefore_agent(self, state: AgentState, runtime: Runtime) -> dict[str, Any] | None:
+        # Embedding the question is CPU-bound, keep it off the event loop
+        label, query = await asyncio.to_thread(self._decide, state)
+        if label is None:
+            return None
+        result = await self.aask_knowledge_base(query) if label == "knowledge_base" else None
+        return {"messages": self._messages(label, query, result), "jump_to": "end"}
@@ -0,0 +1,209 @@
+"""Per-stage latency spans for the RAG pipeline.
+
+`span(stage)` times a block, adds it to a process-wide histogram and, inside `track_turn()`,
+to the current turn's breakdown. LLM and tool calls are timed by `StageTimingHandler`, a
+LangChain callback passed in the run config. Histograms are exported in Prometheus text
+format (`prometheus_text()`, or a small HTTP endpoint with METRICS_PORT) and turns can be
+appended to a JSON lines log (METRICS_JSON_LOG).
+"""
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from src.config import Config
+
+# Upper bounds in seconds, from cache hits to slow LLM calls
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+class StageMetrics:
+    """Latency histograms per pipeline stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = defaultdict(Histogram)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._histograms[stage].observe(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {"count": h.count, "mean_ms": 1000 * h.sum / h.count if h.count else 0.0}
+                for stage, h in sorted(self._histograms.items())
+            }
+
+    def prometheus_text(self, name: str = "rag_stage_latency_seconds") -> str:
+        lines = [
+            f"# HELP {name} Latency of RAG pipeline stages.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip((*h.buckets, "+Inf"), h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide histograms, shared by every session
+METRICS = StageMetrics()
+
+@dataclass
+class TurnTimings:
+    """Spans recorded during one chat turn, in completion order."""
+    spans: List[Tuple[str, float]] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.spans.append((stage, seconds))
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Total seconds and call count per stage (nested stages overlap their parents)."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for stage, seconds in self.spans:
+            entry = totals.setdefault(stage, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+        return totals
+
+_current_turn: ContextVar[Optional[TurnTimings]] = ContextVar("current_turn", default=None)
+
+def record(stage: str, seconds: float, turn: Optional[TurnTimings] = None) -> None:
+    if not Config.METRICS_ENABLED:
+        return
+    METRICS.observe(stage, seconds)
+    turn = turn or _current_turn.get()
+    if turn is not None:
+        turn.add(stage, seconds)
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+def timed(stage: str):
+    """Decorator form of `span`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def track_turn():
+    """Collect the spans of one turn (including worker threads and tasks that copy the context)."""
+    turn = TurnTimings()
+    token = _current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _current_turn.reset(token)
+        record("turn", time.perf_counter() - turn.started, turn)
+        if Config.METRICS_JSON_LOG:
+            write_turn_log(turn)
+
+_log_lock = threading.Lock()
+
+def write_turn_log(turn: TurnTimings, path: Optional[str] = None) -> None:
+    entry = {"ts": time.time(), "stages": turn.breakdown()}
+    with _log_lock, open(path or Config.METRICS_JSON_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+def llm_stage(metadata: Optional[Dict[str, Any]]) -> str:
+    """Name an LLM call after the graph node that made it."""
+    metadata = metadata or {}
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    node = metadata.get("langgraph_node")
+    # Sub-agents run inside the supervisor's tool node
+    if namespace.startswith("tools:") or "|" in namespace:
+        return "llm.subagent"
+    if node == "model":
+        return "llm.supervisor"
+    return f"llm.{node or 'other'}"
+
+class StageTimingHandler(BaseCallbackHandler):
+    """Times every LLM and tool run of a turn."""
+
+    def __init__(self, turn: Optional[TurnTimings] = None):
+        self.turn = turn
+        self._starts: Dict[UUID, Tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, stage: str) -> None:
+        self._starts[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id: UUID) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            stage, start = started
+            record(stage, time.perf_counter() - start, self.turn)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs) -> None:
+        self._start(run_id, llm_stage(metadata))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs) -> None:
+        self._start(run_id, llm_stage(metadata))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id, f"tool.{(serialized or {}).get('name') or kwargs.get('name', 'unknown')}")
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self._end(run_id)
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int, host: str = Config.METRICS_HOST) -> ThreadingHTTPServer:
+    """Serve the histograms in Prometheus text format on http://<host>:<port>/metrics."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -1,16 +1,19 @@
-from typing import List
+from typing import Iterable, Iterator, List
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from src.config import Config
 
-def chunk_documents(documents: List[Document]) -> List[Document]:
-    # Text Splitter
-    text_splitter = RecursiveCharacterTextSplitter(
+def _get_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=Config.TEXT_SPLITTER_CHUNK_SIZE,
         chunk_overlap=Config.TEXT_SPLITTER_CHUNK_OVERLAP,
         add_start_index=Config.TEXT_SPLITTER_ADD_START_INDEX,
     )
-    
+
+def chunk_documents(documents: List[Document]) -> List[Document]:
+    # Text Splitter
+    text_splitter = _get_text_splitter()
+
     # Split the documents into chunks
     doc_splits = text_splitter.split_documents(documents)
     
@@ -20,4 +23,14 @@ def chunk_documents(documents: List[Document]) -> List[Document]:
             raise ValueError("Chunk metadata missing ref_id")
         
     # Return the chunks
-    return doc_splits
\ No newline at end of file
+    return doc_splits
+
+def iter_chunks(documents: Iterable[Document]) -> Iterator[Document]:
+    """Split documents one at a time, yielding chunks as soon as each document is split."""
+    text_splitter = _get_text_splitter()
+
+    for document in documents:
+        for chunk in text_splitter.split_documents([document]):
+            if "ref_id" not in chunk.metadata:
+                raise ValueError("Chunk metadata missing ref_id")
+            yield chunk
@@ -0,0 +1,19 @@
+import json
+from src.config import Config
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; the chat model's tokenizer is not available locally."""
+    return -(-len(text) // Config.CONTEXT_CHARS_PER_TOKEN)
+
+def message_text(content) -> str:
+    """Plain text of str or list-of-parts message content."""
+    if isinstance(content, list):
+        return "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+    return str(content)
+
+def message_tokens(message) -> int:
+    """Estimated tokens of a message, including any tool-call arguments."""
+    tokens = estimate_tokens(message_text(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(tool_call["name"] + json.dumps(tool_call.get("args", {})))
+    return tokens
@@ -1,33 +1,237 @@
-from typing import List
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 from langchain_core.documents import Document
-from src.rag.retriever import hybrid_retriever
+from src.config import Config
+from src.rag.cache import fingerprint
+from src.rag.retriever import hybrid_retriever, get_vector_index
+from src.rag.answer_cache import clear_knowledge_base_answers, invalidate_answer_cache
 
-def index_documents(chunks: List[Document]) -> None:
+@dataclass
+class BatchStats:
+    batch: int
+    chunks: int
+    embed_seconds: float
+    upsert_seconds: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        total = self.embed_seconds + self.upsert_seconds
+        return self.chunks / total if total else 0.0
+
+@dataclass
+class SyncStats:
+    added: int
+    deleted: int
+    unchanged: int
+
+def chunk_id(doc: Document) -> str:
+    """Content-addressed vector id: `<ref_id>#<hash of the chunk text>`.
+
+    The ref_id prefix lets the chunks of one file be listed by id, and the hash makes
+    ids stable across re-uploads so unchanged chunks can be recognized.
+    """
+    return f"{doc.metadata['ref_id']}#{fingerprint(doc.page_content)[:32]}"
+
+def _encode_batch(retriever, chunks: List[Document]) -> list:
+    """Build Pinecone hybrid vectors for a batch, in the same layout `add_texts` uses."""
+    texts = [doc.page_content for doc in chunks]
+    dense_embeds = retriever.embeddings.embed_documents(texts)
+    sparse_embeds = retriever.sparse_encoder.encode_documents(texts)
+
+    vectors = []
+    for doc, text, dense, sparse in zip(chunks, texts, dense_embeds, sparse_embeds):
+        vectors.append({
+            "id": chunk_id(doc),
+            "sparse_values": {"indices": sparse["indices"], "values": [float(v) for v in sparse["values"]]},
+            "values": dense,
+            "metadata": {retriever.text_key: text, **doc.metadata},
+        })
+    return vectors
+
+def _flush(index) -> None:
+    # The local index persists its sidecar once per run rather than per batch
+    flush = getattr(index, "flush", None)
+    if callable(flush):
+        flush()
+
+def index_documents(
+    chunks: List[Document],
+    batch_size: int = Config.INDEX_BATCH_SIZE,
+    on_batch: Optional[Callable[[BatchStats], None]] = None,
+    retriever=None,
+    finalize: bool = True,
+) -> List[BatchStats]:
+    """Embed and upsert chunks in batches, overlapping encoding of the next batch with
+    concurrent upserts of the previous ones. `on_batch` is called as each batch lands.
+
+    `retriever` defaults to the shared hybrid retriever and its index. With `finalize=False`
+    the caller flushes the index and clears cached answers once it is done (see `sync_documents`).
+    """
     if not chunks:
-        return
-    
-    retriever = hybrid_retriever()
-    documents  = [doc.page_content for doc in chunks]
-    metadatas = [doc.metadata for doc in chunks]
+        return []
+
+    if retriever is None:
+        retriever, index = hybrid_retriever(), get_vector_index()
+    else:
+        index = retriever.index
+    stats: List[BatchStats] = []
+
+    def upsert(batch_no: int, vectors: list, embed_seconds: float) -> BatchStats:
+        start = time.perf_counter()
+        index.upsert(vectors, namespace=retriever.namespace)
+        return BatchStats(batch_no, len(vectors), embed_seconds, time.perf_counter() - start)
 
     # Upload Dense + Sparse Upsert
-    retriever.add_texts(documents, metadatas=metadatas)
+    with ThreadPoolExecutor(max_workers=Config.INDEX_UPSERT_WORKERS) as pool:
+        pending = set()
+
+        def collect(done) -> None:
+            for future in done:
+                batch_stats = future.result()
+                stats.append(batch_stats)
+                if on_batch:
+                    on_batch(batch_stats)
+
+        for batch_no, i in enumerate(range(0, len(chunks), batch_size), start=1):
+            start = time.perf_counter()
+            vectors = _encode_batch(retriever, chunks[i:i + batch_size])
+            embed_seconds = time.perf_counter() - start
+
+            # Bound the number of encoded batches held in memory
+            if len(pending) >= Config.INDEX_UPSERT_WORKERS:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(upsert, batch_no, vectors, embed_seconds))
+
+        done, _ = wait(pending)
+        collect(done)
+
+    if not finalize:
+        return sorted(stats, key=lambda s: s.batch)
+
+    _flush(index)
+
+    # Any cached knowledge-base answer may now be outdated, not just those citing these files
+    clear_knowledge_base_answers()
+    return sorted(stats, key=lambda s: s.batch)
+
+def _list_unsupported(exc: Exception) -> bool:
+    """Whether `exc` is the index refusing to list ids (pod-based Pinecone indexes), as opposed
+    to a transient failure that must not trigger a delete-and-reindex."""
+    if isinstance(exc, (AttributeError, NotImplementedError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    return status == 400 and "not supported" in str(exc).lower()
+
+def _list_chunk_ids(index, ref_id: str) -> Optional[Set[str]]:
+    """Ids stored for a ref_id, or None when the index cannot list ids by prefix
+    (only Pinecone serverless and the local index support it)."""
+    try:
+        return {id_ for page in index.list(prefix=f"{ref_id}#") for id_ in page}
+    except Exception as exc:
+        if _list_unsupported(exc):
+            return None
+        raise
+
+def _stored_metadata(index, ids: List[str], namespace: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Metadata of the given vector ids (Pinecone returns a FetchResponse, the local index a dict)."""
+    stored = {}
+    for i in range(0, len(ids), 100):
+        response = index.fetch(ids=ids[i:i + 100], namespace=namespace)
+        vectors = response.vectors if hasattr(response, "vectors") else response["vectors"]
+        for id_, vector in vectors.items():
+            stored[id_] = dict(vector.metadata if hasattr(vector, "metadata") else vector["metadata"])
+    return stored
+
+def _refresh_moved_chunks(index, chunks: List[Document], namespace: Optional[str]) -> int:
+    """Update page / start_index (and any other metadata) of unchanged chunks whose text moved
+    within the file, without re-embedding them. Returns the number of chunks updated."""
+    stored = _stored_metadata(index, [chunk_id(chunk) for chunk in chunks], namespace)
+    moved = 0
+    for chunk in chunks:
+        id_ = chunk_id(chunk)
+        metadata = stored.get(id_)
+        if metadata is None or all(metadata.get(key) == value for key, value in chunk.metadata.items()):
+            continue
+        index.update(id=id_, set_metadata=dict(chunk.metadata), namespace=namespace)
+        moved += 1
+    return moved
+
+def sync_documents(
+    chunks: Iterable[Document],
+    ref_id: str,
+    on_batch: Optional[Callable[[BatchStats], None]] = None,
+    window_size: int = Config.INGEST_WINDOW_SIZE,
+) -> SyncStats:
+    """Re-ingest a file: embed only new or changed chunks, delete stale ones and skip
+    the rest (refreshing their metadata when their text moved). Falls back to
+    delete-and-reindex when ids cannot be listed or the file only has legacy ids.
+
+    `chunks` may be a generator; it is consumed `window_size` chunks at a time so only
+    one window of chunks (plus the ids seen so far) is held in memory.
+    """
+    index = get_vector_index()
+    retriever = hybrid_retriever()
+    existing = _list_chunk_ids(index, ref_id)
+
+    # No `ref_id#` ids: either a new file, or one indexed with `add_texts`' bare text-hash ids,
+    # which would never be listed as stale. Clear those by metadata before re-indexing.
+    if not existing:
+        delete_index([ref_id])
+        existing = set()
+
+    chunks = iter(chunks)
+    seen: Set[str] = set()
+    added = unchanged = 0
+
+    while window := list(islice(chunks, window_size)):
+        # Identical chunks share an id, keep the first occurrence
+        to_add, kept = [], []
+        for chunk in window:
+            id_ = chunk_id(chunk)
+            if id_ in seen:
+                continue
+            seen.add(id_)
+            if id_ in existing:
+                kept.append(chunk)
+            else:
+                to_add.append(chunk)
+
+        # Unchanged text may have moved (new page / start_index), refresh its metadata only
+        if kept:
+            _refresh_moved_chunks(index, kept, retriever.namespace)
+        unchanged += len(kept)
+
+        # Upsert before deleting so the file never disappears from search mid-update
+        # Flushing the local index rewrites its whole sidecar, so it happens once below
+        index_documents(to_add, on_batch=on_batch, finalize=False)
+        added += len(to_add)
+
+    stale = sorted(existing - seen)
+    for i in range(0, len(stale), 1000):
+        index.delete(ids=stale[i:i + 1000], namespace=retriever.namespace)
+    _flush(index)
+
+    clear_knowledge_base_answers()
+
+    return SyncStats(added=added, deleted=len(stale), unchanged=unchanged)
 
 def delete_index(ref_ids: List[str]) -> None:
     # Remove empty values and duplicates
-    unique_ids = sorted({ref_id for ref_id in ref_ids if ref_id}) 
+    unique_ids = sorted({ref_id for ref_id in ref_ids if ref_id})
     if not unique_ids:
         # Nothing to delete
         return
-    
-    from pinecone import Pinecone
-    from src.config import Config
-    
-    pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-    index = pc.Index(Config.PINECONE_INDEX_NAME)
-    
+
+    index = get_vector_index()
+
     try:
         # Delete all vectors with the given ref_ids
         index.delete(filter={"ref_id": {"$in": unique_ids}})
     except Exception as exc:
-        raise RuntimeError(f"Failed to delete vectors for ref_ids {unique_ids}") from exc
\ No newline at end of file
+        raise RuntimeError(f"Failed to delete vectors for ref_ids {unique_ids}") from exc
+
+    invalidate_answer_cache(unique_ids)
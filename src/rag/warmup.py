@@ -0,0 +1,111 @@
+import logging
+import time
+import threading
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from src.config import Config
+from src.rag.checkpoints import create_checkpointer
+from src.rag.reranker import get_reranker_model
+from src.rag.retriever import get_bm25_encoder, get_embedding_model, get_vector_index
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ComponentTiming:
+    seconds: Optional[float] = None
+    # Offset from the start of the warm-up, to show what overlapped
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "failed"
+        return "loading" if self.seconds is None else "ready"
+
+class Warmup:
+    """Load independent startup components concurrently in background threads.
+
+    Each task runs once; `result(name)` blocks until that component is ready and re-raises
+    its error, so callers that need a component early simply wait for it.
+    """
+
+    def __init__(self, tasks: Dict[str, Callable[[], Any]]):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, ComponentTiming] = {name: ComponentTiming() for name in tasks}
+        self._lock = threading.Lock()
+
+        executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warmup")
+        self._futures = {name: executor.submit(self._run, name, task) for name, task in tasks.items()}
+        executor.shutdown(wait=False)
+
+    def _run(self, name: str, task: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return task()
+        except Exception as exc:
+            self.timings[name].error = str(exc)
+            raise
+        finally:
+            self._record(name, start)
+
+    def _record(self, name: str, start: float) -> None:
+        end = time.perf_counter()
+        with self._lock:
+            timing = self.timings.setdefault(name, ComponentTiming())
+            timing.seconds = end - start
+            timing.finished_at = end - self.started
+            ready = all(t.seconds is not None for t in self.timings.values())
+        # Log once everything so far is ready (and again after each later timed step)
+        if ready:
+            logger.info("Startup timings: %s", self.report())
+
+    @contextmanager
+    def timed(self, name: str):
+        """Time a startup step that runs outside the warm-up (e.g. building the agent)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start)
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        return self._futures[name].result(timeout)
+
+    def report(self) -> Dict[str, Any]:
+        components = {
+            name: {
+                "status": timing.status,
+                "seconds": None if timing.seconds is None else round(timing.seconds, 2),
+                "finished_at": None if timing.finished_at is None else round(timing.finished_at, 2),
+                **({"error": timing.error} if timing.error else {}),
+            }
+            for name, timing in self.timings.items()
+        }
+        finished = [t.finished_at for t in self.timings.values() if t.finished_at is not None]
+        return {
+            "components": components,
+            # Sum of the component times vs the time until the last one was ready
+            "serial_seconds": round(sum(t.seconds for t in self.timings.values() if t.seconds is not None), 2),
+            "wall_seconds": round(max(finished), 2) if finished else None,
+        }
+
+def warmup_tasks() -> Dict[str, Callable[[], Any]]:
+    tasks = {
+        "embedding_model": get_embedding_model,
+        "bm25_encoder": get_bm25_encoder,
+        "reranker": get_reranker_model,
+        "vector_index": get_vector_index,
+    }
+    # The async checkpointer has to be opened inside the agent's event loop
+    if not Config.AGENT_ASYNC:
+        tasks["checkpointer"] = create_checkpointer
+    return tasks
+
+@st.cache_resource
+def start_warmup() -> Warmup:
+    # One warm-up per process, started by the first page load
+    return Warmup(warmup_tasks())
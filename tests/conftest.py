@@ -0,0 +1,25 @@
+import pytest
+from langchain_community.retrievers import PineconeHybridSearchRetriever
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from benchmarks.offline import HashSparseEncoder
+from src.rag import vectorstore
+from src.rag.local_index import LocalHybridIndex
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+@pytest.fixture
+def retriever(tmp_path, monkeypatch):
+    """Hybrid retriever over a fresh local index, used as the shared retriever and index."""
+    retriever = PineconeHybridSearchRetriever(
+        embeddings=CountingEmbeddings(size=8),
+        sparse_encoder=HashSparseEncoder(),
+        index=LocalHybridIndex(str(tmp_path)),
+    )
+    monkeypatch.setattr(vectorstore, "hybrid_retriever", lambda: retriever)
+    monkeypatch.setattr(vectorstore, "get_vector_index", lambda: retriever.index)
+    return retriever
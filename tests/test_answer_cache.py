@@ -0,0 +1,40 @@
+import asyncio
+import threading
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from src.rag import answer_cache
+from src.rag.answer_cache import AnswerCacheMiddleware, CachedAnswer, SemanticAnswerCache
+
+class ThreadRecordingEmbeddings(DeterministicFakeEmbedding):
+    threads: list = []
+
+    def embed_query(self, text):
+        self.threads.append(threading.get_ident())
+        return super().embed_query(text)
+
+def _cache(monkeypatch) -> SemanticAnswerCache:
+    cache = SemanticAnswerCache(ThreadRecordingEmbeddings(size=16), threshold=0.99, max_size=10)
+    monkeypatch.setattr(answer_cache, "get_answer_cache", lambda: cache)
+    return cache
+
+def test_async_hooks_embed_off_the_event_loop(monkeypatch):
+    cache = _cache(monkeypatch)
+    middleware = AnswerCacheMiddleware()
+    question = HumanMessage(content="What is agile?")
+    turn = [question, ToolMessage(content="...", artifact=[], name="ask_knowledge_base", tool_call_id="1"), AIMessage(content="Iterative delivery.")]
+
+    async def run():
+        await middleware.aafter_agent({"messages": turn}, None)
+        return threading.get_ident(), await middleware.abefore_agent({"messages": [question]}, None)
+
+    loop_thread, result = asyncio.run(run())
+    assert result["jump_to"] == "end" and result["messages"][0].content == "Iterative delivery."
+    assert loop_thread not in cache.embeddings.threads
+
+def test_indexing_clears_knowledge_base_answers(monkeypatch):
+    cache = _cache(monkeypatch)
+    cache.add(CachedAnswer("kb question", "kb answer", ref_ids={"other"}, uses_knowledge_base=True))
+    cache.add(CachedAnswer("chit chat", "hello"))
+
+    assert cache.invalidate_knowledge_base() == 1
+    assert [entry.question for entry in cache._entries] == ["chit chat"]
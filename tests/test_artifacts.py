@@ -0,0 +1,31 @@
+from langchain_core.documents import Document
+from src.rag import vectorstore
+from src.rag.artifacts import artifact_sources, rehydrate, to_refs
+
+def _chunk(text: str, page: int) -> Document:
+    return Document(page_content=text, metadata={"ref_id": "file", "name": "notes.pdf", "page": page, "start_index": 0})
+
+def test_refs_round_trip_through_the_index(retriever):
+    chunks = [_chunk("alpha text", 0), _chunk("beta text", 1)]
+    vectorstore.index_documents(chunks, retriever=retriever)
+    # Retrieved docs carry a rerank score, and come back in rerank order
+    docs = [Document(page_content=c.page_content, metadata={**c.metadata, "relevance_score": s}) for c, s in zip(chunks, (0.9, 0.4))]
+    refs = to_refs(docs[::-1])
+
+    rehydrated = rehydrate(refs, retriever=retriever)
+    assert [d.page_content for d in rehydrated] == ["beta text", "alpha text"]
+    assert rehydrated[0].metadata["page"] == 1 and rehydrated[0].metadata["relevance_score"] == 0.4
+    assert retriever.text_key not in rehydrated[0].metadata
+
+    # Chunks deleted since the turn are skipped
+    retriever.index.delete(ids=[refs[0]["id"]])
+    assert [d.page_content for d in rehydrate(refs, retriever=retriever)] == ["alpha text"]
+
+def test_legacy_hash_ids_are_rehydrated(retriever):
+    # Indexed by `add_texts` before content-addressed ids, keyed by the bare text hash
+    retriever.add_texts(["legacy text"], metadatas=[{"ref_id": "file", "name": "old.pdf", "page": 0}])
+    sources = artifact_sources([_chunk("legacy text", 0)])
+    assert sources[0]["ref_id"] == "file"
+
+    rehydrated = rehydrate(sources, retriever=retriever)
+    assert [(d.page_content, d.metadata["name"]) for d in rehydrated] == [("legacy text", "old.pdf")]
@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.rag.batching import MicroBatcher
+
+def test_results_are_scattered_back_in_order():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], cost_fn=lambda item: item, max_wait_ms=20)
+    requests = [[3, 1, 2], [5], [4, 0]]
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        results = list(pool.map(batcher.submit, requests))
+    assert results == [[6, 2, 4], [10], [8, 0]]
+
+def test_short_batch_output_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], cost_fn=lambda item: 1, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(batcher.submit, items) for items in ([1, 2], [3])]
+    for future in futures:
+        with pytest.raises(ValueError, match="outputs for"):
+            future.result()
@@ -0,0 +1,55 @@
+import sqlite3
+from src.rag import cache as cache_module
+from src.rag.cache import LRUCache, RerankScoreCache, normalize_query
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2, "max_size": 2}
+
+def test_lru_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = LRUCache(max_size=10, ttl=60)
+    cache.set("q", "vector")
+
+    now[0] += 59
+    assert cache.get("q") == "vector"
+    now[0] += 2
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+def test_query_key_ignores_case_and_whitespace():
+    cache = RerankScoreCache(max_size=10, namespace="model:torch")
+    assert normalize_query("  What is\tScrum? ") == "what is scrum?"
+    assert cache.query_key("What is  Scrum?") == cache.query_key("  what is scrum? ")
+    assert cache.query_key("What is Scrum?") != RerankScoreCache(max_size=10, namespace="model:onnx").query_key("What is Scrum?")
+
+    cache.set_many("What is  Scrum?", ["chunk"], [1.5])
+    assert cache.get_many("what is scrum?", ["chunk", "other"]) == [1.5, None]
+
+def test_scores_persist_across_instances(tmp_path):
+    # The parent directory is created on first use
+    path = str(tmp_path / "cache" / "rerank.sqlite")
+    RerankScoreCache(max_size=10, db_path=path).set_many("query", ["a", "b"], [0.5, -1.0])
+
+    reopened = RerankScoreCache(max_size=10, db_path=path)
+    assert reopened.get_many("query", ["a", "b", "c"]) == [0.5, -1.0, None]
+    assert reopened.stats()["disk_hits"] == 2
+
+def test_disk_tier_evicts_oldest_rows(tmp_path):
+    path = str(tmp_path / "rerank.sqlite")
+    cache = RerankScoreCache(max_size=10, db_path=path, max_rows=3)
+    for i in range(5):
+        cache.set_many(f"query {i}", ["chunk"], [float(i)])
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT count(*) FROM rerank_scores").fetchone()[0] == 3
+    reopened = RerankScoreCache(max_size=10, db_path=path, max_rows=3)
+    assert [reopened.get_many(f"query {i}", ["chunk"])[0] for i in range(5)] == [None, None, 2.0, 3.0, 4.0]
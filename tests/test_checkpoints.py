@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import uuid
+from datetime import timedelta
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from src.rag.checkpoints import PostgresMaintenance, SqliteMaintenance
+
+NAMESPACES = {"": 3, "tools:task-1": 2}  # root graph and one sub-agent call
+
+def _fill_thread(saver, thread_id: str) -> None:
+    for ns, count in NAMESPACES.items():
+        for _ in range(count):
+            config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns}}
+            saver.put(config, empty_checkpoint(), {}, {})
+
+def _namespace_counts(rows) -> dict:
+    return {ns: count for ns, count in rows}
+
+def test_sqlite_compaction_keeps_latest_per_namespace(tmp_path):
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    # The parent directory doesn't exist yet, as with the default .cache/checkpoints.sqlite
+    path = str(tmp_path / "cache" / "checkpoints.sqlite")
+    maintenance = SqliteMaintenance(path, batch_size=10)
+    with sqlite3.connect(path, check_same_thread=False) as conn:
+        saver = SqliteSaver(conn)
+        saver.setup()
+        _fill_thread(saver, "thread-1")
+
+    assert maintenance.compact(timedelta(0)) == sum(NAMESPACES.values()) - len(NAMESPACES)
+    assert maintenance.compact(timedelta(0)) == 0
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT checkpoint_ns, count(*) FROM checkpoints GROUP BY checkpoint_ns").fetchall()
+    assert _namespace_counts(rows) == {ns: 1 for ns in NAMESPACES}
+
+class _StuckCursor:
+    rowcount = 0
+
+class _StuckConnection:
+    """Always reports the same idle thread and never deletes anything."""
+
+    def __init__(self):
+        self.deletes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def transaction(self):
+        return self
+
+    def execute(self, query, params=None):
+        if query.lstrip().startswith("SELECT"):
+            return self
+        self.deletes += 1
+        return _StuckCursor()
+
+    def fetchall(self):
+        return [("thread-1",)]
+
+def test_postgres_compaction_stops_when_nothing_is_deleted(monkeypatch):
+    conn = _StuckConnection()
+    maintenance = PostgresMaintenance("postgresql://unused", batch_size=10)
+    monkeypatch.setattr(maintenance, "_connect", lambda: conn)
+
+    assert maintenance.compact(timedelta(0)) == 0
+    assert conn.deletes == 3  # one pass over checkpoints, writes and blobs
+
+@pytest.mark.skipif(not os.environ.get("TEST_DB_URI"), reason="TEST_DB_URI points at a scratch Postgres database")
+def test_postgres_compaction_keeps_latest_per_namespace():
+    import psycopg
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from src.config import Config
+
+    conninfo = os.environ["TEST_DB_URI"]
+    thread_id = f"test-{uuid.uuid4()}"
+    with psycopg.connect(conninfo, **Config.DB_CONNECTION_KWARGS) as conn:
+        saver = PostgresSaver(conn)
+        saver.setup()
+        _fill_thread(saver, thread_id)
+
+        assert PostgresMaintenance(conninfo, batch_size=10).compact(timedelta(0)) >= sum(NAMESPACES.values()) - len(NAMESPACES)
+        rows = conn.execute(
+            "SELECT checkpoint_ns, count(*) FROM checkpoints WHERE thread_id = %s GROUP BY checkpoint_ns", (thread_id,)
+        ).fetchall()
+        assert _namespace_counts(rows) == {ns: 1 for ns in NAMESPACES}
+
+        for table in ("checkpoint_writes", "checkpoint_blobs", "checkpoints"):
+            conn.execute(f"DELETE FROM {table} WHERE thread_id = %s", (thread_id,))
@@ -0,0 +1,20 @@
+from langchain_core.documents import Document
+from src.rag.context_packer import merge_chunks
+from src.rag.text_splitter import chunk_documents
+
+def _page(text: str) -> Document:
+    return Document(page_content=text, metadata={"ref_id": "file", "name": "notes.pdf", "page": 0})
+
+def test_touching_chunks_from_the_splitter_merge_into_one_passage():
+    text = "\n\n".join(f"Paragraph {i} explains one more detail of the waterfall model and its phases." * 3 for i in range(12))
+    chunks = chunk_documents([_page(text)])
+    assert len(chunks) > 2
+
+    passages = merge_chunks(chunks)
+    assert len(passages) == 1
+    assert passages[0].text.split() == text.split()
+
+def test_distant_chunks_stay_separate():
+    first = Document(page_content="Waterfall phases.", metadata={"ref_id": "file", "page": 0, "start_index": 0})
+    second = Document(page_content="Agile sprints.", metadata={"ref_id": "file", "page": 0, "start_index": 500})
+    assert len(merge_chunks([first, second])) == 2
@@ -0,0 +1,59 @@
+import itertools
+import uuid
+from langchain.agents import create_agent
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.stubs import RecordingChatModel, scripted_model
+from src.rag.conversation import SUMMARY_MESSAGE_ID, RollingSummaryMiddleware
+
+MAX_TOKENS = 1500
+KEEP_TOKENS = 800
+
+def _replies(text: str):
+    # Fresh message objects, the graph assigns ids to the messages it stores
+    return (AIMessage(content=text) for _ in itertools.count())
+
+def _run_thread(middleware, model: RecordingChatModel, turns: int):
+    agent = create_agent(model=model, tools=[], checkpointer=InMemorySaver(), middleware=middleware)
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    for turn in range(turns):
+        text = f"Question {turn}: explain the next concept."
+        if turn % 5 == 4:
+            text += " Here is the document: " + " ".join(["lorem"] * 400)
+        agent.invoke({"messages": [{"role": "user", "content": text}]}, config=config)
+    return agent.get_state(config).values["messages"]
+
+def test_rolling_summary_keeps_prompt_tokens_bounded():
+    model = RecordingChatModel(messages=_replies(" ".join(["answer"] * 120)))
+    summarizer = scripted_model(_replies(" ".join(["summary"] * 60)))
+    middleware = RollingSummaryMiddleware(summarizer, max_tokens=MAX_TOKENS, keep_tokens=KEEP_TOKENS)
+
+    messages = _run_thread([middleware], model, turns=40)
+
+    assert len(model.prompt_tokens) == 40
+    assert max(model.prompt_tokens) <= MAX_TOKENS
+    # Later prompts don't creep upwards as the thread grows
+    assert max(model.prompt_tokens[20:]) <= max(model.prompt_tokens[:20]) + KEEP_TOKENS // 4
+    assert messages[0].id == SUMMARY_MESSAGE_ID
+
+def test_prompt_grows_without_trimming():
+    model = RecordingChatModel(messages=_replies(" ".join(["answer"] * 120)))
+    _run_thread([], model, turns=40)
+    assert max(model.prompt_tokens) > 4 * MAX_TOKENS
+
+def test_oversized_current_turn_is_truncated():
+    model = RecordingChatModel(messages=_replies(" ".join(["answer"] * 40)))
+    summarizer = scripted_model(_replies(" ".join(["summary"] * 60)))
+    middleware = RollingSummaryMiddleware(summarizer, max_tokens=MAX_TOKENS, keep_tokens=KEEP_TOKENS)
+    agent = create_agent(model=model, tools=[], checkpointer=InMemorySaver(), middleware=[middleware])
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+    # The opening turn alone is four times the budget
+    pasted = "Summarize this document: " + " ".join(["lorem"] * 4000)
+    agent.invoke({"messages": [{"role": "user", "content": pasted}]}, config=config)
+    agent.invoke({"messages": [{"role": "user", "content": "And the next one: " + " ".join(["ipsum"] * 4000)}]}, config=config)
+
+    assert max(model.prompt_tokens) <= MAX_TOKENS
+    question = agent.get_state(config).values["messages"][-2]
+    assert question.content.startswith("And the next one: ipsum")
+    assert question.content.endswith("[... truncated to fit the context window]")
@@ -0,0 +1,38 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from src.rag.data_loader import load_documents, parse_file, read_chunks
+from src.rag.text_splitter import chunk_documents
+
+TEXT = "\n\n".join(f"Paragraph {i}. " + "Requirements change over the life of a project. " * 8 for i in range(30))
+
+def test_parse_file_in_spawned_process_matches_in_process_chunking():
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        path = pool.submit(parse_file, "notes.txt", TEXT.encode(), "ref").result()
+
+    try:
+        chunks = list(read_chunks(path))
+    finally:
+        os.remove(path)
+
+    upload = io.BytesIO(TEXT.encode())
+    upload.name = "notes.txt"
+    expected = chunk_documents(load_documents(upload, "ref"))
+    assert [c.page_content for c in chunks] == [c.page_content for c in expected]
+    assert chunks[0].metadata["ref_id"] == "ref" and chunks[0].metadata["name"] == "notes.txt"
+
+def test_failed_parse_removes_spill_file(tmp_path, monkeypatch):
+    from src.rag import data_loader
+
+    def failing_chunks(docs):
+        yield from chunk_documents(list(docs))[:1]
+        raise ValueError("corrupt page")
+
+    monkeypatch.setattr(data_loader, "iter_chunks", failing_chunks)
+    monkeypatch.setattr(data_loader.tempfile, "tempdir", str(tmp_path))
+
+    with pytest.raises(ValueError):
+        parse_file("notes.txt", TEXT.encode(), "ref")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,35 @@
+import json
+import os
+from src.rag.local_index import LocalHybridIndex
+
+def _vector(id_: str, dense: list, text: str) -> dict:
+    return {
+        "id": id_,
+        "values": dense,
+        "sparse_values": {"indices": [1, 2], "values": [0.5, 0.5]},
+        "metadata": {"context": text},
+    }
+
+def test_upserts_are_persisted_on_flush(tmp_path):
+    index = LocalHybridIndex(str(tmp_path))
+    index.upsert([_vector("a", [1.0, 0.0], "first")])
+    index.upsert([_vector("b", [0.0, 1.0], "second")])
+
+    # Batches don't rewrite the sidecar, flush() writes it once
+    assert not os.path.exists(tmp_path / "meta.json")
+    index.flush()
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["ids"] == ["a", "b"]
+
+    reloaded = LocalHybridIndex(str(tmp_path))
+    assert reloaded.describe_index_stats()["total_vector_count"] == 2
+    match = reloaded.query([0.0, 1.0], top_k=1, include_metadata=True)["matches"][0]
+    assert match["id"] == "b" and match["metadata"]["context"] == "second"
+
+def test_delete_is_persisted_immediately(tmp_path):
+    index = LocalHybridIndex(str(tmp_path))
+    index.upsert([_vector("a", [1.0, 0.0], "first"), _vector("b", [0.0, 1.0], "second")])
+    index.delete(ids=["a"])
+
+    reloaded = LocalHybridIndex(str(tmp_path))
+    assert list(reloaded.list()) == [["b"]]
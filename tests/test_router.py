@@ -0,0 +1,96 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from src.rag.router import CANNED_REPLIES, IntentRouter, IntentRouterMiddleware, RouterMetrics
+
+EXEMPLARS = {"greeting": ["hello"], "closing": ["bye"], "knowledge_base": ["what is scrum?"], "web_search": ["latest news"]}
+
+# One axis per intent, queries are placed between them
+VECTORS = {
+    "hello": [1, 0, 0, 0], "bye": [0, 1, 0, 0], "what is scrum?": [0, 0, 1, 0], "latest news": [0, 0, 0, 1],
+    "hi": [1, 0, 0.1, 0],
+    "explain scrum roles": [0.1, 0, 1, 0],
+    "greeting or goodbye": [1, 0.95, 0, 0],  # close to two intents, below the margin
+    "something else": [1, 1, 1, 1],  # far from every exemplar, below the threshold
+    "news today": [0, 0, 0, 1],
+}
+
+class LookupEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [VECTORS[t] for t in texts]
+
+    def embed_query(self, text):
+        return VECTORS[text]
+
+def _router() -> IntentRouter:
+    return IntentRouter(LookupEmbeddings(), EXEMPLARS, threshold=0.6, margin=0.1)
+
+def test_route_needs_threshold_and_margin():
+    router = _router()
+    assert router.classify("hi")[0] == "greeting"
+    assert router.route("hi") == "greeting"
+    assert router.route("explain scrum roles") == "knowledge_base"
+
+    label, score, margin = router.classify("greeting or goodbye")
+    assert score >= 0.6 and margin < 0.1
+    assert router.route("greeting or goodbye") is None
+    assert router.classify("something else")[1] < 0.6
+    assert router.route("something else") is None
+
+    # Confident, but never dispatched locally
+    assert router.route("news today") is None
+    assert router.metrics.stats()["decisions"] == {"greeting": 1, "knowledge_base": 1, "supervisor": 3}
+
+class KnowledgeBase:
+    def __init__(self):
+        self.questions = []
+
+    def __call__(self, query):
+        self.questions.append(query)
+        return "Scrum has three roles.", [{"name": "scrum.pdf", "page": 1, "ref_id": "ref"}]
+
+    async def acall(self, query):
+        return self(query)
+
+def _middleware(kb: KnowledgeBase) -> IntentRouterMiddleware:
+    return IntentRouterMiddleware(_router(), kb, kb.acall)
+
+def test_greetings_and_closings_get_canned_replies_on_any_turn():
+    middleware = _middleware(KnowledgeBase())
+    update = middleware.before_agent({"messages": [HumanMessage("hi")]}, None)
+    assert update["jump_to"] == "end"
+    assert update["messages"][0].content == CANNED_REPLIES["greeting"]
+
+    history = [HumanMessage("explain scrum roles"), AIMessage("Three roles."), HumanMessage("bye")]
+    update = middleware.before_agent({"messages": history}, None)
+    assert update["messages"][0].content == CANNED_REPLIES["closing"]
+
+def test_knowledge_base_questions_are_routed_only_on_the_opening_turn():
+    kb = KnowledgeBase()
+    middleware = _middleware(kb)
+
+    update = middleware.before_agent({"messages": [HumanMessage("explain scrum roles")]}, None)
+    call, tool, answer = update["messages"]
+    assert call.tool_calls[0]["name"] == "ask_knowledge_base"
+    assert isinstance(tool, ToolMessage) and tool.tool_call_id == call.tool_calls[0]["id"]
+    assert answer.content == "Scrum has three roles." and answer.response_metadata["intent_router"] == "knowledge_base"
+
+    # A follow-up may depend on the earlier turns, the supervisor handles it
+    history = [HumanMessage("hi"), AIMessage("Hello!"), HumanMessage("explain scrum roles")]
+    assert middleware.before_agent({"messages": history}, None) is None
+    assert kb.questions == ["explain scrum roles"]
+
+def test_seconds_saved_compares_turns_of_the_same_intent():
+    metrics = RouterMetrics()
+    metrics.record_decision("greeting", 0.001, intent="greeting", text="hi")
+    metrics.record_decision("supervisor", 0.001, intent="greeting", text="greeting or goodbye")
+    metrics.record_decision("supervisor", 0.001, intent="knowledge_base", text="explain scrum roles")
+
+    metrics.record_turn("greeting", 0.1, text="hi")
+    metrics.record_turn(None, 1.0, text="greeting or goodbye")
+    metrics.record_turn(None, 5.0, text="explain scrum roles")
+
+    stats = metrics.stats()
+    assert stats["mean_supervised_turn_seconds_by_intent"] == {"greeting": 1.0, "knowledge_base": 5.0}
+    # Against the greeting the supervisor answered, not the average supervised turn (3.0s)
+    assert np.isclose(stats["estimated_seconds_saved"], 0.9)
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from langchain_core.messages import AIMessage, ToolMessage
+from benchmarks.stubs import StubSubAgent, scripted_model
+from src.rag.rag_agent import build_supervisor
+
+LATENCY = 0.5
+TOOL_CALLS = [
+    {"name": "ask_knowledge_base", "args": {"query": "What does the course policy say about late work?"}, "id": "call_kb"},
+    {"name": "ask_web_search", "args": {"query": "Latest release of Python"}, "id": "call_web"},
+]
+INPUTS = {"messages": [{"role": "user", "content": "Late work policy and the latest Python release?"}]}
+
+def _supervisor():
+    # Scripted supervisor that emits both tool calls in one message, then answers
+    model = scripted_model([AIMessage(content="", tool_calls=TOOL_CALLS), AIMessage(content="Combined answer.")])
+    return build_supervisor(
+        model=model,
+        knowledge_agent=StubSubAgent("KB answer", LATENCY),
+        search_agent=StubSubAgent("Web answer", LATENCY),
+    )
+
+def _assert_overlapped(result: dict, elapsed: float) -> None:
+    # max(latencies), not their sum
+    assert elapsed < 1.5 * LATENCY, f"turn took {elapsed:.2f}s, sequential would be {2 * LATENCY:.2f}s"
+    tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_messages] == [call["id"] for call in TOOL_CALLS]
+
+def test_sub_agent_calls_overlap_sync():
+    start = time.perf_counter()
+    result = _supervisor().invoke(INPUTS)
+    _assert_overlapped(result, time.perf_counter() - start)
+
+def test_sub_agent_calls_overlap_async():
+    async def run():
+        start = time.perf_counter()
+        result = await _supervisor().ainvoke(INPUTS)
+        return result, time.perf_counter() - start
+
+    _assert_overlapped(*asyncio.run(run()))
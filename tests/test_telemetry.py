@@ -0,0 +1,25 @@
+import urllib.error
+import urllib.request
+import pytest
+from src.rag.telemetry import record, start_metrics_server
+
+@pytest.fixture
+def metrics_server():
+    server = start_metrics_server(0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_metrics_server_binds_to_localhost(metrics_server):
+    assert metrics_server.server_address[0] == "127.0.0.1"
+
+def test_metrics_server_serves_only_metrics(metrics_server):
+    record("retrieve", 0.05)
+    base = f"http://127.0.0.1:{metrics_server.server_address[1]}"
+
+    with urllib.request.urlopen(f"{base}/metrics") as response:
+        assert 'rag_stage_latency_seconds_count{stage="retrieve"}' in response.read().decode()
+
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        urllib.request.urlopen(f"{base}/")
+    assert exc.value.code == 404
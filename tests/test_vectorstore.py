@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.documents import Document
+from src.rag import vectorstore
+
+def _chunk(text: str, start_index: int) -> Document:
+    return Document(page_content=text, metadata={"ref_id": "file", "page": 0, "start_index": start_index})
+
+def test_sync_refreshes_position_of_moved_chunks(retriever):
+    vectorstore.sync_documents([_chunk("alpha text", 0), _chunk("beta text", 20)], "file")
+    assert retriever.embeddings.embedded == 2
+
+    # New text inserted at the top shifts the unchanged chunks
+    stats = vectorstore.sync_documents([_chunk("new text", 0), _chunk("alpha text", 15), _chunk("beta text", 35)], "file")
+    assert (stats.added, stats.unchanged, stats.deleted) == (1, 2, 0)
+    assert retriever.embeddings.embedded == 3
+
+    beta = vectorstore.chunk_id(_chunk("beta text", 0))
+    stored = retriever.index.fetch(ids=[beta])["vectors"][beta]["metadata"]
+    assert stored["start_index"] == 35
+
+class FailingIndex:
+    def __init__(self, exc):
+        self.exc = exc
+
+    def list(self, prefix=""):
+        raise self.exc
+
+class ApiError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+def test_list_unsupported_falls_back():
+    error = ApiError("List operation is not supported for pod-based indexes", 400)
+    assert vectorstore._list_chunk_ids(FailingIndex(error), "file") is None
+
+def test_transient_list_error_is_raised():
+    with pytest.raises(ApiError):
+        vectorstore._list_chunk_ids(FailingIndex(ApiError("Service unavailable", 503)), "file")
+
+def test_sync_replaces_legacy_hash_ids(retriever):
+    # Vectors written by `add_texts` before content-addressed ids, keyed by the bare text hash
+    retriever.add_texts(["alpha text", "old text"], metadatas=[{"ref_id": "file", "page": 0}] * 2)
+    legacy_ids = [id_ for page in retriever.index.list() for id_ in page]
+    assert len(legacy_ids) == 2 and all("#" not in id_ for id_ in legacy_ids)
+
+    stats = vectorstore.sync_documents([_chunk("alpha text", 0), _chunk("beta text", 20)], "file")
+    assert stats.added == 2
+
+    ids = sorted(id_ for page in retriever.index.list() for id_ in page)
+    assert ids == sorted(vectorstore.chunk_id(_chunk(text, 0)) for text in ("alpha text", "beta text"))
+
+def test_sync_flushes_once_per_run(retriever, monkeypatch):
+    flushes = []
+    monkeypatch.setattr(retriever.index, "flush", lambda: flushes.append(1))
+    chunks = [_chunk(f"chunk {i} text", 20 * i) for i in range(10)]
+
+    vectorstore.sync_documents(chunks, "file", window_size=3)
+    assert len(flushes) == 1